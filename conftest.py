@@ -0,0 +1 @@
+# Корень репозитория в sys.path: тесты импортируют text_preparation.text_utils как пакет
@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    """Пять страниц: колонтитул и номер страницы повторяются, тело — нет."""
+    fitz = pytest.importorskip("fitz")
+    document = fitz.open()
+    for page_num in range(5):
+        page = document.new_page()
+        page.insert_text((72, 30), "CÓDIGO CIVIL", fontsize=9)
+        page.insert_text((72, 120), f"Artículo {page_num + 1}. Texto del artículo número {page_num + 1}.", fontsize=11)
+        page.insert_text((300, 820), str(page_num + 1), fontsize=9)
+    path = str(tmp_path / "code.pdf")
+    document.save(path)
+    document.close()
+    return path
@@ -0,0 +1,95 @@
+"""Поддельный Elasticsearch на http.server: только POST /_bulk, с управляемыми отказами."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeElasticsearch:
+    """
+    _bulk в памяти: documents — _id -> документ, requests — _id каждого запроса.
+
+    Args:
+        busy: статусы ответов на первые запросы целиком (например, [429, 503]).
+        reject_once: _id, которые при первой попытке получают 429 в items.
+        bad: _id, которые всегда получают 400 в items.
+        gate: threading.Event; пока он не выставлен, запросы не обрабатываются.
+    """
+
+    def __init__(self, busy=(), reject_once=(), bad=(), gate=None):
+        self.busy = list(busy)
+        self.reject_once = set(reject_once)
+        self.bad = set(bad)
+        self.gate = gate
+        self.documents = {}
+        self.requests = []
+        self.paths = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.gate is not None:
+            self.gate.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def bulk(self, body):
+        """Тело _bulk -> (статус, ответ)."""
+        lines = iter(body.decode("utf-8").splitlines())
+        actions = []
+        for line in lines:
+            (op, meta), = json.loads(line).items()
+            actions.append((op, meta["_id"], None if op == "delete" else json.loads(next(lines))))
+        with self.lock:
+            self.requests.append([doc_id for _, doc_id, _ in actions])
+            if self.busy:
+                return self.busy.pop(0), {"error": "es_rejected_execution_exception"}
+            items = []
+            for op, doc_id, doc in actions:
+                if doc_id in self.bad:
+                    items.append({op: {"_id": doc_id, "status": 400, "error": {"type": "mapper_parsing_exception"}}})
+                elif doc_id in self.reject_once:
+                    self.reject_once.discard(doc_id)
+                    items.append({op: {"_id": doc_id, "status": 429, "error": {"type": "es_rejected_execution_exception"}}})
+                elif op == "delete":
+                    found = self.documents.pop(doc_id, None) is not None
+                    items.append({op: {"_id": doc_id, "status": 200 if found else 404}})
+                else:
+                    self.documents[doc_id] = doc
+                    items.append({op: {"_id": doc_id, "status": 201}})
+        errors = any(next(iter(item.values()))["status"] >= 300 for item in items)
+        return 200, {"errors": errors, "items": items}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, как у настоящего кластера
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with fake.lock:
+                    fake.paths.append(self.path)
+                if fake.gate is not None:
+                    fake.gate.wait()
+                status, payload = fake.bulk(body)
+                encoded = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from text_preparation.text_utils.array_file import StringTable, load_arrays, save_arrays
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_arrays_round_trip(tmp_path, mmap):
+    path = str(tmp_path / "data.arrays")
+    arrays = {
+        "ints": np.arange(7, dtype=np.int32),
+        "matrix": np.arange(6, dtype=np.float32).reshape(2, 3),
+        "bytes": np.frombuffer(b"abc", dtype=np.uint8),
+        "empty": np.zeros(0, dtype=np.int64),
+    }
+    save_arrays(path, "test", arrays, {"rows": 7})
+    loaded, meta = load_arrays(path, "test", mmap)
+    assert meta == {"rows": 7}
+    assert list(loaded) == list(arrays)
+    for name, array in arrays.items():
+        assert loaded[name].dtype == array.dtype
+        assert np.array_equal(loaded[name], array)
+
+
+def test_kind_and_magic_are_checked(tmp_path):
+    path = str(tmp_path / "data.arrays")
+    save_arrays(path, "xref_graph", {"a": np.zeros(1)})
+    with pytest.raises(ValueError, match="ожидался hierarchy_tree"):
+        load_arrays(path, "hierarchy_tree")
+    other = tmp_path / "other.arrays"
+    other.write_bytes(b"not an array file")
+    with pytest.raises(ValueError, match="не файл массивов"):
+        load_arrays(str(other), "xref_graph")
+
+
+def test_string_table():
+    table = StringTable.build(["", "Artículo 1", "ñ", ""])
+    assert len(table) == 4
+    assert [table[i] for i in range(len(table))] == ["", "Artículo 1", "ñ", ""]
+    assert len(StringTable.build([])) == 0
@@ -0,0 +1,63 @@
+import pytest
+
+from text_preparation.text_utils.articles import label_key
+from text_preparation.text_utils.autocomplete_index import AutocompleteIndex, query_key
+
+RECORDS = [
+    {"book_name": "codigo civil", "libro": None, "titulo": "TÍTULO PRELIMINAR", "capitulo": "CAPÍTULO I",
+     "articulo": "1."},
+    {"book_name": "codigo civil", "libro": "LIBRO PRIMERO", "titulo": "TÍTULO IV.", "capitulo": "CAPÍTULO II",
+     "articulo": "10."},
+    {"book_name": "codigo civil", "libro": "LIBRO PRIMERO", "titulo": "TÍTULO IV.", "capitulo": "CAPÍTULO II",
+     "articulo": "1902."},
+    {"book_name": "codigo penal", "libro": "LIBRO I", "titulo": "TÍTULO I", "capitulo": "CAPÍTULO II",
+     "articulo": "31 bis"},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return AutocompleteIndex.build(RECORDS)
+
+
+def test_label_key():
+    assert label_key("TÍTULO IV.") == "titulo iv"
+    assert label_key("  Capítulo  II ") == label_key("capitulo ii") == "capitulo ii"
+
+
+def test_query_key():
+    assert query_key("Art. 1.902 CC") == ("articulo 1902", "codigo civil")
+    assert query_key("1902") == ("articulo 1902", None)
+    assert query_key("tit. prelim") == ("titulo prelim", None)
+
+
+def test_prefix_ranks_shorter_keys_first(index):
+    assert [result["key"] for result in index.complete("art 1")][:3] == ["articulo 1", "articulo 10", "articulo 1902"]
+    (result,) = index.complete("titulo prel")
+    assert (result["text"], result["level"], result["edits"]) == ("TÍTULO PRELIMINAR", "titulo", 0)
+
+
+def test_duplicate_headings_share_one_key(index):
+    (result,) = index.complete("capitulo ii")
+    assert [found["book_name"] for found in result["occurrences"]] == ["codigo civil", "codigo penal"]
+    (result,) = index.complete("capitulo ii", book="codigo penal")
+    assert result["occurrences"] == [{"book_name": "codigo penal", "row": 3}]
+
+
+def test_typos_and_unmatched_words(index):
+    (result,) = index.complete("tiulo preliminar")
+    assert (result["key"], result["edits"]) == ("titulo preliminar", 1)
+    results = index.complete("capitulo ii de las obligaciones")
+    assert results[0]["key"] == "capitulo ii"
+    assert results[0]["rest"] == "de las obligaciones"
+    # Цифры правками не меняются: 1903 — не опечатка в 1902, остаётся только префикс "articulo"
+    results = index.complete("articulo 1903")
+    assert {result["rest"] for result in results} == {"1903"}
+
+
+def test_save_and_load(index, tmp_path):
+    path = str(tmp_path / "laws.autocomplete")
+    index.save(path)
+    loaded = AutocompleteIndex.load(path)
+    assert loaded.keys == index.keys
+    assert loaded.complete("art 31 bis cp") == index.complete("art 31 bis cp")
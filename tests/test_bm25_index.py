@@ -0,0 +1,98 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from text_preparation.text_utils.bm25_index import BM25Index, analyze
+
+ARTICLES = [
+    {"book_name": "codigo civil", "libro": "LIBRO IV", "titulo": "TÍTULO XVI", "articulo": "1902.",
+     "texto": "El que por acción u omisión causa daño a otro, interviniendo culpa o negligencia, está obligado a reparar el daño causado."},
+    {"book_name": "codigo civil", "libro": "LIBRO IV", "titulo": "TÍTULO XVI", "articulo": "1903.",
+     "texto": "La obligación que impone el artículo anterior es exigible no sólo por los actos u omisiones propios."},
+    {"book_name": "codigo civil", "libro": "LIBRO I", "titulo": "TÍTULO II", "articulo": "29.",
+     "texto": "El nacimiento determina la personalidad."},
+    {"book_name": "codigo penal", "libro": "LIBRO II", "titulo": "TÍTULO I", "articulo": "Artículo 138",
+     "text": "El que matare a otro será castigado, como reo de homicidio, con la pena de prisión de diez a quince años."},
+    {"book_name": "codigo penal", "libro": "LIBRO II", "titulo": "TÍTULO XIII", "articulo": "Artículo 263",
+     "text": "El que causare daños en propiedad ajena será castigado. Daño leve."},
+]
+
+
+@pytest.fixture
+def ndjson_path(tmp_path):
+    path = tmp_path / "laws.ndjson"
+    with open(path, "w", encoding="utf-8") as f:
+        for article in ARTICLES:
+            f.write(json.dumps(article, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+@pytest.fixture(params=[False, True], ids=["memory", "mmap"])
+def index(request, ndjson_path, tmp_path):
+    index = BM25Index.build(ndjson_path)
+    if request.param:
+        directory = str(tmp_path / "laws_bm25")
+        index.save(directory)
+        index = BM25Index.load(directory)
+        assert isinstance(index.post_docs, np.memmap)
+    return index
+
+
+def _ids(hits):
+    return [doc_id for _, doc_id, _ in hits]
+
+
+def test_analyze_folds_joins_hyphens_and_drops_stopwords():
+    assert analyze("El daño de la Omisión") == ["dano", "omision"]
+    assert analyze("siem- pre y infrac\xad ción") == ["siempre", "infraccion"]
+    assert analyze("Artículo 31 bis") == ["articulo", "31", "bis"]
+
+
+def test_score_matches_bm25_formula(index):
+    (row, doc_id, score), = index.search("nacimiento")
+    assert (row, doc_id) == (2, "codigo_civil-29")
+    doc_len = [len(analyze(article.get("texto") or article.get("text"))) for article in ARTICLES]
+    avgdl = sum(doc_len) / len(doc_len)
+    idf = math.log(1 + (len(ARTICLES) - 1 + 0.5) / (1 + 0.5))
+    expected = idf * 1 * (1.2 + 1) / (1 + 1.2 * (1 - 0.75 + 0.75 * doc_len[2] / avgdl))
+    assert score == pytest.approx(expected, rel=1e-5)
+
+
+def test_ranking_by_term_frequency_and_length(index):
+    # "dano" дважды в длинной 1902 и один раз в короткой 263 ("danos" — другой терм)
+    hits = index.search("daño")
+    assert _ids(hits) == ["codigo_civil-1902", "codigo_penal-263"]
+    assert hits[0][2] > hits[1][2] > 0
+    # Совпадение по двум термам поднимает документ выше совпадения по одному
+    assert _ids(index.search("omision daño"))[0] == "codigo_civil-1902"
+    assert _ids(index.search("castigado homicidio")) == ["codigo_penal-138", "codigo_penal-263"]
+
+
+def test_unknown_terms_and_stopwords_find_nothing(index):
+    assert index.search("hipoteca") == []
+    assert index.search("de la y el") == []
+
+
+def test_filters_and_k(index):
+    assert _ids(index.search("castigado", book_name="codigo civil")) == []
+    assert _ids(index.search("daño", book_name="codigo penal")) == ["codigo_penal-263"]
+    assert _ids(index.search("castigado", titulo="TÍTULO I")) == ["codigo_penal-138"]
+    assert index.search("castigado", libro="LIBRO IX") == []
+    assert len(index.search("castigado daño obligacion", k=2)) == 2
+
+
+def test_documents_read_back_by_offset(index):
+    rows = [row for row, _, _ in index.search("castigado homicidio")]
+    assert [article["articulo"] for article in index.documents(rows)] == ["Artículo 138", "Artículo 263"]
+
+
+def test_mmap_reload_returns_same_results(ndjson_path, tmp_path):
+    built = BM25Index.build(ndjson_path)
+    directory = str(tmp_path / "laws_bm25")
+    built.save(directory)
+    for mmap in (True, False):
+        loaded = BM25Index.load(directory, mmap=mmap)
+        for query in ("daño", "omision daño", "castigado", "obligacion artículo anterior"):
+            assert loaded.search(query) == built.search(query)
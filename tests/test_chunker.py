@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+from text_preparation.text_utils.articles import content_hash
+from text_preparation.text_utils.chunker import count_tokens, iter_passages
+
+ARTICLE = {
+    "book_name": "codigo civil", "libro": None, "titulo": "TÍTULO PRELIMINAR", "capitulo": "CAPÍTULO I",
+    "articulo": "1.",
+    "texto": "1. Las fuentes del ordenamiento jurídico español son la ley, la costumbre y los principios "
+             "generales del derecho. 2. Carecerán de validez las disposiciones que contradigan otra de "
+             "rango superior. 3. La costumbre sólo regirá en defecto de ley aplicable.",
+}
+
+
+def test_passages_split_on_apartados_and_point_into_the_article():
+    # Апартадо 1 — 21 токен; 2 и 3 вместе укладываются в 30
+    passages = list(iter_passages([ARTICLE], limit=30))
+    assert [passage["id"] for passage in passages] == ["codigo_civil-1#0", "codigo_civil-1#1"]
+    for passage in passages:
+        assert ARTICLE["texto"][passage["start"]:passage["end"]] == passage["texto"]
+        assert passage["article_hash"] == content_hash(ARTICLE)
+        assert count_tokens(passage["texto"]) <= 30
+    assert passages[1]["texto"].startswith("2. Carecerán")
+
+
+def test_whole_article_fits_in_one_passage():
+    [passage] = iter_passages([ARTICLE], limit=256)
+    assert passage["texto"] == ARTICLE["texto"]
+
+
+def test_import_does_not_load_the_es_client():
+    code = ("import sys, text_preparation.text_utils.chunker; "
+            "sys.exit('http.client' in sys.modules or 'text_preparation.text_utils.incremental' in sys.modules)")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from text_preparation.text_utils.articles import fold, fold_with_offsets
+from text_preparation.text_utils.citation_index import CitationIndex, parse_citations
+
+ARTICLES = [
+    {"book_name": "codigo civil", "libro": "LIBRO IV", "titulo": "TÍTULO XVI", "capitulo": "CAPÍTULO II",
+     "articulo": "1902.", "texto": "El que por acción u omisión causa daño a otro..."},
+    {"book_name": "codigo civil", "libro": "LIBRO IV", "titulo": "TÍTULO XVI", "capitulo": "CAPÍTULO II",
+     "articulo": "1903.", "texto": "La obligación que impone el artículo anterior..."},
+    {"book_name": "codigo penal", "libro": "LIBRO II", "titulo": "TÍTULO I", "capitulo": None,
+     "articulo": "Artículo 138", "text": "El que matare a otro..."},
+    {"book_name": "codigo penal", "libro": "LIBRO I", "titulo": "TÍTULO II", "capitulo": None,
+     "articulo": "Artículo 31 bis", "text": "En los supuestos previstos en este Código..."},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "laws.ndjson"
+    with open(path, "w", encoding="utf-8") as f:
+        for article in ARTICLES:
+            f.write(json.dumps(article, ensure_ascii=False) + "\n")
+    return CitationIndex.build(str(path))
+
+
+def _codes(text):
+    return [(citation["code"], citation["number"], citation["suffix"]) for citation in parse_citations(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("art. 1902 CC", [("codigo civil", 1902, "")]),
+    ("art. 1902 CC.", [("codigo civil", 1902, "")]),
+    ("Según el art. 1902 CC. El daño...", [("codigo civil", 1902, "")]),
+    ("articulo 10 del codigo penal.", [("codigo penal", 10, "")]),
+    ("artículo 138 del Código Penal", [("codigo penal", 138, "")]),
+    ("art. 31 bis CP.", [("codigo penal", 31, "bis")]),
+    ("arts. 1902 y 1903 del Código Civil.", [("codigo civil", 1902, ""), ("codigo civil", 1903, "")]),
+    ("art. 1.902 c.c.", [("codigo civil", 1902, "")]),
+    ("art. 5.2", [(None, 5, "")]),
+])
+def test_parse_citations_codes(text, expected):
+    assert _codes(text) == expected
+
+
+def test_code_must_end_the_word():
+    # "cc" — начало слова, а не кодекс
+    assert _codes("art. 1902 ccaa") == [(None, 1902, "")]
+    assert _codes("art. 1902 cc.aa") == [(None, 1902, "")]
+
+
+def test_citation_text_is_taken_from_original():
+    text = "Véase el ARTÍCULO 138 del Código Penal."
+    [citation] = parse_citations(text)
+    assert citation["text"] == "ARTÍCULO 138 del Código Penal"
+
+
+def test_citation_text_survives_length_changing_fold():
+    # Лигатура "\ufb01" раскладывается в два символа, комбинируемые ударения исчезают
+    text = "\ufb01nalmente, arti\u0301culo 1902 del Co\u0301digo Civil"
+    assert len(fold(text)) == len(text) - 1
+    [citation] = parse_citations(text)
+    assert citation["text"] == "arti\u0301culo 1902 del Co\u0301digo Civil"
+    assert citation["code"] == "codigo civil"
+
+
+def test_fold_with_offsets_matches_fold():
+    for text in ("Título Preliminar", "ﬁn de la Sección", "él", "ascii only"):
+        folded, positions = fold_with_offsets(text)
+        assert folded == fold(text)
+        assert len(positions) == len(folded) + 1
+        assert positions[-1] == len(text)
+
+
+def test_resolve_trailing_period_keeps_code(index):
+    [citation] = index.resolve("art. 1902 CC.")
+    assert citation["code"] == "codigo civil"
+    assert [article["articulo"] for article in citation["articles"]] == ["1902."]
+
+
+def test_resolve_without_code_searches_all_codes(index):
+    [citation] = index.resolve("artículo 138")
+    assert [article["book_name"] for article in citation["articles"]] == ["codigo penal"]
+    assert citation["articles"][0]["path"] == ["LIBRO II", "TÍTULO I"]
+
+
+def test_resolve_default_code_and_suffix(index):
+    [citation] = index.resolve("art. 31 bis", default_code="codigo penal")
+    assert citation["articles"][0]["articulo"] == "Artículo 31 bis"
+    assert index.resolve("art. 1902", default_code="codigo penal")[0]["articles"] == []
+
+
+def test_save_load_roundtrip(index, tmp_path):
+    path = tmp_path / "laws.citations.json"
+    index.save(str(path))
+    loaded = CitationIndex.load(str(path))
+    assert loaded.codes == index.codes
+    assert loaded.resolve("art. 1903 CC.")[0]["articles"][0]["articulo"] == "1903."
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from text_preparation.text_utils.columnar_corpus import ColumnarCorpus, ColumnarWriter, export
+
+RECORDS = [
+    {"book_name": "codigo civil", "libro": "LIBRO I", "titulo": "TÍTULO I", "capitulo": None,
+     "articulo": "1.", "texto": "Las fuentes del ordenamiento jurídico español."},
+    {"book_name": "codigo civil", "libro": "LIBRO I", "titulo": "TÍTULO II", "capitulo": "CAPÍTULO I",
+     "articulo": "", "texto": "", "notas": ["Redactado por la Ley 13/2005."]},
+    {"book_name": "codigo penal", "libro": None, "titulo": "TÍTULO I", "capitulo": None,
+     "articulo": None, "text": None},
+    {"book_name": "codigo penal", "libro": "LIBRO II", "titulo": None, "capitulo": None, "articulo": "138"},
+]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = str(tmp_path / "laws.columns")
+    with ColumnarWriter(path) as sink:
+        for record in RECORDS:
+            sink.write(record)
+    return ColumnarCorpus.load(path)
+
+
+def test_records_round_trip(corpus):
+    assert len(corpus) == len(RECORDS)
+    assert list(corpus) == RECORDS
+
+
+def test_empty_string_and_null_stay_distinct(corpus):
+    assert corpus.record(1)["articulo"] == ""
+    assert corpus.record(1)["texto"] == ""
+    assert corpus.record(2)["articulo"] is None
+    assert corpus.record(2)["text"] is None
+
+
+def test_hierarchy_values_and_text(corpus):
+    assert corpus.value(0, "titulo") == "TÍTULO I"
+    assert corpus.value(0, "capitulo") is None
+    assert corpus.text(0) == RECORDS[0]["texto"]
+    assert bytes(corpus.text_view(0)).decode("utf-8") == RECORDS[0]["texto"]
+
+
+def test_select(corpus):
+    assert corpus.select(book_name="codigo civil") == [0, 1]
+    assert corpus.select(titulo="TÍTULO I") == [0, 2]
+    assert corpus.select(book_name="codigo penal", titulo=None) == [3]
+    assert corpus.select(book_name="codigo civil", capitulo="CAPÍTULO I") == [1]
+    assert corpus.select(titulo="TÍTULO IX") == []
+
+
+def test_export_from_ndjson(tmp_path):
+    ndjson_path = tmp_path / "laws.ndjson"
+    ndjson_path.write_text("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in RECORDS),
+                           encoding="utf-8")
+    path = str(tmp_path / "laws.columns")
+    assert export(str(ndjson_path), path) == len(RECORDS)
+    corpus = ColumnarCorpus.load(path, mmap=False)
+    assert list(corpus) == RECORDS
+    assert corpus.meta["source"] == "laws.ndjson"
@@ -0,0 +1,77 @@
+import json
+
+from text_preparation.text_utils import corpus_validator
+from text_preparation.text_utils.corpus_validator import ISSUES, validate, validate_file
+
+
+def _civil(articulo, texto="Texto del artículo."):
+    return {"book_name": "codigo civil", "articulo": articulo, "texto": texto}
+
+
+def _penal(articulo, text="Texto del artículo."):
+    return {"book_name": "codigo penal", "articulo": articulo, "text": text}
+
+
+def _issues(result):
+    return {issue: count for issue, count in result["counts"].items() if count}
+
+
+def test_clean_corpus_has_no_issues():
+    report = validate([_civil("1."), _civil("2."), _penal("Artículo 31"), _penal("Artículo 31 bis"),
+                       _penal("Artículo 31 ter"), _penal("Artículo 32")])
+    assert {book: result["articles"] for book, result in report.items()} == {"codigo civil": 2, "codigo penal": 4}
+    assert all(_issues(result) == {} for result in report.values())
+
+
+def test_gaps_in_numbers_and_suffixes():
+    result = validate([_penal("Artículo 30"), _penal("Artículo 33"), _penal("Artículo 33 ter"),
+                       _penal("Artículo 34 bis")])["codigo penal"]
+    assert _issues(result) == {"gap": 3}
+    assert [(example["articulo"], example["after"], example["missed"]) for example in result["examples"]["gap"]] == [
+        ("Artículo 33", "30", 2),
+        ("Artículo 33 ter", "33", 1),        # нет 33 bis
+        ("Artículo 34 bis", "33 ter", 1),    # нет самой 34
+    ]
+
+
+def test_duplicates_and_out_of_order():
+    result = validate([_civil("1."), _civil("2."), _civil("2."), _civil("4."), _civil("3.")])["codigo civil"]
+    assert _issues(result) == {"duplicate": 1, "gap": 1, "out_of_order": 1}
+    assert result["examples"]["duplicate"] == [{"row": 2, "articulo": "2."}]
+    assert result["examples"]["out_of_order"] == [{"row": 4, "articulo": "3.", "after": "4"}]
+
+
+def test_bad_articulo_empty_text_and_leaked_heading():
+    result = validate([
+        _civil(None),
+        _civil("1.", texto="  "),
+        _civil("2.", texto="Texto. CAPÍTULO III De los contratos"),
+        _civil("3.", texto="Sección 2.ª Disposiciones generales"),
+        _civil("4.", texto="Conforme al título IV de este libro."),   # ссылка, а не заголовок
+    ])["codigo civil"]
+    assert _issues(result) == {"bad_articulo": 1, "empty_text": 1, "leaked_heading": 2}
+    assert [example["heading"] for example in result["examples"]["leaked_heading"]] == ["CAPÍTULO III", "Sección 2.ª"]
+
+
+def test_books_are_checked_separately():
+    # Нумерация каждого кодекса начинается заново: это не дубль и не нарушение порядка
+    report = validate([_civil("1."), _civil("2."), _penal("Artículo 1"), _penal("Artículo 2")])
+    assert all(_issues(result) == {} for result in report.values())
+
+
+def test_examples_are_capped(monkeypatch):
+    monkeypatch.setattr(corpus_validator, "max_examples", 2)
+    result = validate([_civil("1.")] * 5)["codigo civil"]
+    assert result["counts"]["duplicate"] == 4
+    assert len(result["examples"]["duplicate"]) == 2
+    assert set(result["counts"]) == set(ISSUES)
+
+
+def test_validate_file_reads_json_and_ndjson(tmp_path):
+    records = [_penal("Artículo 1"), _penal("Artículo 3")]
+    json_path = tmp_path / "laws.json"
+    json_path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+    ndjson_path = tmp_path / "laws.ndjson"
+    ndjson_path.write_text("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records), encoding="utf-8")
+    assert validate_file(str(json_path)) == validate_file(str(ndjson_path)) == validate(records)
+    assert validate_file(str(ndjson_path))["codigo penal"]["counts"]["gap"] == 1
@@ -0,0 +1,36 @@
+from text_preparation.text_utils.cross_references import CrossReferenceGraph, extract_references
+
+
+def test_code_before_sentence_end_is_kept():
+    assert extract_references("Lo dispuesto en el artículo 1902 del Código Civil.") == [("codigo civil", 1902, "")]
+    assert extract_references("conforme al art. 138 CP. Además") == [("codigo penal", 138, "")]
+
+
+def test_range_lists_and_suffixes():
+    assert extract_references("los artículos 10 a 12 y 31 bis") == [
+        (None, 10, ""), (None, 11, ""), (None, 12, ""), (None, 31, "bis"),
+    ]
+
+
+def test_external_laws_are_skipped_and_relative_found():
+    assert extract_references("el artículo 954 de la Ley de Enjuiciamiento Civil") == []
+    assert extract_references("lo previsto en el artículo anterior") == [("relative", -1, "")]
+
+
+def test_graph_in_both_directions(tmp_path):
+    records = [
+        {"book_name": "codigo civil", "articulo": "1.", "texto": "Véanse los artículos 2 y 3."},
+        {"book_name": "codigo civil", "articulo": "2.", "texto": "Como dice el artículo siguiente."},
+        {"book_name": "codigo civil", "articulo": "3.", "texto": "Sin perjuicio del art. 10 CP."},
+        {"book_name": "codigo penal", "articulo": "Artículo 10", "text": "Nada."},
+    ]
+    graph = CrossReferenceGraph.build(records)
+    path = str(tmp_path / "laws.xref")
+    graph.save(path)
+    graph = CrossReferenceGraph.load(path)
+    first, third, penal = graph.node("codigo_civil-1"), graph.node("codigo_civil-3"), graph.node("codigo_penal-10")
+    assert [graph.ids[node] for node in graph.cites(first)] == ["codigo_civil-2", "codigo_civil-3"]
+    assert graph.cites(third).tolist() == [penal]
+    assert graph.cited_by(third).tolist() == [first, graph.node("codigo_civil-2")]
+    assert graph.neighbourhood(first, hops=2, direction="out") == {1: 1, 2: 1, penal: 2}
+    assert graph.meta == {"edges": 4, "unresolved": 0}
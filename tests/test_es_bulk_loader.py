@@ -0,0 +1,106 @@
+import threading
+
+from fake_es import FakeElasticsearch
+
+from text_preparation.text_utils.es_bulk_loader import BulkLoader, index_actions, iter_chunks
+
+ARTICLES = [{"book_name": "codigo civil", "articulo": f"{number}.", "texto": f"Texto {number}"}
+            for number in range(1, 41)]
+
+
+def _loader(fake, **options):
+    options.setdefault("backoff", 0.001)
+    return BulkLoader(fake.url, "laws", **options)
+
+
+def test_ids_are_deterministic_and_reloads_overwrite():
+    with FakeElasticsearch() as fake:
+        first = _loader(fake, workers=2, max_docs=7).load(index_actions(ARTICLES))
+        second = _loader(fake, workers=3, max_docs=5).load(index_actions(ARTICLES))
+    assert first["docs"] == second["docs"] == len(ARTICLES)
+    assert len(fake.documents) == len(ARTICLES)
+    assert fake.documents["codigo_civil-7"]["texto"] == "Texto 7"
+    assert all(path == "/_bulk" for path in fake.paths)
+
+
+def test_whole_request_retried_on_429_and_503():
+    with FakeElasticsearch(busy=[429, 503, 429]) as fake:
+        stats = _loader(fake, workers=1, max_docs=100).load(index_actions(ARTICLES))
+    assert stats["docs"] == len(ARTICLES)
+    assert stats["failed"] == 0
+    assert stats["retries"] == 3
+    assert len(fake.requests) == 4
+    assert len(fake.documents) == len(ARTICLES)
+
+
+def test_only_rejected_items_are_resent():
+    rejected = {"codigo_civil-3", "codigo_civil-17"}
+    with FakeElasticsearch(reject_once=rejected) as fake:
+        stats = _loader(fake, workers=1, max_docs=100).load(index_actions(ARTICLES))
+    assert stats == {**stats, "docs": len(ARTICLES), "failed": 0, "retries": 1}
+    assert [sorted(ids) for ids in fake.requests[1:]] == [sorted(rejected)]
+    assert len(fake.documents) == len(ARTICLES)
+
+
+def test_retries_give_up_after_max_retries():
+    with FakeElasticsearch(busy=[429] * 10) as fake:
+        stats = _loader(fake, workers=1, max_docs=100, max_retries=2).load(index_actions(ARTICLES))
+    assert stats["docs"] == 0
+    assert stats["failed"] == len(ARTICLES)
+    assert len(fake.requests) == 3
+
+
+def test_item_errors_are_counted_and_deletes_of_missing_ids_are_not():
+    actions = list(index_actions(ARTICLES[:3])) + [("delete", "codigo_civil-999", None)]
+    with FakeElasticsearch(bad={"codigo_civil-2"}) as fake:
+        stats = _loader(fake, workers=1).load(actions)
+    assert stats["docs"] == 3
+    assert stats["failed"] == 1
+    assert "mapper_parsing_exception" in stats["errors"][0]
+    assert sorted(fake.documents) == ["codigo_civil-1", "codigo_civil-3"]
+
+
+def test_page_fragments_are_merged_into_one_document():
+    fragments = [{"book_name": "codigo civil", "articulo": "1902.", "texto": "El que por acción u omisión",
+                  "notas": []},
+                 {"book_name": "codigo civil", "articulo": "1902.", "texto": "causa daño a otro",
+                  "notas": ["Redactado por la Ley 1/2000."]},
+                 ARTICLES[0]]
+    actions = list(index_actions(fragments))
+    assert [doc_id for _, doc_id, _ in actions] == ["codigo_civil-1902", "codigo_civil-1"]
+    with FakeElasticsearch() as fake:
+        stats = _loader(fake, workers=1).load(actions)
+    assert stats["docs"] == 2
+    assert fake.documents["codigo_civil-1902"]["texto"] == "El que por acción u omisión causa daño a otro"
+    assert fake.documents["codigo_civil-1902"]["notas"] == ["Redactado por la Ley 1/2000."]
+
+
+def test_backpressure_stops_reading_while_cluster_is_stalled():
+    gate = threading.Event()
+    consumed = []
+
+    def actions():
+        for action in index_actions(ARTICLES * 4):
+            consumed.append(action[1])
+            yield action
+
+    workers, max_docs = 2, 5
+    with FakeElasticsearch(gate=gate) as fake:
+        loader = _loader(fake, workers=workers, max_docs=max_docs)
+        thread = threading.Thread(target=loader.load, args=(actions(),))
+        thread.start()
+        thread.join(0.5)
+        # Заняты workers потоков, очередь на workers * 2 пачки и одна пачка ждёт put
+        assert thread.is_alive()
+        assert len(consumed) <= (workers + workers * 2 + 1) * max_docs + 1
+        gate.set()
+        thread.join(10)
+    assert not thread.is_alive()
+    assert loader.docs == len(ARTICLES) * 4
+    assert len(consumed) == len(ARTICLES) * 4
+
+
+def test_chunks_respect_byte_and_doc_limits():
+    chunks = list(iter_chunks(index_actions(ARTICLES), "laws", max_bytes=400, max_docs=3))
+    assert sum(len(chunk) for chunk in chunks) == len(ARTICLES)
+    assert all(len(chunk) <= 3 and sum(map(len, chunk)) <= 400 for chunk in chunks)
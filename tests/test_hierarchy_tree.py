@@ -0,0 +1,94 @@
+import pytest
+
+from text_preparation.text_utils.hierarchy_tree import HierarchyTree
+
+
+def _article(book, libro, titulo, capitulo, articulo):
+    return {"book_name": book, "libro": libro, "titulo": titulo, "capitulo": capitulo, "articulo": articulo}
+
+
+RECORDS = [
+    _article("codigo civil", None, "TÍTULO PRELIMINAR", "CAPÍTULO I", "1."),
+    _article("codigo civil", None, "TÍTULO PRELIMINAR", "CAPÍTULO I", "2."),
+    _article("codigo civil", "LIBRO IV", "TÍTULO IV", "CAPÍTULO II", "1445."),
+    _article("codigo civil", "LIBRO IV", "TÍTULO IV", "CAPÍTULO II", "1445."),   # фрагмент той же статьи
+    _article("codigo civil", "LIBRO IV", "TÍTULO IV", "CAPÍTULO II", "1446."),
+    _article("codigo civil", "LIBRO IV", "TÍTULO IV bis", "CAPÍTULO I", "1447."),
+    _article("codigo civil", "LIBRO IV", "TÍTULO XVI", "CAPÍTULO II", "1902."),
+    _article("codigo penal", "LIBRO I", "TÍTULO II", None, "Artículo 31"),
+    _article("codigo penal", "LIBRO I", "TÍTULO II", None, "Artículo 31 bis"),
+    _article("codigo penal", "LIBRO II", "TÍTULO I. Del homicidio y sus formas", None, "Artículo 138"),
+]
+
+
+@pytest.fixture(params=[False, True], ids=["memory", "saved"])
+def tree(request, tmp_path):
+    tree = HierarchyTree.build(RECORDS)
+    if request.param:
+        path = str(tmp_path / "laws.tree")
+        tree.save(path)
+        tree = HierarchyTree.load(path)
+    return tree
+
+
+def _texts(tree, nodes):
+    return [tree.text(node) for node in nodes]
+
+
+def test_find_by_full_and_partial_paths(tree):
+    chapter = tree.find("codigo civil", "LIBRO IV", "TÍTULO IV", "CAPÍTULO II")
+    assert chapter is not None
+    assert tree.find("Código Civil", "titulo iv", "capitulo ii") == chapter
+    assert tree.find("codigo civil", "CAPÍTULO II") == chapter   # первый по порядку на этой глубине
+    assert _texts(tree, tree.subtree(chapter)) == ["1445.", "1446."]
+
+
+def test_find_respects_word_boundaries(tree):
+    title = tree.find("codigo civil", "TÍTULO IV")
+    assert tree.text(title) == "TÍTULO IV"
+    assert tree.text(tree.find("codigo civil", "titulo iv bis")) == "TÍTULO IV bis"
+    assert tree.text(tree.find("codigo penal", "Título I")) == "TÍTULO I. Del homicidio y sus formas"
+    assert tree.find("codigo civil", "TÍTULO V") is None
+    assert tree.find("codigo penal", "TÍTULO XVI") is None
+    assert tree.find("ley hipotecaria") is None
+
+
+def test_find_does_not_match_suffixed_headings():
+    # Только "TÍTULO VII BIS" в кодексе: "Título VII" его не находит
+    tree = HierarchyTree.build([
+        _article("codigo civil", "LIBRO I", "TÍTULO VII BIS", "CAPÍTULO I", "1."),
+        _article("codigo civil", "LIBRO I", "TÍTULO VII ter. De la tutela", None, "2."),
+        _article("codigo civil", "LIBRO I", "TÍTULO VII bisagra", None, "3."),
+        _article("codigo civil", "LIBRO II", "TÍTULO IV bis", None, "4."),
+        _article("codigo civil", "LIBRO II", "TÍTULO IV", None, "5."),
+    ])
+    assert tree.find("codigo civil", "Título VII") is not None
+    assert tree.text(tree.find("codigo civil", "Título VII")) == "TÍTULO VII bisagra"
+    assert tree.text(tree.find("codigo civil", "Título VII bis")) == "TÍTULO VII BIS"
+    assert tree.text(tree.find("codigo civil", "titulo vii ter")) == "TÍTULO VII ter. De la tutela"
+    # Суффиксный заголовок идёт раньше, но "TÍTULO IV" — только точное совпадение
+    assert tree.text(tree.find("codigo civil", "TÍTULO IV")) == "TÍTULO IV"
+    assert tree.find("codigo civil", "LIBRO I", "TÍTULO IX") is None
+    only_bis = HierarchyTree.build([_article("codigo civil", None, "TÍTULO VII BIS", None, "1.")])
+    assert only_bis.find("codigo civil", "TÍTULO VII") is None
+
+
+def test_find_does_not_descend_below_chapters(tree):
+    # Статьи ищутся только среди детей capitulo, если он указан
+    assert tree.find("codigo civil", "1902") is None
+    assert tree.text(tree.find("codigo civil", "TÍTULO XVI", "CAPÍTULO II", "1902")) == "1902."
+    # У penal нет capitulo: статьи — дети titulo
+    assert tree.text(tree.find("codigo penal", "TÍTULO II", "Artículo 31 bis")) == "Artículo 31 bis"
+
+
+def test_find_article_and_navigation(tree):
+    node = tree.find_article("codigo civil", "1445")
+    assert node is not None
+    assert tree.node(node)["row"] == 2
+    assert _texts(tree, tree.breadcrumb(node)) == ["codigo civil", "LIBRO IV", "TÍTULO IV", "CAPÍTULO II", "1445."]
+    assert tree.text(tree.sibling(node)) == "1446."
+    assert tree.sibling(node, -1) is None
+    bis = tree.find_article("codigo penal", "Artículo 31 bis")
+    assert tree.text(tree.sibling(bis, -1)) == "Artículo 31"
+    assert tree.find_article("codigo penal", "1902") is None
+    assert _texts(tree, tree.children_of(None)) == ["codigo civil", "codigo penal"]
@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+
+from text_preparation.text_utils.articles import content_hash
+from text_preparation.text_utils.incremental import changeset_actions, diff, hash_file, load_hashes
+
+
+def _article(number, text, notes=None, **fields):
+    article = {"book_name": "codigo civil", "libro": None, "titulo": "TÍTULO I", "capitulo": None,
+               "articulo": f"{number}.", "texto": text, **fields}
+    if notes is not None:
+        article["notas"] = notes
+    return article
+
+
+def _write(path, articles):
+    with open(path, "w", encoding="utf-8") as f:
+        for article in articles:
+            f.write(json.dumps(article, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+def test_hash_ignores_whitespace_but_not_notes():
+    base = _article(1, "Uno  dos\ntres", notes=["Redacción según Ley 1/2000"])
+    assert content_hash(base) == content_hash(_article(1, "Uno dos tres", notes=["Redacción según Ley 1/2000"]))
+    assert content_hash(base) != content_hash(_article(1, "Uno dos tres", notes=["Redacción según Ley 2/2020"]))
+    assert content_hash(_article(1, "x")) == content_hash(_article(1, "x", notes=[]))
+
+
+def test_fragments_sharing_an_id_are_merged(tmp_path):
+    path = _write(tmp_path / "a.ndjson", [_article(1, "Uno"), _article(2, "Primera parte"), _article(2, "segunda parte")])
+    hashes = hash_file(path)
+    assert sorted(hashes) == ["codigo_civil-1", "codigo_civil-2"]
+    assert len(hashes["codigo_civil-2"][1]) == 2
+    assert hashes["codigo_civil-2"][0] == content_hash(_article(2, "Primera parte segunda parte"))
+
+
+def test_change_in_a_later_fragment_is_detected(tmp_path):
+    old = _write(tmp_path / "old.ndjson", [_article(1, "Uno"), _article(2, "Primera parte"), _article(2, "segunda")])
+    new = _write(tmp_path / "new.ndjson", [_article(2, "Primera parte"), _article(2, "segunda, corregida"),
+                                           _article(3, "Tres")])
+    new_hashes = load_hashes(new)
+    changeset = diff(load_hashes(old), new_hashes)
+    assert changeset == {"added": ["codigo_civil-3"], "modified": ["codigo_civil-2"],
+                         "removed": ["codigo_civil-1"], "unchanged": 0}
+    actions = list(changeset_actions(changeset, new, new_hashes))
+    assert [(op, doc_id) for op, doc_id, _ in actions] == [
+        ("index", "codigo_civil-2"), ("index", "codigo_civil-3"), ("delete", "codigo_civil-1")]
+    assert actions[0][2]["texto"] == "Primera parte segunda, corregida"
+
+
+def test_stored_hashes_are_reused_until_the_file_changes(tmp_path):
+    path = _write(tmp_path / "a.ndjson", [_article(1, "Uno")])
+    first = load_hashes(path)
+    with open(path + ".hashes.json", encoding="utf-8") as f:
+        assert json.load(f)["version"] == 2
+    assert load_hashes(path) == first
+
+
+def test_import_does_not_load_the_es_client():
+    code = ("import sys, text_preparation.text_utils.incremental; "
+            "sys.exit('text_preparation.text_utils.es_bulk_loader' in sys.modules)")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
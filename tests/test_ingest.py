@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from text_preparation.text_utils.ingest import MANIFEST_DEFAULTS, ingest_document, load_manifest, part_path, publish
+from text_preparation.text_utils.style_rules import PROFILES
+
+
+def _write_manifest(tmp_path, documents, **settings):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(dict(settings, documents=documents), ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+CIVIL = {"book_name": "codigo civil", "pdf_path": "DATA/Codigo_Civil.pdf", "extractor": "bulk_civil"}
+PENAL = {"book_name": "codigo penal", "pdf_path": "DATA/codigo_penal.pdf", "extractor": "bulk_penal",
+         "style_profile": "penal"}
+
+
+def test_manifest_defaults_and_paths_relative_to_manifest(tmp_path):
+    manifest = load_manifest(_write_manifest(tmp_path, [CIVIL, PENAL], autocomplete="laws.autocomplete", workers=2))
+    assert manifest["output"] == str(tmp_path / MANIFEST_DEFAULTS["output"])
+    assert manifest["parts_dir"] == str(tmp_path / ".ingest_parts")
+    assert manifest["autocomplete"] == str(tmp_path / "laws.autocomplete")
+    assert manifest["columnar"] is None and manifest["span_cache_dir"] is None
+    assert (manifest["normalize"], manifest["fast"], manifest["workers"]) == (True, False, 2)
+    assert [document["book_name"] for document in manifest["documents"]] == ["codigo civil", "codigo penal"]
+    assert manifest["documents"][0]["pdf_path"] == str(tmp_path / "DATA" / "Codigo_Civil.pdf")
+
+
+@pytest.mark.parametrize("documents, message", [
+    ([dict(CIVIL, extractor=None)], "нет extractor"),
+    ([{"book_name": "codigo civil", "extractor": "bulk_civil"}], "нет pdf_path"),
+    ([dict(CIVIL, extractor="ocr")], "неизвестный экстрактор 'ocr'"),
+    ([dict(CIVIL, style_profile="mercantil")], "неизвестный профиль стилей 'mercantil'"),
+    ([CIVIL, dict(PENAL, book_name="codigo civil")], "встречается в манифесте дважды"),
+])
+def test_manifest_errors(tmp_path, documents, message):
+    with pytest.raises(ValueError, match=message):
+        load_manifest(_write_manifest(tmp_path, documents))
+
+
+def test_part_path_uses_slug(tmp_path):
+    assert part_path(str(tmp_path), "Código Penal") == str(tmp_path / "codigo_penal.ndjson")
+
+
+def test_publish_concatenates_in_manifest_order_and_skips_missing_parts(tmp_path):
+    manifest = load_manifest(_write_manifest(tmp_path, [CIVIL, PENAL, dict(CIVIL, book_name="ley hipotecaria")]))
+    os.makedirs(manifest["parts_dir"])
+    # Часть penal готова раньше civil, части ley hipotecaria нет вовсе
+    for book_name in ("codigo penal", "codigo civil"):
+        with open(part_path(manifest["parts_dir"], book_name), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"book_name": book_name, "articulo": "1."}, ensure_ascii=False) + "\n")
+    assert publish(manifest) == ["codigo civil", "codigo penal"]
+    with open(manifest["output"], encoding="utf-8") as f:
+        assert [json.loads(line)["book_name"] for line in f] == ["codigo civil", "codigo penal"]
+    assert sorted(os.listdir(tmp_path)) == [".ingest_parts", "all_laws.ndjson", "manifest.json"]
+
+
+def test_ingest_document_writes_part_atomically(pdf_path, tmp_path, monkeypatch):
+    # Тестовый PDF набран Helvetica: статьи — спаны 11 pt, колонтитулы (9 pt) не подходят
+    monkeypatch.setitem(PROFILES, "test", [
+        {"level": "articulo", "font_contains": "Helv", "size": 11, "tol": 0.2, "pattern": r"Artículo \d+"},
+    ])
+    document = {"book_name": "codigo penal", "pdf_path": pdf_path, "extractor": "draft_penal", "style_profile": "test"}
+    parts_dir = str(tmp_path / "parts")
+    os.makedirs(parts_dir)
+    result = ingest_document(document, parts_dir)
+    assert result["part"] == part_path(parts_dir, "codigo penal")
+    assert os.listdir(parts_dir) == ["codigo_penal.ndjson"]
+    with open(result["part"], encoding="utf-8") as f:
+        articles = [json.loads(line) for line in f]
+    assert result["articles"] == len(articles) == 5
+    assert articles[0]["book_name"] == "codigo penal"
+    assert articles[0]["articulo"].startswith("Artículo 1.")
+    # С кэшем спанов часть та же, и холодный, и тёплый прогон
+    with open(result["part"], "rb") as f:
+        expected = f.read()
+    for _ in range(2):
+        ingest_document(document, parts_dir, span_cache_dir=str(tmp_path / "cache"))
+        with open(result["part"], "rb") as f:
+            assert f.read() == expected
@@ -0,0 +1,71 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from text_preparation.text_utils import instrumentation
+from text_preparation.text_utils.instrumentation import Histogram, Metrics
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    with metrics.timer("classify"), metrics.page(0, 10):
+        pass
+    assert list(metrics.pages([(0, [1, 2])])) == [(0, [1, 2])]
+    assert metrics.snapshot()["stages"] == {}
+    assert metrics.snapshot()["counters"] == {}
+
+
+def test_histogram_buckets():
+    histogram = Histogram((0, 10, 50))
+    for value in (0, 3, 10, 11, 400):
+        histogram.observe(value)
+    assert histogram.to_dict() == {"buckets": {"0": 1, "10": 2, "50": 1, "+Inf": 1}, "sum": 424, "count": 5}
+
+
+def test_pages_stages_and_slow_log(monkeypatch, tmp_path):
+    monkeypatch.setattr(instrumentation, "slow_page_ms", 0.0)
+    metrics = Metrics().configure(metrics_path=str(tmp_path / "metrics.json"))
+    for page_num, spans in metrics.pages([(0, ["a"] * 3), (1, []), (2, ["b"] * 30)], 3):
+        with metrics.timer("classify"):
+            pass
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["classify"]["calls"] == 3
+    assert snapshot["stages"]["page"]["calls"] == 3
+    assert snapshot["counters"] == {"pages": 3, "spans": 33}
+    assert snapshot["histograms"]["spans_per_page"]["buckets"]["0"] == 1
+    assert snapshot["histograms"]["spans_per_page"]["buckets"]["50"] == 1
+    assert sorted(entry["page"] for entry in snapshot["slow_pages"]) == [0, 1, 2]
+
+    metrics.finish()
+    with open(tmp_path / "metrics.json", encoding="utf-8") as f:
+        assert json.load(f)["counters"] == {"pages": 3, "spans": 33}
+
+
+def test_prometheus_text(tmp_path):
+    metrics = Metrics().configure(metrics_path=str(tmp_path / "metrics.prom"))
+    list(metrics.pages([(0, ["a", "b"])]))
+    text = metrics.prometheus_text()
+    assert 'legal_bot_stage_calls_total{stage="page"} 1' in text
+    assert "legal_bot_spans_total 2" in text
+    assert 'legal_bot_spans_per_page_bucket{le="+Inf"} 1' in text
+    metrics.finish()
+    assert (tmp_path / "metrics.prom").read_text(encoding="utf-8") == metrics.prometheus_text()
+
+
+def test_metrics_endpoint_listens_on_localhost_only():
+    metrics = Metrics()
+    metrics.enabled = True
+    server = metrics.serve(0)
+    try:
+        host, port = server.server_address[:2]
+        assert host == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "legal_bot_stage_seconds_total" in response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other", timeout=5)
+    finally:
+        metrics.finish()
+    assert metrics._server is None
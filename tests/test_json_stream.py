@@ -0,0 +1,87 @@
+import io
+import json
+
+import pytest
+
+from text_preparation.text_utils import json_stream
+from text_preparation.text_utils.json_stream import (JsonArrayWriter, NdjsonWriter, iter_json_array, iter_ndjson_offsets,
+                                                     iter_records, read_record_at)
+
+ITEMS = [1.25, 1.5e10, -3, 0, True, None, "a, ] \"b\"", {"articulo": "1.", "size": 9.5, "notas": []}, [1, [2.0e-3]], 17]
+TEXT = json.dumps(ITEMS, ensure_ascii=False, indent=2)
+
+
+class _SplitReader:
+    """Отдаёт текст двумя кусками, разрезанными в позиции split, дальше — по chunk_size."""
+
+    def __init__(self, text, split):
+        self.parts = [text[:split], text[split:]]
+
+    def read(self, size):
+        while self.parts:
+            part = self.parts.pop(0)
+            if part:
+                if len(part) > size:
+                    self.parts.insert(0, part[size:])
+                return part[:size]
+        return ""
+
+
+@pytest.mark.parametrize("text", [TEXT, json.dumps(ITEMS, separators=(",", ":"))], ids=["indent", "compact"])
+def test_values_split_at_every_offset(text):
+    for split in range(len(text) + 1):
+        assert list(iter_json_array(_SplitReader(text, split))) == ITEMS, split
+
+
+def test_chunk_size_one():
+    assert list(iter_json_array(io.StringIO(TEXT), chunk_size=1)) == ITEMS
+    assert list(iter_json_array(io.StringIO("[1.5e10]"), chunk_size=1)) == [1.5e10]
+    assert list(iter_json_array(io.StringIO(" [ ] "), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize("text, error", [
+    ("{}", "ожидался JSON-массив"),
+    ("[1, 2", "неожиданный конец"),
+    ("[1.2x]", "ожидалась запятая"),
+])
+def test_malformed_arrays(text, error):
+    with pytest.raises(ValueError, match=error):
+        list(iter_json_array(io.StringIO(text), chunk_size=2))
+
+
+def test_array_writer_matches_json_dump():
+    out = io.StringIO()
+    with JsonArrayWriter(out) as writer:
+        for item in ITEMS:
+            writer.write(item)
+    assert out.getvalue() == TEXT
+    empty = io.StringIO()
+    JsonArrayWriter(empty).close()
+    assert empty.getvalue() == "[]"
+
+
+def test_iter_records_reads_both_formats(tmp_path, monkeypatch):
+    array_path = tmp_path / "structure.json"
+    array_path.write_text("\n  " + TEXT, encoding="utf-8")
+    ndjson_path = tmp_path / "laws.ndjson"
+    with open(ndjson_path, "w", encoding="utf-8") as f, NdjsonWriter(f) as writer:
+        for item in ITEMS:
+            writer.write(item)
+        f.write("\n")
+    assert list(iter_records(str(array_path))) == ITEMS
+    assert list(iter_records(str(ndjson_path))) == ITEMS
+
+    # Каждая граница куска внутри массива при чтении через iter_records
+    for chunk_size in range(1, 12):
+        monkeypatch.setattr(json_stream, "iter_json_array",
+                            lambda f, chunk_size=chunk_size: iter_json_array(f, chunk_size))
+        assert list(iter_records(str(array_path))) == ITEMS, chunk_size
+
+
+def test_ndjson_offsets(tmp_path):
+    path = tmp_path / "laws.ndjson"
+    path.write_text("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in ITEMS), encoding="utf-8")
+    offsets = list(iter_ndjson_offsets(str(path)))
+    assert [record for _, record in offsets] == ITEMS
+    with open(path, "rb") as f:
+        assert [read_record_at(f, offset) for offset, _ in reversed(offsets)] == ITEMS[::-1]
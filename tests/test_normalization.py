@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+from text_preparation.text_utils.json_stream import NdjsonWriter
+from text_preparation.text_utils.normalization import NormalizedWriter, normalize_article, normalize_text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("La ley  es\n siem- pre obligatoria.", "La ley es siempre obligatoria."),
+    ("los represen- 26 tantes legales", "los representantes legales"),
+    ("come\xad tidos por el Decre\xadto", "cometidos por el Decreto"),
+    ("más. \xad 2. Los", "más. 2. Los"),
+    ("Derecho Internacional 4 . Otra frase", "Derecho Internacional. Otra frase"),
+    # Без существительного и со строчной — не примечание, а текст статьи
+    ("El plazo de 5 derogado es raro.", "El plazo de 5 derogado es raro."),
+])
+def test_text_cleanup(text, expected):
+    assert normalize_text(text) == (expected, [])
+
+
+def test_boe_notes_are_moved_out():
+    text, notes = normalize_text("Texto del artículo. 7 Artículo redactado por la Ley 13/2005, de 1 de julio. "
+                                 "Sigue el texto.")
+    assert text == "Texto del artículo. Sigue el texto."
+    assert notes == ["Artículo redactado por la Ley 13/2005, de 1 de julio."]
+    # Номер страницы сразу после примечания уходит вместе с ним
+    assert normalize_text("Texto. 5 Redactado conforme a la Ley 1/2000. 12 Sigue") == (
+        "Texto. Sigue", ["Redactado conforme a la Ley 1/2000."])
+
+
+def test_note_inside_hyphenated_word():
+    assert normalize_text("la inte- 104 Redactado por la Ley 3/2010. 77 grarlos") == (
+        "la integrarlos", ["Redactado por la Ley 3/2010."])
+
+
+def test_normalize_article_keeps_field_and_adds_notes():
+    article = {"articulo": "1", "text": "a  b 3 Apartado añadido por la Ley 5/2010."}
+    assert normalize_article(article) == {"articulo": "1", "text": "a b", "notas": ["Apartado añadido por la Ley 5/2010."]}
+    assert article["text"].startswith("a  b")
+    assert normalize_article({"texto": None}) == {"texto": "", "notas": []}
+
+
+def test_normalized_writer():
+    out = io.StringIO()
+    with NormalizedWriter(NdjsonWriter(out)) as sink:
+        sink.write({"articulo": "2", "texto": "siem- pre"})
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [
+        {"articulo": "2", "texto": "siempre", "notas": []}]
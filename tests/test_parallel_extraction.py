@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("fitz")
+
+from text_preparation.text_utils import parallel_extraction  # noqa: E402
+from text_preparation.text_utils import span_cache as span_cache_module  # noqa: E402
+from text_preparation.text_utils.parallel_extraction import iter_pages_parallel  # noqa: E402
+from text_preparation.text_utils.span_cache import SpanCache  # noqa: E402
+from text_preparation.text_utils.text_extraction import iter_pages  # noqa: E402
+
+
+def _texts(pages):
+    return [(page_num, [span["text"] for span in spans]) for page_num, spans in pages]
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_pool_matches_sequential_extraction(pdf_path, fast):
+    pages = list(iter_pages_parallel(pdf_path, workers=2, shard_size=2, fast=fast))
+    assert _texts(pages) == _texts(iter_pages(pdf_path, fast=fast))
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_warm_cache_skips_pool_and_pdf(pdf_path, tmp_path, monkeypatch, fast):
+    cache_dir = str(tmp_path / "cache")
+    cold_cache = SpanCache(cache_dir)
+    cold = list(iter_pages_parallel(pdf_path, workers=2, shard_size=2, cache=cold_cache, fast=fast))
+    assert _texts(cold) == _texts(iter_pages(pdf_path, fast=fast))
+    assert (cold_cache.hits, cold_cache.misses) == (0, 5)
+    assert cold_cache.written > 0
+
+    def fail(*args, **kwargs):
+        raise AssertionError("PDF открыт или запущен пул при тёплом кэше")
+    monkeypatch.setattr(parallel_extraction, "open_pdf", fail)
+    monkeypatch.setattr(parallel_extraction, "ProcessPoolExecutor", fail)
+    monkeypatch.setattr(span_cache_module, "open_pdf", fail)
+    monkeypatch.setattr(span_cache_module, "pdf_page_count", fail)
+    cache = SpanCache(cache_dir)
+    assert list(iter_pages_parallel(pdf_path, workers=2, shard_size=2, cache=cache, fast=fast)) == cold
+    assert (cache.hits, cache.misses) == (5, 0)
+
+
+def test_partial_cache_takes_page_count_from_metadata(pdf_path, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    list(SpanCache(cache_dir).iter_pages(pdf_path, 0, 2))
+    monkeypatch.setattr(parallel_extraction, "open_pdf", lambda *args: pytest.fail("родитель открыл PDF"))
+    cache = SpanCache(cache_dir)
+    pages = list(iter_pages_parallel(pdf_path, workers=2, shard_size=2, cache=cache))
+    assert _texts(pages) == _texts(iter_pages(pdf_path))
+    assert (cache.hits, cache.misses) == (2, 3)
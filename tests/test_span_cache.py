@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from text_preparation.text_utils import span_cache as span_cache_module  # noqa: E402
+from text_preparation.text_utils.span_cache import SpanCache  # noqa: E402
+from text_preparation.text_utils.text_extraction import iter_pages  # noqa: E402
+
+
+def _texts(pages):
+    return [[span["text"] for span in spans] for _, spans in pages]
+
+
+def test_warm_cache_does_not_open_the_pdf(pdf_path, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    cold = list(SpanCache(cache_dir).iter_pages(pdf_path, fast=True))
+    assert _texts(cold) == _texts(iter_pages(pdf_path, fast=True))
+
+    def fail(*args):
+        raise AssertionError("PDF открыт при тёплом кэше")
+    monkeypatch.setattr(span_cache_module, "open_pdf", fail)
+    monkeypatch.setattr(span_cache_module, "pdf_page_count", fail)
+    monkeypatch.setattr(span_cache_module, "fast_text_flags", fail)
+    cache = SpanCache(cache_dir)
+    assert cache.is_complete(pdf_path, fast=True)
+    assert not cache.is_complete(pdf_path, fast=False)
+    assert list(cache.iter_pages(pdf_path, fast=True)) == cold
+    assert (cache.hits, cache.misses) == (5, 0)
+
+
+def test_fast_key_includes_clip_and_flags(pdf_path, tmp_path):
+    cache = SpanCache(str(tmp_path / "cache"))
+    list(cache.iter_pages(pdf_path, fast=True))
+    list(cache.iter_pages(pdf_path, fast=True, body_clip=(0, 0, 600, 900)))
+    list(cache.iter_pages(pdf_path))
+    assert (cache.hits, cache.misses) == (0, 15)
+    learned, text_flags = cache.fast_settings(pdf_path)
+    assert learned is not None
+    modes = sorted(os.listdir(os.path.join(cache.cache_dir, cache.pdf_hash(pdf_path))))
+    assert f"v1-{SpanCache.mode_key(True, learned, text_flags)}" in modes
+    assert "v1-dict" in modes
+    assert SpanCache.mode_key(True, learned, text_flags) != SpanCache.mode_key(True, None, text_flags)
+    assert SpanCache.mode_key(True, learned, text_flags) != SpanCache.mode_key(True, learned, text_flags ^ 1)
+
+
+@pytest.mark.parametrize("damage", [b"", b"garbage", None], ids=["empty", "garbage", "truncated"])
+def test_corrupt_entry_is_a_miss_and_is_replaced(pdf_path, tmp_path, damage):
+    cache = SpanCache(str(tmp_path / "cache"))
+    expected = list(cache.iter_pages(pdf_path))
+    path = cache._page_path(cache.pdf_hash(pdf_path), 2, "dict")
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2] if damage is None else damage)
+
+    cache = SpanCache(cache.cache_dir)
+    assert cache.get(cache.pdf_hash(pdf_path), 2) is None
+    assert not os.path.exists(path)
+    assert list(cache.iter_pages(pdf_path)) == expected
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_size_is_not_scanned_on_construction(pdf_path, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    list(SpanCache(cache_dir).iter_pages(pdf_path))
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(span_cache_module.os, "walk", lambda *args: walks.append(args) or real_walk(*args))
+
+    cache = SpanCache(cache_dir, total_bytes=1000)
+    list(cache.iter_pages(pdf_path))
+    assert walks == []
+    list(cache.iter_pages(pdf_path, fast=True))
+    assert walks == []
+    assert cache.total_bytes == 1000 + cache.written
+
+    cache = SpanCache(cache_dir)
+    assert walks == []
+    size = cache.total_bytes
+    assert len(walks) == 1 and size > 0
+
+
+def test_eviction_keeps_cache_under_limit(pdf_path, tmp_path):
+    cache = SpanCache(str(tmp_path / "cache"), max_bytes=1)
+    assert len(list(cache.iter_pages(pdf_path))) == 5
+    # Каждая запись больше предела и вытесняется следующим же evict()
+    assert cache.evictions == 5
+    assert cache.stats()["bytes"] == cache.total_bytes == 0
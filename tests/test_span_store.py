@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from text_preparation.text_utils.span_store import SpanStore, classified_pages, classify_store
+from text_preparation.text_utils.style_rules import classifier_for
+
+
+def _span(text, font="AvenirLTStd-Roman", size=9.5, order=0):
+    return {"text": text, "font": font, "size": size, "color": 0, "bbox": (1.0, 2.0, 3.0, 4.0), "order": order}
+
+
+PAGES = [
+    (0, [_span("LIBRO PRIMERO ", size=10.5), _span("TÍTULO I", font="AvenirLTStd-Heavy", order=1)]),
+    (1, []),
+    (2, [_span(" 17. ", font="AvenirLTStd-Heavy"), _span("Texto del artículo ñ.", order=1),
+         _span("CAPÍTULO II", order=2)]),
+]
+
+
+def test_round_trip(tmp_path):
+    store = SpanStore.from_pages(PAGES)
+    assert (len(store), store.page_count, store.fonts) == (5, 3, ["AvenirLTStd-Roman", "AvenirLTStd-Heavy"])
+    path = str(tmp_path / "doc.spans")
+    store.save(path)
+    loaded = SpanStore.load(path)
+    assert loaded.fonts == store.fonts
+    assert loaded.page_range(1) == (2, 2)
+    assert [loaded.text(i) for i in range(len(loaded))] == [span["text"] for _, spans in PAGES for span in spans]
+    assert loaded.to_dicts(2, 3) == [{"text": " 17. ", "font": "AvenirLTStd-Heavy", "size": 9.5, "color": 0,
+                                      "bbox": [1.0, 2.0, 3.0, 4.0]}]
+
+
+def test_pages_with_gaps_are_padded():
+    store = SpanStore.from_pages([(2, [_span("a")])])
+    assert store.page_count == 3
+    assert [store.page_range(page_num) for page_num in range(3)] == [(0, 0), (0, 0), (0, 1)]
+
+
+def test_classify_store_matches_classify():
+    classifier = classifier_for("civil")
+    store = SpanStore.from_pages(PAGES)
+    levels = classify_store(classifier, store)
+    assert levels.tolist() == [0, 1, 3, -1, 2]
+    assert np.array_equal(classify_store(classifier, store, 2, 4), levels[2:4])
+
+
+def test_classified_pages_are_the_same_for_store_and_spans():
+    classifier = classifier_for("civil")
+    from_spans = list(classified_pages(iter(PAGES), classifier))
+    assert from_spans == list(classified_pages(SpanStore.from_pages(PAGES), classifier))
+    assert from_spans[2] == (2, [("17.", "articulo"), ("Texto del artículo ñ.", None), ("CAPÍTULO II", "capitulo")])
+
+
+def test_span_cache_keeps_one_store_per_document(pdf_path, tmp_path, monkeypatch):
+    from text_preparation.text_utils import span_cache as span_cache_module
+    from text_preparation.text_utils.span_cache import SpanCache
+    from text_preparation.text_utils.text_extraction import iter_pages
+
+    cache = SpanCache(str(tmp_path / "cache"))
+    store = cache.span_store(pdf_path, fast=True)
+    expected = list(iter_pages(pdf_path, fast=True))
+    assert [store.text(i) for i in range(len(store))] == [span["text"] for _, spans in expected for span in spans]
+    assert (cache.hits, cache.misses) == (0, 5)
+
+    def fail(*args):
+        raise AssertionError("PDF открыт при тёплом кэше")
+    monkeypatch.setattr(span_cache_module, "open_pdf", fail)
+    monkeypatch.setattr(span_cache_module, "fast_text_flags", fail)
+    warm = SpanCache(cache.cache_dir)
+    assert warm.span_store(pdf_path, fast=True, pages=fail).page_count == 5
+    assert (warm.hits, warm.misses) == (5, 0)
+
+    # Испорченный файл хранилища собирается заново из записей по страницам
+    path = warm._store_path(warm.pdf_hash(pdf_path), warm.mode_key(True, *warm.fast_settings(pdf_path)))
+    with open(path, "wb") as f:
+        f.write(b"garbage")
+    rebuilt = SpanCache(cache.cache_dir).span_store(pdf_path, fast=True)
+    assert [rebuilt.text(i) for i in range(len(rebuilt))] == [store.text(i) for i in range(len(store))]
@@ -0,0 +1,93 @@
+import pytest
+
+from text_preparation.text_utils.style_profiler import _histograms, _missing_levels, _Sample, compare, profile_pdf, propose_profile
+from text_preparation.text_utils.style_rules import PROFILES
+
+ROMAN, HEAVY = "AvenirLTStd-Roman", "AvenirLTStd-Heavy"
+
+
+def _span(font, size, text):
+    return {"font": font, "size": size, "text": text}
+
+
+def _page(page_num):
+    """Страница в стиле civil: жирные номера статей 9.5 (первый — 9.64) и нумерованные абзацы в тексте."""
+    spans = [_span(ROMAN, 10.5, "LIBRO PRIMERO")] if page_num % 2 == 0 else []
+    spans += [_span(HEAVY, 9.5, "TÍTULO I"), _span(ROMAN, 9.5, "CAPÍTULO II")]
+    for i in range(3):
+        number = page_num * 3 + i + 1
+        spans += [_span(HEAVY, 9.64 if i == 0 else 9.5, f"{number}."),
+                  _span(ROMAN, 9.0, "El texto del artículo."), _span(ROMAN, 9.0, "1. Un apartado numerado."),
+                  _span(ROMAN, 9.0, "   ")]
+    return spans
+
+
+@pytest.fixture
+def sample():
+    sample = _Sample()
+    for page_num in range(6):
+        sample.add_page(page_num, _page(page_num))
+    return sample
+
+
+def test_index_pages_are_skipped(sample):
+    sample.add_page(6, [_span(ROMAN, 8.0, f"CAPÍTULO {i}") for i in range(8)])
+    assert sample.index_pages == [6]
+    assert sample.sampled == list(range(7))
+    assert 6 not in sample.pages and (ROMAN, 8.0) not in sample.styles
+
+
+def test_histograms(sample):
+    totals, matches, page_counts = _histograms(sample)
+    heavy, roman = sample.styles[(HEAVY, 9.5)], sample.styles[(ROMAN, 9.0)]
+    # Пустые спаны не учитываются; TÍTULO и два номера статей на странице — один стиль
+    assert totals[heavy] == 18 and totals[roman] == 36
+    articulo = 4   # HEADING_PATTERNS: r"\d+\."
+    assert (matches[articulo, heavy], page_counts[articulo, heavy]) == (12, 6)
+    # Три абзаца "1." на странице — три совпадения, но одна страница
+    assert (matches[articulo, roman], page_counts[articulo, roman]) == (18, 6)
+    assert matches[0, sample.styles[(ROMAN, 10.5)]] == page_counts[0, sample.styles[(ROMAN, 10.5)]] == 3
+    assert _missing_levels(sample) == set()
+    assert _missing_levels(_Sample()) == {"libro", "titulo", "capitulo", "articulo"}
+
+
+def test_propose_profile(sample):
+    rules, report = propose_profile(sample)
+    assert rules == [
+        {"level": "libro", "font": ROMAN, "size": 10.5, "tol": 0.2, "pattern": r"LIBRO\b"},
+        {"level": "titulo", "font": HEAVY, "size": 9.5, "tol": 0.2, "pattern": r"TÍTULO\b"},
+        {"level": "capitulo", "font": ROMAN, "size": 9.5, "tol": 0.2, "pattern": r"CAPÍTULO\b"},
+        # Номера 9.5 и 9.64 сливаются в полосу, абзацы основного текста ("1.") проигрывают
+        {"level": "articulo", "font": HEAVY, "size_range": (9.45, 9.69), "bounds": "[]", "pattern": r"\d+\."},
+    ]
+    assert report["libro"]["confidence"] == 1.0
+    assert report["articulo"]["pages"] == 12 and report["articulo"]["matches"] == 18
+    assert 0.5 < report["articulo"]["confidence"] < 1.0
+    assert [candidate["font"] for candidate in report["articulo"]["candidates"]][-1] == ROMAN
+
+
+def test_proposed_profile_agrees_with_manual_civil_profile(sample):
+    rules, _ = propose_profile(sample)
+    agreement = compare(rules, PROFILES["civil"], sample.spans)
+    assert all(counts["reference"] == counts["agree"] for counts in agreement.values())
+    assert agreement["articulo"] == {"reference": 18, "proposed": 18, "agree": 18}
+
+
+def test_missing_level_has_zero_confidence():
+    sample = _Sample()
+    sample.add_page(0, [_span(HEAVY, 9.5, "17."), _span(ROMAN, 9.0, "Texto.")])
+    rules, report = propose_profile(sample)
+    assert [rule["level"] for rule in rules] == ["articulo"]
+    assert report["libro"] == {"confidence": 0.0, "pages": 0, "matches": 0, "candidates": []}
+    # Одна страница из min_pages — уверенность снижена
+    assert report["articulo"]["confidence"] == pytest.approx(1 / 3, abs=1e-3)
+
+
+def test_profile_pdf(pdf_path):
+    result = profile_pdf(pdf_path, pages=3)
+    assert result["rules"] == [
+        {"level": "articulo", "font": "Helvetica", "size": 11.0, "tol": 0.2, "pattern": r"(?:Artículo|ARTÍCULO)\s+\d+"},
+    ]
+    assert (result["page_count"], result["sampled_pages"]) == (5, 3)
+    # Колонтитул и номера страниц отрезаны быстрым режимом и в выборку не попали
+    assert [text for _, _, text in result["sample"]] == [f"Artículo {n}. Texto del artículo número {n}." for n in (1, 3, 5)]
@@ -0,0 +1,51 @@
+import pytest
+
+from text_preparation.text_utils.instrumentation import metrics
+from text_preparation.text_utils.style_rules import StyleClassifier, classifier_for
+
+
+def _span(text, font="AvenirLTStd-Roman", size=9.5):
+    return {"text": text, "font": font, "size": size}
+
+
+PAGE = [
+    _span(" LIBRO PRIMERO ", size=10.5),
+    _span("TÍTULO I", font="AvenirLTStd-Heavy"),
+    _span("CAPÍTULO II"),
+    _span("17. ", font="AvenirLTStd-Heavy"),
+    _span("17.", font="AvenirLTStd-Heavy", size=9.7),
+    _span("Texto del artículo."),
+    _span("LIBRO", size=12.0),
+]
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.enabled = True
+    metrics.reset()
+    yield metrics
+    metrics.enabled = False
+    metrics.reset()
+
+
+def test_rules_priority_and_bounds():
+    classifier = classifier_for("civil")
+    assert classifier.classify_page(PAGE) == ["libro", "titulo", "capitulo", "articulo", "articulo", None, None]
+    assert classifier.classify("AvenirLTStd-Heavy", 9.75, "17.") == "articulo"
+    assert classifier.classify("AvenirLTStd-Heavy", 9.76, "17.") is None
+
+
+def test_ignore_case_and_font_contains():
+    classifier = classifier_for("civil_bulk")
+    assert classifier.classify("AvenirLTStd-Light", 9.5, "título preliminar") == "titulo"
+    first = StyleClassifier([{"level": "capitulo", "font_contains": "Avenir", "size": 9.5, "tol": 0.1, "pattern": r"C"},
+                             {"level": "articulo", "font_contains": "Avenir", "size": 9.5, "tol": 0.1, "pattern": r"CA"}])
+    assert first.classify("AvenirLTStd-Roman", 9.5, "CAPÍTULO") == "capitulo"
+
+
+def test_classify_page_matches_classify_and_times_pages(enabled_metrics):
+    classifier = classifier_for("civil")
+    for _ in range(3):
+        levels = classifier.classify_page(PAGE)
+    assert levels == [classifier.classify(span["font"], span["size"], span["text"].strip()) for span in PAGE]
+    assert enabled_metrics.calls["classify"] == 3
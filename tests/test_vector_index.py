@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+
+from text_preparation.text_utils.vector_index import HashingSvdEncoder, VectorIndex
+
+TEXTS = [
+    "El que por acción u omisión causa daño a otro, interviniendo culpa o negligencia, está obligado a reparar el daño.",
+    "La obligación de reparar el daño causado es exigible por los actos propios y por los de aquellas personas.",
+    "El que matare a otro será castigado, como reo de homicidio, con la pena de prisión de diez a quince años.",
+    "Los contratos serán obligatorios, cualquiera que sea la forma en que se hayan celebrado.",
+    "La compraventa se perfecciona cuando se convienen la cosa y el precio.",
+    "El arrendamiento de obras o servicios puede contratarse con o sin tiempo fijo.",
+    "El que con violencia o intimidación se apoderare de cosa mueble ajena será castigado por robo.",
+]
+
+
+def _corpus(tmp_path):
+    path = tmp_path / "laws.ndjson"
+    with open(path, "w", encoding="utf-8") as f:
+        for number, text in enumerate(TEXTS, 1):
+            f.write(json.dumps({"book_name": "codigo civil", "articulo": f"{number}.", "texto": text},
+                               ensure_ascii=False) + "\n")
+            if number == 3:
+                f.write("\n")   # пустые строки пропускаются
+    return str(path)
+
+
+def test_streamed_batches_give_the_same_index(tmp_path):
+    path = _corpus(tmp_path)
+    encoder = HashingSvdEncoder(n_features=256, dim=4).fit(TEXTS)
+    whole = VectorIndex.build(path, encoder, batch=256, n_lists=2)
+    streamed = VectorIndex.build(path, encoder, directory=str(tmp_path / "index"), batch=3, n_lists=2)
+    assert streamed.ids == whole.ids == [f"codigo_civil-{number}" for number in range(1, 8)]
+    assert np.allclose(streamed.vectors, whole.vectors, atol=1e-5)
+    assert np.array_equal(streamed.doc_offsets, whole.doc_offsets)
+
+
+def test_saved_index_finds_and_reads_articles(tmp_path):
+    path = _corpus(tmp_path)
+    directory = str(tmp_path / "index")
+    index = VectorIndex.build(path, HashingSvdEncoder(n_features=256, dim=4).fit(TEXTS), directory=directory,
+                              n_lists=2)
+    index.save(directory)
+    loaded = VectorIndex.load(directory)
+    row, doc_id, _ = loaded.search(TEXTS[4], k=1, nprobe=2)[0]
+    assert doc_id == "codigo_civil-5"
+    assert loaded.documents([row])[0]["texto"] == TEXTS[4]
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+import shutil
+
+import pytest
+
+from text_preparation.text_utils import watch_service
+from text_preparation.text_utils.ingest import part_path
+from text_preparation.text_utils.style_rules import PROFILES
+from text_preparation.text_utils.watch_service import WatchService
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(watch_service.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def layout(tmp_path, monkeypatch):
+    """Каталог DATA с одним PDF и манифест с ним; статьи тестового PDF — спаны Helvetica 11 pt."""
+    monkeypatch.setitem(PROFILES, "test", [
+        {"level": "articulo", "font_contains": "Helv", "size": 11, "tol": 0.2, "pattern": r"Artículo \d+"},
+    ])
+    (tmp_path / "DATA").mkdir()
+    manifest = {"output": "laws.ndjson", "parts_dir": "parts", "documents": [
+        {"book_name": "codigo penal", "pdf_path": "DATA/penal.pdf", "extractor": "draft_penal", "style_profile": "test"},
+    ]}
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    return tmp_path
+
+
+def _service(layout, settle_seconds=2.0):
+    return WatchService(str(layout / "manifest.json"), str(layout / "DATA"), max_jobs=1, settle_seconds=settle_seconds)
+
+
+def _write(path, data, mtime):
+    with open(path, "wb") as f:
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_pdf_is_queued_only_after_it_settles(layout, clock):
+    service = _service(layout)
+    pdf = layout / "DATA" / "penal.pdf"
+    _write(pdf, b"%PDF-1", 100)
+    service.scan()
+    assert service.queue.qsize() == 0 and service.status()["settling"] == [str(pdf)]
+    # Файл ещё дописывается: таймер дебаунса начинается заново
+    clock.now += 1.5
+    _write(pdf, b"%PDF-1.7", 101)
+    service.scan()
+    clock.now += 1.5
+    service.scan()
+    assert service.queue.qsize() == 0
+    clock.now += 1.0
+    service.scan()
+    assert service.queue.qsize() == 1 and service.status()["settling"] == []
+    job = service.queue.get_nowait()
+    assert job["book_name"] == "codigo penal"
+    assert job["document"]["pdf_path"] == str(pdf)
+
+
+def test_unchanged_pdf_is_not_queued_twice(layout, clock):
+    service = _service(layout, settle_seconds=0)
+    pdf = layout / "DATA" / "penal.pdf"
+    _write(pdf, b"%PDF-1", 100)
+    for _ in range(4):
+        service.scan()
+    assert service.queue.qsize() == 1
+    # Пока задание в очереди, новое изменение его не дублирует
+    _write(pdf, b"%PDF-1.7", 200)
+    service.scan()
+    service.scan()
+    assert service.queue.qsize() == 1
+    service.queue.get_nowait()
+    service._queued.clear()
+    _write(pdf, b"%PDF-1.7 new", 300)
+    service.scan()
+    service.scan()
+    assert service.queue.qsize() == 1
+
+
+def test_unmanaged_and_up_to_date_pdfs_are_skipped(layout, clock):
+    service = _service(layout, settle_seconds=0)
+    _write(layout / "DATA" / "ley_hipotecaria.pdf", b"%PDF-1", 100)
+    _write(layout / "DATA" / "penal.pdf", b"%PDF-1", 100)
+    os.utime(layout / "manifest.json", (100, 100))
+    os.makedirs(layout / "parts")
+    _write(part_path(str(layout / "parts"), "codigo penal"), b"{}\n", 200)
+    service.scan()
+    service.scan()
+    assert service.queue.qsize() == 0
+    assert service.status()["unmanaged"] == [str(layout / "DATA" / "ley_hipotecaria.pdf")]
+    # Изменение PDF после извлечения ставит кодекс в очередь
+    _write(layout / "DATA" / "penal.pdf", b"%PDF-1.7", 300)
+    service.scan()
+    service.scan()
+    assert service.queue.qsize() == 1
+
+
+def test_worker_reingests_and_publishes(layout, pdf_path):
+    service = _service(layout, settle_seconds=0)
+    shutil.copy(pdf_path, layout / "DATA" / "penal.pdf")
+
+    async def run():
+        service.scan()
+        service.scan()
+        assert service.queue.qsize() == 1
+        # Без пула процессов run_in_executor берёт пул потоков по умолчанию
+        worker = asyncio.create_task(service.worker())
+        await asyncio.wait_for(service.queue.join(), 30)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    asyncio.run(run())
+    status = service.status()
+    job, = status["jobs"]
+    assert (job["book_name"], job["status"], job["articles"]) == ("codigo penal", "ok", 5)
+    assert status["running"] == [] and status["queue_depth"] == 0
+    assert status["latency_seconds"]["count"] == 1
+    with open(layout / "laws.ndjson", encoding="utf-8") as f:
+        assert [json.loads(line)["articulo"][:11] for line in f] == [f"Artículo {n}." for n in range(1, 6)]
+
+
+def test_failed_job_is_recorded_and_service_survives(layout):
+    service = _service(layout, settle_seconds=0)
+    _write(layout / "DATA" / "penal.pdf", b"not a pdf", 100)
+
+    async def run():
+        service.scan()
+        service.scan()
+        worker = asyncio.create_task(service.worker())
+        await asyncio.wait_for(service.queue.join(), 30)
+        assert not worker.done()
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    asyncio.run(run())
+    job, = service.status()["jobs"]
+    assert job["status"] == "error" and job["error"]
+    assert not os.path.exists(layout / "laws.ndjson")
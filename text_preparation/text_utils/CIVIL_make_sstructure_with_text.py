@@ -1,30 +1,28 @@
-import fitz  # PyMuPDF
-import json
-import re
+from .instrumentation import metrics
+from .json_stream import writer_for
+from .normalization import NormalizedWriter
+from .span_store import classified_pages
+from .style_rules import classifier_for
+from .text_extraction import iter_pages
 
 pdf_path = '../../DATA/Codigo_Civil.pdf'
 output_path = 'structure_with_text.json'
+output_format = "json"  # "json" (массив, как раньше) или "ndjson"
 
-STYLE_LIBRO = {"font": "AvenirLTStd-Roman", "size": 10.5}
-STYLE_TITULO = {"font": "AvenirLTStd-Heavy", "size": 9.5}
-STYLE_CAPITULO = {"font": "AvenirLTStd-Roman", "size": 9.5}
+style_profile = "civil"  # профиль стилей из style_rules.PROFILES
+metrics_path = None      # файл метрик: *.json или *.prom (None — без метрик)
+normalize = True         # переносы, примечания BOE -> "notas", пробелы (normalization.py)
+fast_extraction = False  # без колонтитулов и картинок (text_extraction.iter_pages, fast)
 
-def match_style(span, style):
-    return span['font'] == style['font'] and abs(span['size'] - style['size']) < 0.2
+def iter_articles(pages, book_name="codigo civil", style_profile=style_profile):
+    """
+    Отдаёт статьи по одной, как только статья закрыта (следующим заголовком или концом документа).
 
-def is_articulo(span):
-    text = span['text'].strip()
-    if span['font'] == "AvenirLTStd-Heavy" and abs(span['size'] - 9.5) < 0.2 and re.match(r"^\d+\.", text):
-        return True
-    if span['font'] == "AvenirLTStd-Heavy" and 9.5 < span['size'] <= 9.75 and re.match(r"^\d+\.", text):
-        return True
-    return False
-
-def extract_structure_with_text(pdf_path):
-    doc = fitz.open(pdf_path)
-    result = []
+    pages — поток (page_num, spans) или span_store.SpanStore.
+    """
+    classifier = classifier_for(style_profile)
     current = {
-        "book_name": "codigo civil",
+        "book_name": book_name,
         "libro": None,
         "titulo": None,
         "capitulo": None,
@@ -33,71 +31,76 @@ def extract_structure_with_text(pdf_path):
     }
     current_text = []
 
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        blocks = page.get_text("dict")["blocks"]
-        for block in blocks:
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    text = span["text"].strip()
+    for page_num, classified in classified_pages(pages, classifier):
+        for text, level in classified:
 
-                    # LIBRO
-                    if match_style(span, STYLE_LIBRO) and text.startswith("LIBRO"):
-                        # Сохраняем предыдущую статью, если была
-                        if current["articulo"] is not None:
-                            current["texto"] = " ".join(current_text).strip()
-                            result.append(current.copy())
-                            current_text = []
-                            current["articulo"] = None
-                        current["libro"] = text
-                        current["titulo"] = None
-                        current["capitulo"] = None
-                        continue
+            # LIBRO
+            if level == "libro":
+                # Сохраняем предыдущую статью, если была
+                if current["articulo"] is not None:
+                    current["texto"] = " ".join(current_text).strip()
+                    yield current.copy()
+                    current_text = []
+                    current["articulo"] = None
+                current["libro"] = text
+                current["titulo"] = None
+                current["capitulo"] = None
+                continue
 
-                    # TÍTULO
-                    if match_style(span, STYLE_TITULO) and text.startswith("TÍTULO"):
-                        if current["articulo"] is not None:
-                            current["texto"] = " ".join(current_text).strip()
-                            result.append(current.copy())
-                            current_text = []
-                            current["articulo"] = None
-                        current["titulo"] = text
-                        current["capitulo"] = None
-                        continue
+            # TÍTULO
+            if level == "titulo":
+                if current["articulo"] is not None:
+                    current["texto"] = " ".join(current_text).strip()
+                    yield current.copy()
+                    current_text = []
+                    current["articulo"] = None
+                current["titulo"] = text
+                current["capitulo"] = None
+                continue
 
-                    # CAPÍTULO
-                    if match_style(span, STYLE_CAPITULO) and text.startswith("CAPÍTULO"):
-                        if current["articulo"] is not None:
-                            current["texto"] = " ".join(current_text).strip()
-                            result.append(current.copy())
-                            current_text = []
-                            current["articulo"] = None
-                        current["capitulo"] = text
-                        continue
+            # CAPÍTULO
+            if level == "capitulo":
+                if current["articulo"] is not None:
+                    current["texto"] = " ".join(current_text).strip()
+                    yield current.copy()
+                    current_text = []
+                    current["articulo"] = None
+                current["capitulo"] = text
+                continue
 
-                    # ARTICULO
-                    if is_articulo(span):
-                        if current["articulo"] is not None:
-                            current["texto"] = " ".join(current_text).strip()
-                            result.append(current.copy())
-                            current_text = []
-                        current["articulo"] = text
-                        continue
+            # ARTICULO
+            if level == "articulo":
+                if current["articulo"] is not None:
+                    current["texto"] = " ".join(current_text).strip()
+                    yield current.copy()
+                    current_text = []
+                current["articulo"] = text
+                continue
 
-                    # Всё остальное — текст статьи
-                    if current["articulo"] is not None:
-                        if text:
-                            current_text.append(text)
+            # Всё остальное — текст статьи
+            if current["articulo"] is not None:
+                if text:
+                    current_text.append(text)
 
     # Сохраняем последнюю статью, если была
     if current["articulo"] is not None:
         current["texto"] = " ".join(current_text).strip()
-        result.append(current.copy())
+        yield current.copy()
 
-    return result
+def iter_structure_with_text(pdf_path, fast=fast_extraction):
+    # PDF открывается один раз, страницы читаются по мере обработки
+    return iter_articles(metrics.pages(iter_pages(pdf_path, fast=fast)))
+
+def extract_structure_with_text(pdf_path):
+    return list(iter_structure_with_text(pdf_path))
 
 if __name__ == "__main__":
-    structure = extract_structure_with_text(pdf_path)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(structure, f, ensure_ascii=False, indent=2)
+    metrics.configure(metrics_path)
+    # Статьи пишутся по мере извлечения, весь список в памяти не собирается
+    with open(output_path, "w", encoding="utf-8") as f, writer_for(f, output_format) as sink:
+        if normalize:
+            sink = NormalizedWriter(sink)
+        for article in iter_structure_with_text(pdf_path):
+            sink.write(article)
+    metrics.finish()
     print(f"Структура с текстами статей сохранена в {output_path}")
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Пайплайн подготовки текстов кодексов как пакет: import text_preparation.text_utils.
+
+Модули импортируют друг друга относительно пакета (from .json_stream import ...),
+поэтому скрипты запускаются как модули пакета. Пути в настройках отсчитываются от
+этого каталога, так что запуск — отсюда, с корнем репозитория в PYTHONPATH:
+
+    PYTHONPATH=../.. python -m text_preparation.text_utils.ingest
+
+Имена ниже импортируются лениво (PEP 562): обращение к text_utils.CitationIndex
+загружает только citation_index и его зависимости.
+Ни один модуль не работает при импорте, PyMuPDF грузится при первом открытии PDF
+(text_extraction.import_fitz) — читатели индексов и корпуса обходятся без него.
+"""
+import importlib
+
+# Имя -> модуль, в котором оно определено
+_EXPORTS = {
+    # Извлечение из PDF (PyMuPDF — при первом вызове)
+    "iter_pages": "text_extraction",
+    "iter_spans": "text_extraction",
+    "open_pdf": "text_extraction",
+    "pdf_page_count": "text_extraction",
+    "iter_pages_parallel": "parallel_extraction",
+    "SpanCache": "span_cache",
+    "classifier_for": "style_rules",
+    "PROFILES": "style_rules",
+    "publish": "ingest",
+    "load_manifest": "ingest",
+    # Поток статей
+    "iter_records": "json_stream",
+    "NdjsonWriter": "json_stream",
+    "NormalizedWriter": "normalization",
+    "normalize_text": "normalization",
+    "article_id": "articles",
+    "article_text": "articles",
+    "validate_file": "corpus_validator",
+    # Читатели для бота
+    "CitationIndex": "citation_index",
+    "BM25Index": "bm25_index",
+    "VectorIndex": "vector_index",
+    "HierarchyTree": "hierarchy_tree",
+    "CrossReferenceGraph": "cross_references",
+    "ColumnarCorpus": "columnar_corpus",
+    "AutocompleteIndex": "autocomplete_index",
+    "iter_passages": "chunker",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module("." + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,95 @@
+import json
+import mmap as mmap_module
+import os
+import struct
+
+import numpy as np
+
+# Один файл с несколькими массивами numpy: магия, длина и JSON-заголовок, затем массивы,
+# выровненные по 8 байт. Заголовок: {"kind", "meta", "arrays": {имя: [dtype, shape, смещение]}}.
+_MAGIC = b"NDARRS1\n"
+_ALIGN = 8
+
+
+def _aligned(size):
+    return -(-size // _ALIGN) * _ALIGN
+
+
+def save_arrays(path, kind, arrays, meta=None):
+    """
+    Пишет массивы в один файл; файл подменяется атомарно.
+
+    kind — тип содержимого ("hierarchy_tree", "xref_graph", ...), load_arrays проверяет его.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    header = {"kind": kind, "meta": meta or {}, "arrays": {}}
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = [array.dtype.str, list(array.shape), offset]
+        offset += _aligned(array.nbytes)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(len(_MAGIC) + 8 + len(header_bytes))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for array in arrays.values():
+            f.write(array.tobytes())
+            f.write(b"\0" * (_aligned(array.nbytes) - array.nbytes))
+    os.replace(tmp_path, path)
+
+
+def load_arrays(path, kind, mmap=True):
+    """
+    Открывает файл save_arrays. При mmap=True файл отображается в память один раз,
+    а массивы — np.frombuffer поверх отображения: без копирования, страницы читаются
+    с диска при обращении и делятся между процессами через page cache. Обычные
+    ndarray, а не np.memmap: у подкласса заметные накладные расходы на каждый срез.
+
+    Returns:
+        tuple: (словарь массивов, meta).
+    """
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path}: не файл массивов")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    if header["kind"] != kind:
+        raise ValueError(f"{path}: ожидался {kind}, в файле {header['kind']}")
+    data_start = _aligned(len(_MAGIC) + 8 + header_len)
+    arrays = {}
+    with open(path, "rb") as f:
+        mapped = mmap_module.mmap(f.fileno(), 0, access=mmap_module.ACCESS_READ) if mmap else None
+        for name, (dtype, shape, offset) in header["arrays"].items():
+            count = int(np.prod(shape))
+            if mapped is not None:
+                array = np.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + offset)
+            else:
+                f.seek(data_start + offset)
+                array = np.fromfile(f, dtype=dtype, count=count)
+            arrays[name] = array.reshape(shape)
+    return arrays, header["meta"]
+
+
+class StringTable:
+    """Строки в одном UTF-8 буфере со смещениями: строка i — blob[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def build(cls, strings):
+        encoded = [text.encode("utf-8") for text in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        start, end = self.offsets[index:index + 2].tolist()
+        return self.blob[start:end].tobytes().decode("utf-8")
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import re
+import unicodedata
+
+# Суффиксы вставленных статей в порядке следования (31, 31 bis, 31 ter, ...)
+SUFFIXES = ("", "bis", "ter", "quater", "quinquies", "sexies", "septies", "octies", "novies", "decies")
+
+# "1902." (civil), "Artículo 31 bis" / "Artículo 340 quater." (penal)
+_ARTICULO_RE = re.compile(
+    r"^\s*(?:art[íi]culo\s+)?(\d+)\s*\.?\s*(bis|ter|qu[aá]ter|quinquies|sexies|septies|octies|novies|decies)?\b",
+    re.IGNORECASE,
+)
+
+# Поля, входящие в хэш статьи: путь в иерархии + номер; к ним добавляются текст и примечания
+HASHED_FIELDS = ("book_name", "libro", "titulo", "capitulo", "articulo")
+
+
+def parse_articulo(articulo):
+    """
+    Номер статьи из поля articulo любого экстрактора.
+
+    Returns:
+        tuple | None: (номер, суффикс), например ("31", "bis") -> (31, "bis"); None, если номера нет.
+    """
+    if not articulo:
+        return None
+    match = _ARTICULO_RE.match(articulo)
+    if match is None:
+        return None
+    suffix = (match.group(2) or "").lower().replace("á", "a")
+    return int(match.group(1)), suffix
+
+
+def article_text(article):
+    """Текст статьи: у civil поле "texto", у penal из draft_PENAL — "text"."""
+    return article.get("texto") or article.get("text") or ""
+
+
+def collapse_whitespace(text):
+    """Текст для сравнения редакций: пробелы и переносы строк схлопнуты."""
+    return " ".join(text.split())
+
+
+def content_hash(article):
+    """
+    Хэш пути, нормализованного текста и примечаний статьи; меняется только при реальной правке.
+
+    Примечания BOE ("notas", normalization.py) входят в хэш: новая отметка о
+    редакции — правка статьи, и документ в индексе должен её получить.
+    """
+    key = [article.get(field) for field in HASHED_FIELDS] + [collapse_whitespace(article_text(article)),
+                                                             article.get("notas") or []]
+    return hashlib.blake2b(json.dumps(key, ensure_ascii=False).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def merge_fragments(fragments):
+    """
+    Одна статья из фрагментов с общим ID (bulk-экстракторы режут статью на границе страницы).
+
+    Путь и номер — из первого фрагмента, тексты склеиваются через пробел в порядке
+    файла, примечания "notas" — по порядку.
+    """
+    fragments = list(fragments)
+    merged = dict(fragments[0])
+    if len(fragments) == 1:
+        return merged
+    field = "texto" if "texto" in merged else "text"
+    merged[field] = " ".join(article_text(fragment) for fragment in fragments)
+    if any("notas" in fragment for fragment in fragments):
+        merged["notas"] = [note for fragment in fragments for note in fragment.get("notas") or []]
+    return merged
+
+
+def fold(text):
+    """Нижний регистр без диакритики: "Título Preliminar" -> "titulo preliminar", "ñ" -> "n"."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def fold_with_offsets(text):
+    """
+    fold(text) и позиции в исходном тексте для каждого символа результата.
+
+    NFKD может менять длину ("ﬁ" -> "fi", "e" + U+0301 -> "e"), поэтому смещения
+    совпадений в свёрнутом тексте переводятся в исходный через этот список.
+
+    Returns:
+        tuple: (свёрнутый текст, список позиций длиной len(свёрнутый) + 1).
+    """
+    if text.isascii():
+        return text.lower(), list(range(len(text) + 1))
+    pieces, positions = [], []
+    for position, char in enumerate(text):
+        piece = fold(char)
+        pieces.append(piece)
+        positions.extend([position] * len(piece))
+    positions.append(len(text))
+    return "".join(pieces), positions
+
+
+def label_key(text):
+    """Ключ заголовка для поиска: "TÍTULO IV." и "titulo iv" -> "titulo iv" (hierarchy_tree, autocomplete_index)."""
+    return " ".join(fold(text).replace(".", " ").split())
+
+
+def slug(text):
+    """"codigo penal" -> "codigo_penal", без диакритики."""
+    return re.sub(r"[^a-z0-9]+", "_", fold(text)).strip("_")
+
+
+def article_id(article):
+    """
+    Детерминированный ID статьи из book_name + articulo: "codigo_civil-1902", "codigo_penal-31-bis".
+
+    Повторная загрузка тех же статей перезаписывает документы, а не плодит дубли.
+    """
+    book = slug(article.get("book_name") or "")
+    parsed = parse_articulo(article.get("articulo"))
+    if parsed is None:
+        return f"{book}-{slug(article.get('articulo') or '')}"
+    number, suffix = parsed
+    return f"{book}-{number}-{suffix}" if suffix else f"{book}-{number}"
@@ -0,0 +1,390 @@
+import argparse
+import bisect
+import re
+import time
+
+import numpy as np
+
+from .array_file import StringTable, load_arrays, save_arrays
+from .articles import label_key, parse_articulo
+from .citation_index import CODE_ALIASES
+from .json_stream import iter_records
+
+# === НАСТРОЙКИ ===
+input_path = "all_laws.ndjson"
+output_path = "all_laws.autocomplete"
+limit = 10          # подсказок на запрос
+max_edits = 2       # опечаток в запросе не больше
+short_len = 6       # в запросе до стольких символов — не больше одной опечатки
+fuzzy_min_len = 4   # короче этого опечатки не ищутся: "cap" с двумя правками подходит ко всему
+
+LEVELS = ("libro", "titulo", "capitulo", "articulo")
+# Сокращения первого слова запроса: "art 1902", "cap ii", "tit. prelim"
+ABBREVIATIONS = {"art": "articulo", "arts": "articulo", "articulos": "articulo",
+                 "tit": "titulo", "cap": "capitulo", "lib": "libro"}
+_ARRAYS = ("key_offsets", "key_blob", "display_offsets", "display_blob", "key_level", "length_rank",
+           "occurrence_offsets", "occurrence_book", "occurrence_row",
+           "node_lo", "node_hi", "child_offsets", "child_chars", "child_nodes")
+# Кодекс в запросе после label_key: "c. c." -> "c c"
+_CODE_KEYS = {label_key(alias): book for alias, book in CODE_ALIASES.items()}
+_CODE_RE = re.compile(r"(?:^|\s)(?:(?:del?|de\s+la)\s+)?(?P<code>"
+                      + "|".join(re.escape(alias) for alias in sorted(_CODE_KEYS, key=len, reverse=True))
+                      + r")(?=\s|$)")
+_THOUSANDS_RE = re.compile(r"(\d)\.(\d{3})\b")
+
+
+def _article_key(articulo):
+    parsed = parse_articulo(articulo)
+    if parsed is None:
+        return None
+    number, suffix = parsed
+    return f"articulo {number} {suffix}" if suffix else f"articulo {number}"
+
+
+def query_key(text):
+    """
+    Запрос -> ключ индекса и кодекс: "Art. 1.902 CC" -> ("articulo 1902", "codigo civil").
+
+    Регистр, диакритика и точки не важны; кодекс (CODE_ALIASES) вырезается из запроса,
+    голое число считается номером статьи.
+    """
+    key = label_key(_THOUSANDS_RE.sub(r"\1\2", text))
+    book = None
+    match = _CODE_RE.search(key)
+    if match is not None:
+        book = _CODE_KEYS[match.group("code")]
+        key = key[:match.start()] + " " + key[match.end():]
+    words = key.split()
+    if words and words[0] in ABBREVIATIONS:
+        words[0] = ABBREVIATIONS[words[0]]
+    if words and words[0].isdigit():
+        words.insert(0, "articulo")
+    return " ".join(words), book
+
+
+def _allowed_edits(head):
+    """
+    Сколько опечаток допустимо в голове запроса: 0 для коротких, 1 до short_len символов,
+    иначе max_edits — но меньше, чем букв в последнем слове: иначе "de" из
+    "capitulo ii de las ..." за две правки становится "bis".
+    """
+    if len(head) < fuzzy_min_len:
+        return 0
+    edits = 1 if len(head) <= short_len else max_edits
+    return max(0, min(edits, len(head.rsplit(" ", 1)[-1]) - 1))
+
+
+def _build_trie(keys):
+    """
+    Префиксное дерево над отсортированными ключами в массивах (CSR).
+
+    Узлы нумеруются в порядке обхода, дети — по возрастанию символа, поэтому ключи
+    поддерева узла — непрерывный диапазон keys[node_lo:node_hi] отсортированного списка.
+    """
+    node_lo, node_hi, children = [], [], []
+
+    def build(lo, hi, depth):
+        node = len(node_lo)
+        node_lo.append(lo)
+        node_hi.append(hi)
+        children.append([])
+        start = lo
+        while start < hi and len(keys[start]) == depth:
+            start += 1
+        while start < hi:
+            char = keys[start][depth]
+            end = start
+            while end < hi and keys[end][depth] == char:
+                end += 1
+            children[node].append((ord(char), build(start, end, depth + 1)))
+            start = end
+        return node
+
+    build(0, len(keys), 0)
+    child_offsets = np.zeros(len(node_lo) + 1, dtype=np.int64)
+    np.cumsum([len(node_children) for node_children in children], out=child_offsets[1:])
+    flat = [child for node_children in children for child in node_children]
+    return {
+        "node_lo": np.array(node_lo, dtype=np.int32), "node_hi": np.array(node_hi, dtype=np.int32),
+        "child_offsets": child_offsets,
+        "child_chars": np.array([char for char, _ in flat], dtype=np.int32),
+        "child_nodes": np.array([node for _, node in flat], dtype=np.int32),
+    }
+
+
+class AutocompleteIndex:
+    """
+    Подсказки по заголовкам (libro, titulo, capitulo) и номерам статей.
+
+    Ключи — заголовки после fold без точек ("titulo preliminar", "capitulo ii",
+    "articulo 31 bis"), без повторов: одинаковый "CAPÍTULO II" из разных разделов
+    и кодексов — один ключ со списком вхождений (кодекс, строка корпуса). Префикс
+    ищется bisect по отсортированным ключам; опечатки — обходом префиксного дерева
+    с построчным расстоянием Левенштейна, ветка отсекается, как только все ячейки
+    строки больше max_edits. Подсказки ранжируются по числу правок, затем короче —
+    выше: "articulo 1" раньше "articulo 10".
+    """
+
+    def __init__(self, arrays, meta=None):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta or {}
+        self.books = self.meta.get("books", [])
+        # Ключи и дерево нужны целиком на каждый запрос — списки Python быстрее обращений к numpy
+        key_table = StringTable(self.key_offsets, self.key_blob)
+        self.keys = [key_table[i] for i in range(len(key_table))]
+        self.displays = StringTable(self.display_offsets, self.display_blob)
+        self._node_lo, self._node_hi = self.node_lo.tolist(), self.node_hi.tolist()
+        self._child_offsets = self.child_offsets.tolist()
+        self._child_chars = [chr(char) for char in self.child_chars.tolist()]
+        self._child_nodes = self.child_nodes.tolist()
+
+    @classmethod
+    def build(cls, records):
+        """Индекс из потока статей любого экстрактора или structure_only*.json."""
+        entries = {}   # ключ -> [уровень, отображаемый текст, {(кодекс, путь): строка}]
+        books = {}
+        for row, record in enumerate(records):
+            book = books.setdefault(record.get("book_name") or "", len(books))
+            path = (book,)
+            for level in LEVELS:
+                value = record.get(level)
+                if not value:
+                    continue
+                key = _article_key(value) if level == "articulo" else label_key(value)
+                if not key:
+                    continue
+                path += (value,)
+                if key not in entries:
+                    if level == "articulo":
+                        number, suffix = parse_articulo(value)
+                        display = f"Artículo {number} {suffix}" if suffix else f"Artículo {number}"
+                    else:
+                        display = value.strip().rstrip(".").strip()
+                    entries[key] = [LEVELS.index(level), display, {}]
+                entries[key][2].setdefault(path, row)
+
+        keys = sorted(entries)
+        occurrences = [sorted(set((path[0], row) for path, row in entries[key][2].items()), key=lambda item: item[1])
+                       for key in keys]
+        occurrence_offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum([len(found) for found in occurrences], out=occurrence_offsets[1:])
+        flat = [item for found in occurrences for item in found]
+        length_rank = np.empty(len(keys), dtype=np.int32)
+        length_rank[sorted(range(len(keys)), key=lambda i: (len(keys[i]), keys[i]))] = np.arange(len(keys))
+        key_table = StringTable.build(keys)
+        display_table = StringTable.build(entries[key][1] for key in keys)
+        return cls({
+            "key_offsets": key_table.offsets, "key_blob": key_table.blob,
+            "display_offsets": display_table.offsets, "display_blob": display_table.blob,
+            "key_level": np.array([entries[key][0] for key in keys], dtype=np.int8),
+            "length_rank": length_rank,
+            "occurrence_offsets": occurrence_offsets,
+            "occurrence_book": np.array([book for book, _ in flat], dtype=np.int16),
+            "occurrence_row": np.array([row for _, row in flat], dtype=np.int32),
+            **_build_trie(keys),
+        }, {"books": list(books), "keys": len(keys)})
+
+    @classmethod
+    def build_file(cls, path):
+        return cls.build(iter_records(path))
+
+    def save(self, path):
+        save_arrays(path, "autocomplete_index", {name: getattr(self, name) for name in _ARRAYS}, self.meta)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(*load_arrays(path, "autocomplete_index", mmap))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _prefix(self, key):
+        """Диапазон ключей, начинающихся с key."""
+        lo = bisect.bisect_left(self.keys, key)
+        return lo, bisect.bisect_left(self.keys, key + "\uffff", lo)
+
+    def _fuzzy(self, key, limits):
+        """
+        Ключи, у которых какой-то префикс близок к началу запроса, — за один обход дерева.
+
+        Строка динамики считается для всего key, и её ячейка с номером len(head) — это
+        расстояние для головы запроса head, поэтому "capitulo ii de las obligaciones",
+        "capitulo ii de las", ... проверяются разом. Цифры правками не меняются:
+        "articulo 1902" не опечатка в "articulo 1903", а другая статья; заодно обход не
+        спускается в плотные поддеревья номеров.
+
+        Args:
+            limits (dict): длина головы запроса -> допустимо правок.
+
+        Returns:
+            dict: длина головы -> [(lo, hi, правок)] — диапазоны ключей поддеревьев.
+        """
+        found = {length: [] for length in limits}
+        checks = list(limits.items())
+        n = len(key)
+        bound = max(limits.values())
+        forbidden = bound + 1
+        delete = [forbidden if char.isdigit() else 1 for char in key]
+        # Ячейка i строки на глубине depth не меньше |i - depth|: считается только полоса
+        # шириной 2 * bound + 1 вокруг диагонали, остальное — заведомо больше bound
+        stack = [(0, 0, [min(i, forbidden) for i in range(n + 1)])]
+        lo, hi, offsets, chars, nodes = self._node_lo, self._node_hi, self._child_offsets, self._child_chars, self._child_nodes
+        while stack:
+            node, depth, row = stack.pop()
+            depth += 1
+            first, last = max(1, depth - bound), min(n, depth + bound)
+            if first > last:
+                continue
+            for child in range(offsets[node], offsets[node + 1]):
+                char = chars[child]
+                insert = forbidden if char.isdigit() else 1
+                new_row = [forbidden] * (n + 1)
+                if depth <= bound:
+                    new_row[0] = row[0] + insert
+                previous = new_row[first - 1]
+                closest = previous
+                for i in range(first, last + 1):
+                    if key[i - 1] == char:
+                        substitute = row[i - 1]
+                    else:
+                        substitute = row[i - 1] + (1 if insert == 1 and delete[i - 1] == 1 else forbidden)
+                    previous = min(previous + delete[i - 1], row[i] + insert, substitute)
+                    new_row[i] = previous
+                    if previous < closest:
+                        closest = previous
+                for length, edits in checks:
+                    if new_row[length] <= edits:
+                        found[length].append((lo[nodes[child]], hi[nodes[child]], new_row[length]))
+                # При точном совпадении всего запроса глубже ключи того же поддерева лучше не станут
+                if closest <= bound and new_row[n]:
+                    stack.append((nodes[child], depth, new_row))
+        return found
+
+    def _occurrences(self, index, book):
+        start, end = self.occurrence_offsets[index:index + 2].tolist()
+        books = self.occurrence_book[start:end].tolist()
+        rows = self.occurrence_row[start:end].tolist()
+        return [{"book_name": self.books[book_id], "row": row} for book_id, row in zip(books, rows)
+                if book is None or self.books[book_id] == book]
+
+    def _ranked(self, candidates, distances, book, count):
+        results = []
+        order = np.lexsort((self.length_rank[candidates], distances))
+        for position in order.tolist():
+            index = int(candidates[position])
+            occurrences = self._occurrences(index, book)
+            if not occurrences:
+                continue
+            results.append({
+                "text": self.displays[index], "key": self.keys[index], "level": LEVELS[self.key_level[index]],
+                "edits": int(distances[position]), "occurrences": occurrences,
+            })
+            if len(results) == count:
+                break
+        return results
+
+    def _complete_prefix(self, head, book, count):
+        lo, hi = self._prefix(head)
+        if hi == lo:
+            return []
+        candidates = np.arange(lo, hi)
+        if book is None and hi - lo > count:
+            # count самых коротких без сортировки всего диапазона; с фильтром по кодексу
+            # часть из них может отсеяться — тогда ранжируется весь диапазон
+            candidates = lo + np.argpartition(self.length_rank[lo:hi], count)[:count]
+        return self._ranked(candidates, np.zeros(len(candidates), dtype=np.int64), book, count)
+
+    def _complete_fuzzy(self, ranges, book, count):
+        if not ranges:
+            return []
+        best = np.full(len(self.keys), max_edits + 1, dtype=np.int64)
+        for range_lo, range_hi, distance in ranges:
+            np.minimum(best[range_lo:range_hi], distance, out=best[range_lo:range_hi])
+        candidates = np.flatnonzero(best <= max_edits)
+        return self._ranked(candidates, best[candidates], book, count)
+
+    def complete(self, query, count=limit, book=None):
+        """
+        Подсказки для набранного текста: "titulo prelim", "cap ii", "art 1902 cc", "tiulo iv".
+
+        Сначала префикс, затем опечатки (до max_edits); если не подходит ничего, слова
+        с конца отбрасываются: у заголовков в корпусе нет названий, и из
+        "capítulo II de las obligaciones" ищется "capitulo ii", а "de las obligaciones"
+        возвращается в "rest" — для полнотекстового поиска.
+
+        Returns:
+            list: словари text, key, level, edits, occurrences ([{book_name, row}]) и rest.
+        """
+        key, query_book = query_key(query)
+        book = book or query_book
+        words = key.split()
+        heads = [(" ".join(words[:size]), " ".join(words[size:])) for size in range(len(words), 0, -1)]
+        limits = {len(head): edits for head, _ in heads if (edits := _allowed_edits(head))}
+        fuzzy = None
+        for head, rest in heads:
+            results = self._complete_prefix(head, book, count)
+            if not results and len(head) in limits:
+                if fuzzy is None:
+                    fuzzy = self._fuzzy(key, limits)
+                results = self._complete_fuzzy(fuzzy[len(head)], book, count)
+            if results:
+                for result in results:
+                    result["rest"] = rest
+                return results
+        return []
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Подсказки по заголовкам и номерам статей: префикс и опечатки")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build")
+    build_parser.add_argument("input", nargs="?", default=input_path, help="NDJSON корпуса или structure_onlyV2.json")
+    build_parser.add_argument("output", nargs="?", default=output_path)
+    query_parser = sub.add_parser("query", help="query \"titulo prelim\"")
+    query_parser.add_argument("text")
+    query_parser.add_argument("--index", default=output_path)
+    query_parser.add_argument("--limit", type=int, default=limit)
+    bench_parser = sub.add_parser("bench", help="задержка complete() на наборе запросов")
+    bench_parser.add_argument("--index", default=output_path)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        index = AutocompleteIndex.build_file(args.input)
+        index.save(args.output)
+        print(f"{len(index)} ключей, {len(index.node_lo)} узлов дерева за {time.perf_counter() - started:.2f} с -> {args.output}")
+    elif args.command == "query":
+        index = AutocompleteIndex.load(args.index)
+        started = time.perf_counter()
+        results = index.complete(args.text, args.limit)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        for result in results:
+            books = sorted({found["book_name"] for found in result["occurrences"]})
+            print(f"{result['text']:24} {result['level']:9} правок {result['edits']}  "
+                  f"{len(result['occurrences'])} вх. ({', '.join(books)})")
+        if results and results[0]["rest"]:
+            print(f"не сопоставлено: {results[0]['rest']!r}")
+        print(f"{len(results)} подсказок за {elapsed_us:.0f} мкс")
+    else:
+        index = AutocompleteIndex.load(args.index)
+        rng = np.random.default_rng(0)
+        samples = [index.keys[i] for i in rng.integers(0, len(index), 200).tolist()]
+        queries = {
+            "prefix": [sample[:max(3, len(sample) * 2 // 3)] for sample in samples],
+            "typo": [sample[:2] + sample[3:] for sample in samples],
+            "words": [f"{sample} de las obligaciones" for sample in samples],
+            "typo+words": [f"{sample[:2] + sample[3:]} de las obligaciones" for sample in samples],
+        }
+        for name, texts in queries.items():
+            timings = []
+            for text in texts:
+                started = time.perf_counter()
+                index.complete(text)
+                timings.append((time.perf_counter() - started) * 1e6)
+            print(f"{name:10} p50 {_percentile(timings, 0.5):6.0f} мкс, p99 {_percentile(timings, 0.99):6.0f} мкс")
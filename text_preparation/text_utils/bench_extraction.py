@@ -0,0 +1,249 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import get_context
+
+from .articles import article_text
+from .ingest import EXTRACTORS
+from .json_stream import iter_records
+from .normalization import normalize_text
+from .text_extraction import import_fitz, iter_pages, pdf_page_count
+
+# === НАСТРОЙКИ ===
+output_path = "bench_results.json"  # куда писать результаты
+repeat = 3                          # прогонов на экстрактор, в отчёт идёт лучший по времени
+threshold = 0.10                    # допустимое ухудшение относительно базы (10%)
+normalization_corpus = "all_laws.ndjson"  # статьи для замера normalization.normalize_text
+
+# Метрика -> True, если больше — лучше
+COMPARED_METRICS = {
+    "pages_per_sec": True,
+    "spans_per_sec": True,
+    "articles_per_sec": True,
+    "peak_rss_mb": False,
+    "articles_per_sec_normalized": True,
+}
+
+
+class TimedPages:
+    """Обёртка над итератором страниц: время внутри next() — это PyMuPDF, остальное — классификация."""
+
+    def __init__(self, pages):
+        self._pages = iter(pages)
+        self.seconds = 0.0
+        self.pages = 0
+        self.spans = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            page_num, spans = next(self._pages)
+        finally:
+            self.seconds += time.perf_counter() - started
+        self.pages += 1
+        self.spans += len(spans)
+        return page_num, spans
+
+
+class _LineCounter:
+    """Файл-заглушка для write_articles: считает записанные строки NDJSON."""
+
+    def __init__(self):
+        self.lines = 0
+
+    def write(self, data):
+        self.lines += data.count("\n")
+
+
+def _peak_rss_mb():
+    # ru_maxrss — в килобайтах на Linux и в байтах на macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_extractor(name, pdf_path=None, fast=False):
+    """
+    Один прогон экстрактора в текущем процессе; печать по страницам уходит в /dev/null.
+
+    fast — быстрый режим извлечения (text_extraction.iter_pages); результат
+    называется "<экстрактор>/fast", чтобы база сравнивалась по режимам раздельно.
+    """
+    module_name, kind = EXTRACTORS[name]
+    module = importlib.import_module("." + module_name, __package__)
+    pdf_path = pdf_path or module.pdf_path
+    page_count = pdf_page_count(pdf_path)
+
+    pages = TimedPages(iter_pages(pdf_path, fast=fast))
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        if kind == "writer":
+            sink = _LineCounter()
+            module.write_articles(pages, sink, page_count)
+            articles = sink.lines
+        else:
+            articles = sum(1 for _ in module.iter_articles(pages))
+    seconds = time.perf_counter() - started
+
+    return {
+        "extractor": f"{name}/fast" if fast else name,
+        "module": module_name,
+        "fast": fast,
+        "pdf": os.path.basename(pdf_path),
+        "pages": pages.pages,
+        "spans": pages.spans,
+        "articles": articles,
+        "seconds": round(seconds, 3),
+        "pymupdf_seconds": round(pages.seconds, 3),
+        "classify_seconds": round(seconds - pages.seconds, 3),
+        "pymupdf_share": round(pages.seconds / seconds, 3) if seconds else 0.0,
+        "pymupdf_ms_per_page": round(pages.seconds / pages.pages * 1000, 3) if pages.pages else 0.0,
+        "pages_per_sec": round(pages.pages / seconds, 1) if seconds else 0.0,
+        "spans_per_sec": round(pages.spans / seconds, 1) if seconds else 0.0,
+        "articles_per_sec": round(articles / seconds, 1) if seconds else 0.0,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def bench(names, repeat=repeat, pdf_path=None, modes=(False,)):
+    """
+    Каждый прогон — в отдельном свежем процессе, чтобы пиковый RSS был своим у каждого экстрактора.
+    modes — режимы извлечения (значения fast для run_extractor), каждый экстрактор гоняется в каждом.
+
+    Returns:
+        list: лучший по времени прогон каждого экстрактора; peak_rss_mb — максимум по прогонам.
+    """
+    context = get_context("spawn")
+    results = []
+    for name, fast in ((name, fast) for name in names for fast in modes):
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs.append(pool.submit(run_extractor, name, pdf_path, fast).result())
+        best = dict(min(runs, key=lambda run: run["seconds"]))
+        best["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+        best["runs"] = [run["seconds"] for run in runs]
+        results.append(best)
+        print(f"{best['extractor']:<17} {best['pages_per_sec']:>8.1f} стр/с {best['spans_per_sec']:>10.1f} спанов/с "
+              f"{best['articles_per_sec']:>8.1f} статей/с  PyMuPDF {best['pymupdf_share']:.0%}  "
+              f"RSS {best['peak_rss_mb']:.0f} МБ")
+    return results
+
+
+def bench_normalization(path=normalization_corpus, repeat=repeat):
+    """Скорость нормализации текста на готовом корпусе (лучший из repeat проходов)."""
+    texts = [article_text(article) for article in iter_records(path)]
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            normalize_text(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    chars = sum(map(len, texts))
+    result = {
+        "extractor": "normalization",
+        "corpus": os.path.basename(path),
+        "articles": len(texts),
+        "seconds": round(best, 3),
+        "us_per_article": round(best / len(texts) * 1e6, 1) if texts else 0.0,
+        "mb_per_sec": round(chars / best / 1e6, 1) if best else 0.0,
+        "articles_per_sec_normalized": round(len(texts) / best, 1) if best else 0.0,
+    }
+    print(f"{'normalize':<12} {result['us_per_article']:>8.1f} мкс/статья {result['mb_per_sec']:>6.1f} МБ/с")
+    return result
+
+
+def compare_modes(results):
+    """Быстрый режим против обычного: мс PyMuPDF на страницу и число спанов (колонтитулы, номера страниц)."""
+    by_name = {result["extractor"]: result for result in results}
+    for result in results:
+        fast = by_name.get(result["extractor"] + "/fast")
+        if result.get("fast") or fast is None:
+            continue
+        print(f"{result['extractor']:<12} PyMuPDF {result['pymupdf_ms_per_page']:.2f} -> "
+              f"{fast['pymupdf_ms_per_page']:.2f} мс/стр "
+              f"({fast['pymupdf_ms_per_page'] / result['pymupdf_ms_per_page'] - 1:+.1%}), "
+              f"спанов {result['spans']} -> {fast['spans']} ({fast['spans'] - result['spans']:+d}), "
+              f"статей {result['articles']} -> {fast['articles']}")
+
+
+def compare(results, baseline, threshold=threshold):
+    """
+    Сравнение с сохранённой базой.
+
+    Returns:
+        list: строки-описания регрессий (метрика хуже базы больше чем на threshold).
+    """
+    baseline_by_name = {result["extractor"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = baseline_by_name.get(result["extractor"])
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            mark = "РЕГРЕССИЯ" if worse > threshold else ""
+            print(f"{result['extractor']:<17} {metric:<17} {old:>10.1f} -> {new:>10.1f} ({change:+.1%}) {mark}")
+            if mark:
+                regressions.append(f"{result['extractor']}.{metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк экстракторов: скорость, память, доля PyMuPDF")
+    parser.add_argument("extractors", nargs="*", help=f"по умолчанию все: {', '.join(EXTRACTORS)}")
+    parser.add_argument("--repeat", type=int, default=repeat)
+    parser.add_argument("--output", default=output_path)
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON прошлого прогона; при регрессии код выхода 1")
+    parser.add_argument("--threshold", type=float, default=threshold)
+    parser.add_argument("--fast", action="store_true", help="гонять и быстрый режим извлечения, сравнить с обычным")
+    args = parser.parse_args()
+    unknown = [name for name in args.extractors if name not in EXTRACTORS]
+    if unknown:
+        parser.error(f"неизвестные экстракторы: {', '.join(unknown)}")
+
+    # База читается до прогона: --output может указывать на тот же файл
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pymupdf": import_fitz().VersionBind,
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "results": bench(args.extractors or list(EXTRACTORS), args.repeat,
+                         modes=(False, True) if args.fast else (False,)),
+    }
+    if args.fast:
+        compare_modes(report["results"])
+    if os.path.exists(normalization_corpus):
+        report["results"].append(bench_normalization(normalization_corpus, args.repeat))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}")
+
+    if baseline is not None:
+        regressions = compare(report["results"], baseline, args.threshold)
+        if regressions:
+            print(f"Регрессии ({len(regressions)}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("Регрессий нет")
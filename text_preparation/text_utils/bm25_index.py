@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+from .articles import article_id, article_text, fold
+from .json_stream import iter_ndjson_offsets, read_record_at
+
+# Перенос строки, оставленный экстрактором: "siem- pre" -> "siempre" (в penal — мягкий дефис "infrac\xad ción")
+_HYPHEN_JOIN_RE = re.compile(r"(\w)[-\xad] (?=[a-záéíóúüñ])")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Частые служебные слова не несут смысла для поиска и раздувают списки вхождений
+STOPWORDS = frozenset("""
+a al ante bajo con contra de del desde durante e el en entre hacia hasta la las le les lo los mediante
+o para por que se segun si sin sobre su sus tras u un una uno unos unas y ya
+""".split())
+
+# Колонки иерархии, по которым можно фильтровать выдачу
+FILTER_FIELDS = ("book_name", "libro", "titulo")
+
+_ARRAYS = ("term_offsets", "post_docs", "post_tf", "doc_len", "doc_offsets") + tuple(f"{field}_codes" for field in FILTER_FIELDS)
+
+
+def analyze(text):
+    """Текст -> токены для индекса: склейка переносов, нижний регистр, без диакритики и стоп-слов."""
+    text = fold(_HYPHEN_JOIN_RE.sub(r"\1", text))
+    return [token for token in _TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Встроенный полнотекстовый индекс BM25 по полю texto.
+
+    Списки вхождений хранятся сжато (CSR): term_offsets[t]:term_offsets[t + 1]
+    — срез массивов post_docs (int32) и post_tf (uint16). Длины документов и
+    смещения строк в исходном NDJSON — отдельные массивы; всё открывается
+    через mmap. Запрос касается только списков своих термов, так что его
+    стоимость не растёт вместе с числом документов.
+    """
+
+    def __init__(self, meta, arrays, directory=None):
+        self.meta = meta
+        self.directory = directory
+        self.terms = {term: i for i, term in enumerate(meta["terms"])}
+        self.ids = meta["ids"]
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.doc_count = len(self.doc_len)
+        self.avgdl = float(meta["avgdl"]) or 1.0
+        # Знаменатель BM25 без tf считается один раз на документ
+        self.doc_norm = (self.k1 * (1 - self.b + self.b * np.asarray(self.doc_len, dtype=np.float32) / self.avgdl)).astype(np.float32)
+        df = np.diff(np.asarray(self.term_offsets))
+        self.idf = np.log(1 + (self.doc_count - df + 0.5) / (df + 0.5)).astype(np.float32)
+        # Фильтры: значение -> код, коды по документам (-1 — поле пустое)
+        self.filters = {
+            field: ({value: code for code, value in enumerate(meta["fields"][field])}, arrays[f"{field}_codes"])
+            for field in FILTER_FIELDS
+        }
+
+    @classmethod
+    def build(cls, ndjson_path, k1=1.2, b=0.75):
+        """Один проход по NDJSON; в памяти — только словарь и списки вхождений."""
+        terms = {}
+        postings = []
+        doc_len = []
+        doc_offsets = []
+        ids = []
+        fields = {field: ({}, []) for field in FILTER_FIELDS}
+        for offset, article in iter_ndjson_offsets(ndjson_path):
+            doc = len(doc_len)
+            counts = Counter(analyze(article_text(article)))
+            for term, tf in counts.items():
+                term_id = terms.setdefault(term, len(terms))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc, min(tf, 65535)))
+            doc_len.append(sum(counts.values()))
+            doc_offsets.append(offset)
+            ids.append(article_id(article))
+            for field, (values, codes) in fields.items():
+                value = article.get(field)
+                codes.append(-1 if value is None else values.setdefault(value, len(values)))
+
+        # Термы по алфавиту — удобно для отладки и префиксных запросов
+        sorted_terms = sorted(terms)
+        term_offsets = [0]
+        post_docs = []
+        post_tf = []
+        for term in sorted_terms:
+            for doc, tf in postings[terms[term]]:
+                post_docs.append(doc)
+                post_tf.append(tf)
+            term_offsets.append(len(post_docs))
+
+        meta = {
+            "source": os.path.abspath(ndjson_path),
+            "k1": k1,
+            "b": b,
+            "avgdl": (sum(doc_len) / len(doc_len)) if doc_len else 0.0,
+            "terms": sorted_terms,
+            "ids": ids,
+            "fields": {field: list(values) for field, (values, _) in fields.items()},
+        }
+        arrays = {
+            "term_offsets": np.array(term_offsets, dtype=np.int64),
+            "post_docs": np.array(post_docs, dtype=np.int32),
+            "post_tf": np.array(post_tf, dtype=np.uint16),
+            "doc_len": np.array(doc_len, dtype=np.uint32),
+            "doc_offsets": np.array(doc_offsets, dtype=np.int64),
+        }
+        for field, (_, codes) in fields.items():
+            arrays[f"{field}_codes"] = np.array(codes, dtype=np.int32)
+        return cls(meta, arrays)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        # Путь к NDJSON — относительно каталога индекса
+        meta = dict(self.meta, source=os.path.relpath(self.meta["source"], os.path.abspath(directory)))
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        meta["source"] = os.path.join(os.path.abspath(directory), meta["source"])
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in _ARRAYS}
+        return cls(meta, arrays, directory)
+
+    def _filter_mask(self, docs, filters):
+        mask = np.ones(len(docs), dtype=bool)
+        for field, value in filters.items():
+            if value is None:
+                continue
+            codes_by_value, codes = self.filters[field]
+            code = codes_by_value.get(value)
+            if code is None:
+                return np.zeros(len(docs), dtype=bool)
+            mask &= codes[docs] == code
+        return mask
+
+    def search(self, query, k=10, book_name=None, libro=None, titulo=None):
+        """
+        Топ-k статей по BM25.
+
+        Returns:
+            list: (номер строки в NDJSON, ID статьи, score) по убыванию score.
+        """
+        term_ids = sorted({self.terms[t] for t in analyze(query) if t in self.terms})
+        if not term_ids:
+            return []
+        docs_parts = []
+        score_parts = []
+        for term_id in term_ids:
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = np.asarray(self.post_docs[start:end])
+            tf = np.asarray(self.post_tf[start:end], dtype=np.float32)
+            docs_parts.append(docs)
+            score_parts.append(self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.doc_norm[docs]))
+
+        if len(term_ids) == 1:
+            docs, scores = docs_parts[0], score_parts[0]
+        else:
+            docs, inverse = np.unique(np.concatenate(docs_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+        mask = self._filter_mask(docs, {"book_name": book_name, "libro": libro, "titulo": titulo})
+        docs, scores = docs[mask], scores[mask]
+        if len(docs) > k:
+            top = np.argpartition(-scores, k)[:k]
+            docs, scores = docs[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(docs[i]), self.ids[docs[i]], float(scores[i])) for i in order]
+
+    def documents(self, rows):
+        """Статьи по номерам строк — чтением исходного NDJSON по смещениям."""
+        with open(self.meta["source"], "rb") as f:
+            return [read_record_at(f, int(self.doc_offsets[row])) for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25-индекс по статьям")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build")
+    build_parser.add_argument("input", nargs="?", default="all_laws.ndjson")
+    build_parser.add_argument("output", nargs="?", default="laws_bm25")
+    search_parser = sub.add_parser("search")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--index", default="laws_bm25")
+    search_parser.add_argument("-k", type=int, default=10)
+    for field in FILTER_FIELDS:
+        search_parser.add_argument(f"--{field}")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        index = BM25Index.build(args.input)
+        index.save(args.output)
+        print(f"{index.doc_count} статей, {len(index.terms)} термов, {len(index.post_docs)} вхождений "
+              f"за {time.perf_counter() - started:.2f} с -> {args.output}")
+    else:
+        index = BM25Index.load(args.index)
+        started = time.perf_counter()
+        hits = index.search(args.query, args.k, args.book_name, args.libro, args.titulo)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for (row, doc_id, score), article in zip(hits, index.documents(row for row, _, _ in hits)):
+            print(f"{score:7.3f}  {doc_id:<24} {article_text(article)[:100]}")
+        print(f"{len(hits)} результатов за {elapsed_ms:.3f} мс")
@@ -1,98 +1,110 @@
-import fitz  # PyMuPDF
-import json
 import re
 import os
 
-from text_extraction import extract_text_from_pdf
+from .instrumentation import metrics
+from .json_stream import NdjsonWriter
+from .normalization import NormalizedWriter
+from .parallel_extraction import iter_pages_parallel
+from .span_cache import SpanCache
+from .span_store import classified_pages
+from .style_rules import classifier_for
+from .text_extraction import pdf_page_count
 
 # === НАСТРОЙКИ ===
-pdf_path = '../../DATA/Codigo_Penal.pdf'  # путь к PDF Código Penal
+pdf_path = '../../DATA/codigo_penal.pdf'  # путь к PDF Código Penal
 book_name = "codigo penal"                # название книги
 output_ndjson = "codigo_penal.ndjson"     # временный NDJSON-файл
+workers = os.cpu_count()                  # процессов для извлечения спанов (1 — без пула)
+span_cache_dir = ".span_cache"            # кэш спанов между запусками (None — без кэша)
+style_profile = "penal_bulk"              # профиль стилей из style_rules.PROFILES
+metrics_path = None                       # файл метрик: *.json или *.prom (None — без метрик)
+metrics_port = None                       # порт для Prometheus /metrics на время работы
+profile_pages = None                      # (start, end) — cProfile только на этих страницах
+normalize = True                          # переносы, примечания BOE -> "notas", пробелы (normalization.py)
+fast_extraction = False                   # без колонтитулов и картинок (text_extraction.iter_pages, fast)
 
-# Узнаём количество страниц
-pdf_document = fitz.open(pdf_path)
-page_count = pdf_document.page_count
 
-# Контекст для иерархии
-current_libro = None
-current_titulo = None
-current_capitulo = None
-current_articulo = None
-current_text = []
+def write_articles(pages, fout, page_count, book_name=book_name, style_profile=style_profile,
+                   normalize=normalize):
+    """
+    Последовательный проход: страницы по порядку -> иерархия и артикулы -> NDJSON.
 
-with open(output_ndjson, "w", encoding="utf-8") as fout:
-    for page_num in range(page_count):
-        print(f"Обрабатываем страницу {page_num+1} из {page_count}")
-        blocks = extract_text_from_pdf(pdf_path, page_num)
+    pages — поток (page_num, spans) или span_store.SpanStore (span_cache.SpanCache.span_store).
+    """
+    classifier = classifier_for(style_profile)
+    sink = NormalizedWriter(NdjsonWriter(fout)) if normalize else NdjsonWriter(fout)
+    # Контекст для иерархии
+    current_libro = None
+    current_titulo = None
+    current_capitulo = None
+    current_articulo = None
+    current_text = []
 
-        for block in blocks:
-            text = block['text'].strip()
-            font = block['font']
-            size = block['size']
+    for page_num, classified in metrics.pages(classified_pages(pages, classifier), page_count):
+        for text, level in classified:
 
             # LIBRO
-            if text.startswith('LIBRO') and font == "AvenirLTStd-Roman" and abs(size - 10.5) < 0.2:
+            if level == "libro":
                 if current_articulo is not None:
-                    fout.write(json.dumps({
+                    sink.write({
                         "book_name": book_name,
                         "libro": current_libro,
                         "titulo": current_titulo,
                         "capitulo": current_capitulo,
                         "articulo": current_articulo,
                         "texto": " ".join(current_text).strip()
-                    }, ensure_ascii=False) + "\n")
+                    })
                     current_articulo = None
                     current_text = []
                 current_libro = text
                 continue
 
             # TITULO
-            if text.startswith('TÍTULO') and font == "AvenirLTStd-Heavy" and abs(size - 9.5) < 0.2:
+            if level == "titulo":
                 if current_articulo is not None:
-                    fout.write(json.dumps({
+                    sink.write({
                         "book_name": book_name,
                         "libro": current_libro,
                         "titulo": current_titulo,
                         "capitulo": current_capitulo,
                         "articulo": current_articulo,
                         "texto": " ".join(current_text).strip()
-                    }, ensure_ascii=False) + "\n")
+                    })
                     current_articulo = None
                     current_text = []
                 current_titulo = text
                 continue
 
             # CAPITULO
-            if text.startswith('CAPÍTULO') and font == "AvenirLTStd-Roman" and abs(size - 9.5) < 0.2:
+            if level == "capitulo":
                 if current_articulo is not None:
-                    fout.write(json.dumps({
+                    sink.write({
                         "book_name": book_name,
                         "libro": current_libro,
                         "titulo": current_titulo,
                         "capitulo": current_capitulo,
                         "articulo": current_articulo,
                         "texto": " ".join(current_text).strip()
-                    }, ensure_ascii=False) + "\n")
+                    })
                     current_articulo = None
                     current_text = []
                 current_capitulo = text
                 continue
 
             # ARTICULO
-            if text.startswith('Artículo') and font == "AvenirLTStd-Heavy" and abs(size - 9.5) < 0.2:
+            if level == "articulo":
                 # Извлекаем только номер (например, "Artículo 10 " -> "10")
                 match = re.match(r"Artículo\s+(\d+)", text)
                 articulo_num = match.group(1) + "." if match else text
                 if current_articulo is not None:
-                    fout.write(json.dumps({
+                    sink.write({
                         "book_name": book_name,
                         "libro": current_libro,
                         "titulo": current_titulo,
                         "capitulo": current_capitulo,
                         "articulo": current_articulo,
                         "texto": " ".join(current_text).strip()
-                    }, ensure_ascii=False) + "\n")
+                    })
                 current_articulo = articulo_num
                 current_text = []
                 continue
@@ -103,15 +115,36 @@ with open(output_ndjson, "w", encoding="utf-8") as fout:
 
         # После каждой страницы сохраняем последний артикул, если он есть
         if current_articulo is not None and current_text:
-            fout.write(json.dumps({
+            sink.write({
                 "book_name": book_name,
                 "libro": current_libro,
                 "titulo": current_titulo,
                 "capitulo": current_capitulo,
                 "articulo": current_articulo,
                 "texto": " ".join(current_text).strip()
-            }, ensure_ascii=False) + "\n")
+            })
             current_articulo = None
             current_text = []
 
-print(f"Готово! Все данные записаны в {output_ndjson}")
\ No newline at end of file
+
+if __name__ == "__main__":
+    metrics.configure(metrics_path, metrics_port, profile_pages)
+
+    cache = SpanCache(span_cache_dir) if span_cache_dir else None
+
+    # Узнаём количество страниц (с кэшем — из его метаданных, не открывая PDF)
+    page_count = cache.page_count(pdf_path) if cache is not None else pdf_page_count(pdf_path)
+
+    # Фаза 1 (пул процессов или кэш) — спаны страниц, фаза 2 (здесь) — классификация по порядку
+    with open(output_ndjson, "w", encoding="utf-8") as fout:
+        pages = iter_pages_parallel(pdf_path, workers, cache=cache, fast=fast_extraction)
+        if cache is not None:
+            # Колоночное хранилище спанов в кэше: тёплый запуск открывает один файл (mmap)
+            pages = cache.span_store(pdf_path, fast_extraction, pages)
+        write_articles(pages, fout, page_count)
+
+    metrics.finish()
+    if cache is not None:
+        print(f"Кэш спанов: {cache.stats()}")
+
+    print(f"Готово! Все данные записаны в {output_ndjson}")
\ No newline at end of file
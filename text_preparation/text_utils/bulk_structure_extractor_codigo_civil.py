@@ -1,36 +1,28 @@
-import fitz  # PyMuPDF
-import json
 import re
 import os
 
-from text_extraction import extract_text_from_pdf
+from .instrumentation import metrics
+from .json_stream import NdjsonWriter
+from .normalization import NormalizedWriter
+from .parallel_extraction import iter_pages_parallel
+from .span_cache import SpanCache
+from .span_store import classified_pages
+from .style_rules import classifier_for
+from .text_extraction import pdf_page_count
 
 # === НАСТРОЙКИ ===
 pdf_path = '../../DATA/Codigo_Civil.pdf'  # путь к PDF
 book_name = "codigo civil"                # название книги
 output_ndjson = "codigo_civil.ndjson"     # итоговый NDJSON-файл
+workers = os.cpu_count()                  # процессов для извлечения спанов (1 — без пула)
+span_cache_dir = ".span_cache"            # кэш спанов между запусками (None — без кэша)
+style_profile = "civil_bulk"              # профиль стилей из style_rules.PROFILES
+metrics_path = None                       # файл метрик: *.json или *.prom (None — без метрик)
+metrics_port = None                       # порт для Prometheus /metrics на время работы
+profile_pages = None                      # (start, end) — cProfile только на этих страницах
+normalize = True                          # переносы, примечания BOE -> "notas", пробелы (normalization.py)
+fast_extraction = False                   # без колонтитулов и картинок (text_extraction.iter_pages, fast)
 
-pdf_document = fitz.open(pdf_path)
-page_count = pdf_document.page_count
-
-
-
-def is_libro(text):
-    return text.upper().startswith('LIBRO')
-
-def is_titulo(text):
-    return text.upper().startswith('TÍTULO')
-
-def is_capitulo(text):
-    return text.upper().startswith('CAPÍTULO')
-
-def is_articulo_bold(text, font, size):
-    # Только жирный номер артикула, например "17."
-    return (
-        font == "AvenirLTStd-Heavy"
-        and abs(size - 9.5) < 0.3
-        and re.match(r'^\d+\.', text.strip())
-    )
 
 def get_articulo_num(text):
     m = re.match(r'^(?:art[íi]?culo\s*)?(\d+\.)', text.strip(), re.IGNORECASE)
@@ -38,30 +30,26 @@ def get_articulo_num(text):
         return m.group(1)
     return text.strip()
 
-def font_ok(font):
-    return "AvenirLTStd" in font
-
-doc = fitz.open(pdf_path)
-page_count = doc.page_count
+def write_articles(pages, fout, page_count, book_name=book_name, style_profile=style_profile,
+                   normalize=normalize):
+    """
+    Последовательный проход: страницы по порядку -> иерархия и артикулы -> NDJSON.
 
-current_libro = None
-current_titulo = None
-current_capitulo = None
-current_articulo = None
-current_text = []
+    pages — поток (page_num, spans) или span_store.SpanStore (span_cache.SpanCache.span_store).
+    """
+    classifier = classifier_for(style_profile)
+    sink = NormalizedWriter(NdjsonWriter(fout)) if normalize else NdjsonWriter(fout)
+    current_libro = None
+    current_titulo = None
+    current_capitulo = None
+    current_articulo = None
+    current_text = []
 
-with open(output_ndjson, "w", encoding="utf-8") as fout:
-    for page_num in range(page_count):
-        print(f"Обрабатываем страницу {page_num+1} из {page_count}")
-        blocks = extract_text_from_pdf(pdf_path, page_num)
-
-        for block in blocks:
-            text = block['text'].strip()
-            font = block['font']
-            size = block['size']
+    for page_num, classified in metrics.pages(classified_pages(pages, classifier), page_count):
+        for text, level in classified:
 
             # LIBRO
-            if is_libro(text) and font_ok(font) and 9.0 <= size <= 11.0:
+            if level == "libro":
                 current_libro = text.strip()
                 current_titulo = None
                 current_capitulo = None
@@ -70,7 +58,7 @@ with open(output_ndjson, "w", encoding="utf-8") as fout:
                 continue
 
             # TITULO
-            if is_titulo(text) and font_ok(font) and 9.0 <= size <= 10.0:
+            if level == "titulo":
                 current_titulo = text.strip()
                 current_capitulo = None
                 current_articulo = None
@@ -78,24 +66,24 @@ with open(output_ndjson, "w", encoding="utf-8") as fout:
                 continue
 
             # CAPITULO
-            if is_capitulo(text) and font_ok(font) and 9.0 <= size <= 10.0:
+            if level == "capitulo":
                 current_capitulo = text.strip()
                 current_articulo = None
                 current_text = []
                 continue
 
             # ARTICULO только по жирному номеру
-            if is_articulo_bold(text, font, size):
+            if level == "articulo":
                 # Сохраняем предыдущий артикул
                 if current_articulo is not None and current_text:
-                    fout.write(json.dumps({
+                    sink.write({
                         "book_name": book_name,
                         "libro": current_libro,
                         "titulo": current_titulo,
                         "capitulo": current_capitulo,
                         "articulo": current_articulo,
                         "texto": " ".join(current_text).strip()
-                    }, ensure_ascii=False) + "\n")
+                    })
                 current_articulo = get_articulo_num(text)
                 current_text = []
                 continue
@@ -106,14 +94,35 @@ with open(output_ndjson, "w", encoding="utf-8") as fout:
 
         # После каждой страницы сохраняем последний артикул, если он есть
         if current_articulo is not None and current_text:
-            fout.write(json.dumps({
+            sink.write({
                 "book_name": book_name,
                 "libro": current_libro,
                 "titulo": current_titulo,
                 "capitulo": current_capitulo,
                 "articulo": current_articulo,
                 "texto": " ".join(current_text).strip()
-            }, ensure_ascii=False) + "\n")
+            })
             current_text = []
 
-print("Готово! Все данные записаны в codigo_civil.ndjson")
\ No newline at end of file
+
+if __name__ == "__main__":
+    metrics.configure(metrics_path, metrics_port, profile_pages)
+
+    cache = SpanCache(span_cache_dir) if span_cache_dir else None
+
+    # Узнаём количество страниц (с кэшем — из его метаданных, не открывая PDF)
+    page_count = cache.page_count(pdf_path) if cache is not None else pdf_page_count(pdf_path)
+
+    # Фаза 1 (пул процессов или кэш) — спаны страниц, фаза 2 (здесь) — классификация по порядку
+    with open(output_ndjson, "w", encoding="utf-8") as fout:
+        pages = iter_pages_parallel(pdf_path, workers, cache=cache, fast=fast_extraction)
+        if cache is not None:
+            # Колоночное хранилище спанов в кэше: тёплый запуск открывает один файл (mmap)
+            pages = cache.span_store(pdf_path, fast_extraction, pages)
+        write_articles(pages, fout, page_count)
+
+    metrics.finish()
+    if cache is not None:
+        print(f"Кэш спанов: {cache.stats()}")
+
+    print("Готово! Все данные записаны в codigo_civil.ndjson")
\ No newline at end of file
@@ -0,0 +1,135 @@
+import argparse
+import re
+import time
+
+from .articles import article_id, article_text, content_hash
+from .json_stream import NdjsonWriter, iter_records
+
+# === НАСТРОЙКИ ===
+input_path = "all_laws.ndjson"         # статьи (любой вывод экстрактора)
+output_path = "all_laws.passages.ndjson"
+max_tokens = 256                       # предел длины пассажа в токенах (слова и знаки препинания)
+
+# Начало пронумерованного апартадо: "1. Las fuentes ...", "2.ª El precepto ..." — в начале текста или после [.:;]
+_APARTADO_RE = re.compile(r"(?:^|(?<=[.:;] ))\d{1,3}\.[ºª]?\s+(?=[A-ZÁÉÍÓÚÑ¿«(])")
+# Граница предложения: пробел после [.;:!?] перед заглавной ("art. 5" не режется — дальше цифра)
+_SENTENCE_RE = re.compile(r"(?<=[.;:!?])\s+(?=[A-ZÁÉÍÓÚÑ¿«(])")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_WORD_RE = re.compile(r"\S+")
+
+# Поля статьи, которые пассаж наследует
+INHERITED_FIELDS = ("book_name", "libro", "titulo", "capitulo", "articulo")
+
+
+def count_tokens(text, start=0, end=None):
+    """Грубая оценка числа токенов: слова и отдельные знаки препинания."""
+    return len(_TOKEN_RE.findall(text, start, len(text) if end is None else end))
+
+
+def _split(regex, text, start, end):
+    """Отрезки [start, end), разрезанные в начале каждого совпадения regex, без пробелов по краям."""
+    cuts = [match.start() for match in regex.finditer(text, start, end) if start < match.start() < end]
+    spans = []
+    for piece_start, piece_end in zip([start] + cuts, cuts + [end]):
+        while piece_start < piece_end and text[piece_start].isspace():
+            piece_start += 1
+        while piece_end > piece_start and text[piece_end - 1].isspace():
+            piece_end -= 1
+        if piece_start < piece_end:
+            spans.append((piece_start, piece_end))
+    return spans
+
+
+def _pieces(text, limit):
+    """
+    Неделимые куски текста: апартадо целиком, если помещается; иначе его предложения;
+    слишком длинное предложение режется по словам.
+
+    Yields:
+        tuple: (start, end, число токенов).
+    """
+    for start, end in _split(_APARTADO_RE, text, 0, len(text)):
+        tokens = count_tokens(text, start, end)
+        if tokens <= limit:
+            yield start, end, tokens
+            continue
+        for sentence_start, sentence_end in _split(_SENTENCE_RE, text, start, end):
+            tokens = count_tokens(text, sentence_start, sentence_end)
+            if tokens <= limit:
+                yield sentence_start, sentence_end, tokens
+                continue
+            piece_start = None
+            piece_tokens = 0
+            for word in _WORD_RE.finditer(text, sentence_start, sentence_end):
+                word_tokens = count_tokens(text, word.start(), word.end())
+                if piece_start is not None and piece_tokens + word_tokens > limit:
+                    yield piece_start, piece_end, piece_tokens
+                    piece_start = None
+                if piece_start is None:
+                    piece_start = word.start()
+                    piece_tokens = 0
+                piece_end = word.end()
+                piece_tokens += word_tokens
+            if piece_start is not None:
+                yield piece_start, piece_end, piece_tokens
+
+
+def chunk_text(text, limit=max_tokens):
+    """
+    Делит текст статьи на пассажи не длиннее limit токенов.
+
+    Соседние куски (апартадо, предложения) склеиваются жадно, пока помещаются,
+    так что короткие апартадо идут одним пассажем, а длинные режутся по предложениям.
+
+    Returns:
+        list: (start, end) — смещения пассажей в text.
+    """
+    passages = []
+    current_start = current_end = None
+    current_tokens = 0
+    for start, end, tokens in _pieces(text, limit):
+        if current_start is not None and current_tokens + tokens > limit:
+            passages.append((current_start, current_end))
+            current_start = None
+        if current_start is None:
+            current_start = start
+            current_tokens = 0
+        current_end = end
+        current_tokens += tokens
+    if current_start is not None:
+        passages.append((current_start, current_end))
+    return passages
+
+
+def iter_passages(articles, limit=max_tokens):
+    """
+    Поток статей -> поток пассажей.
+
+    ID пассажа — "<ID статьи>#<номер>", смещения start/end — в текст статьи
+    (поле "texto" или "text"). article_hash — хэш статьи из articles.content_hash:
+    по нему потребитель пересобирает пассажи только изменившихся статей.
+    """
+    for article in articles:
+        text = article_text(article)
+        parent_id = article_id(article)
+        parent_hash = content_hash(article)
+        for number, (start, end) in enumerate(chunk_text(text, limit)):
+            passage = {"id": f"{parent_id}#{number}", "article_id": parent_id, "article_hash": parent_hash}
+            for field in INHERITED_FIELDS:
+                passage[field] = article.get(field)
+            passage.update({"passage": number, "start": start, "end": end, "texto": text[start:end]})
+            yield passage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пассажи для поиска и контекста LLM: апартадо и предложения")
+    parser.add_argument("input", nargs="?", default=input_path)
+    parser.add_argument("output", nargs="?", default=output_path)
+    parser.add_argument("--max-tokens", type=int, default=max_tokens)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with open(args.output, "w", encoding="utf-8") as f, NdjsonWriter(f) as sink:
+        for passage in iter_passages(iter_records(args.input), args.max_tokens):
+            sink.write(passage)
+    print(f"{sink.count} пассажей за {time.perf_counter() - started:.2f} с -> {args.output}")
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import re
+import time
+
+from .articles import SUFFIXES, fold_with_offsets, parse_articulo
+from .json_stream import iter_ndjson_offsets, read_record_at
+
+# Как кодексы называют в вопросах (после fold) -> book_name в NDJSON
+CODE_ALIASES = {
+    "codigo civil": "codigo civil",
+    "cc": "codigo civil",
+    "c.c.": "codigo civil",
+    "c. c.": "codigo civil",
+    "codigo penal": "codigo penal",
+    "cp": "codigo penal",
+    "c.p.": "codigo penal",
+    "c. p.": "codigo penal",
+}
+
+_SUFFIX = "(?:" + "|".join(SUFFIXES[1:]) + ")"
+# Номер статьи: "1902", "1.902" (тысячи), "5.2" (статья 5, пункт 2), "31 bis"
+NUMBER_PATTERN = rf"\d+(?:\.\d{{3}})*(?:\.\d{{1,2}})?(?:\s*{_SUFFIX})?"
+NUMBER_RE = re.compile(rf"(?P<number>\d+(?:\.\d{{3}})*)(?:\.\d{{1,2}})?(?:\s*(?P<suffix>{_SUFFIX}))?")
+# Любое из CODE_ALIASES, длинные варианты первыми
+CODE_PATTERN = "|".join(sorted((re.escape(alias) for alias in CODE_ALIASES), key=len, reverse=True))
+
+
+def citation_regex(separators):
+    """
+    Регулярка ссылки "art(s). <номера> [del <кодекс>]" по свёрнутому тексту (articles.fold).
+
+    Группы: numbers — список номеров (разбирается NUMBER_RE), code — псевдоним кодекса.
+    После кодекса допустима точка конца предложения ("art. 1902 CC."), но не продолжение слова.
+
+    Args:
+        separators: альтернативы регулярки между номерами, например r",|y|e|o".
+    """
+    return re.compile(
+        rf"\b(?:arts?\.|articulos?)\s*(?P<numbers>{NUMBER_PATTERN}(?:\s*(?:{separators})\s*{NUMBER_PATTERN})*)"
+        rf"(?:\s*,?\s*(?:del?\s+|de\s+la\s+)?(?P<code>{CODE_PATTERN})(?!\w|\.\w))?"
+    )
+
+
+# "art. 1902 CC", "artículo 138 del Código Penal", "arts. 1902 y 1903 del Código Civil"
+CITATION_RE = citation_regex(r",|y|e|o")
+
+
+def parse_citations(text):
+    """
+    Все ссылки на статьи в тексте пользователя.
+
+    "1.902" — тысячи, "5.2" — статья 5, пункт 2. Без указания кодекса code = None.
+
+    Returns:
+        list: словари {"code", "number", "suffix", "text"} в порядке появления.
+    """
+    folded, positions = fold_with_offsets(text)
+    citations = []
+    for match in CITATION_RE.finditer(folded):
+        start, end = positions[match.start()], positions[match.end() - 1] + 1
+        code = CODE_ALIASES[match.group("code")] if match.group("code") else None
+        for number in NUMBER_RE.finditer(match.group("numbers")):
+            citations.append({
+                "code": code,
+                "number": int(number.group("number").replace(".", "")),
+                "suffix": number.group("suffix") or "",
+                "text": text[start:end],
+            })
+    return citations
+
+
+def _key(number, suffix):
+    return f"{number} {suffix}" if suffix else str(number)
+
+
+class CitationIndex:
+    """
+    Предвычисленный поиск статьи по (кодекс, номер, суффикс) -> смещение строки в NDJSON.
+
+    Сохраняется рядом с NDJSON; сам поиск — обращение к словарю, а статьи
+    одного вопроса читаются одним проходом по файлу в порядке смещений.
+    """
+
+    def __init__(self, source, codes):
+        self.source = source
+        self.codes = codes
+
+    @classmethod
+    def build(cls, ndjson_path):
+        codes = {}
+        for offset, article in iter_ndjson_offsets(ndjson_path):
+            parsed = parse_articulo(article.get("articulo"))
+            if parsed is None:
+                continue
+            # При повторе номера остаётся первая статья
+            codes.setdefault(article.get("book_name"), {}).setdefault(_key(*parsed), offset)
+        return cls(os.path.abspath(ndjson_path), codes)
+
+    def save(self, path):
+        # Путь к NDJSON — относительно файла индекса, чтобы пару можно было переносить вместе
+        source = os.path.relpath(self.source, os.path.dirname(os.path.abspath(path)))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"source": source, "codes": self.codes}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(os.path.join(os.path.dirname(os.path.abspath(path)), data["source"]), data["codes"])
+
+    def lookup(self, code, number, suffix=""):
+        """Смещения подходящих статей; без кодекса — во всех кодексах."""
+        key = _key(number, suffix)
+        books = [code] if code else list(self.codes)
+        return [(book, self.codes[book][key]) for book in books if key in self.codes.get(book, {})]
+
+    def resolve(self, text, default_code=None):
+        """
+        Разбирает текст и одним проходом по NDJSON достаёт все процитированные статьи.
+
+        Returns:
+            list: для каждой ссылки — ссылка из parse_citations и "articles":
+            статьи с полем "path" (libro/titulo/capitulo без пустых уровней).
+        """
+        citations = parse_citations(text)
+        wanted = {}
+        for citation in citations:
+            citation["code"] = citation["code"] or default_code
+            citation["matches"] = self.lookup(citation["code"], citation["number"], citation["suffix"])
+            for _, offset in citation["matches"]:
+                wanted[offset] = None
+
+        with open(self.source, "rb") as f:
+            for offset in sorted(wanted):
+                article = read_record_at(f, offset)
+                article["path"] = [article[level] for level in ("libro", "titulo", "capitulo") if article.get(level)]
+                wanted[offset] = article
+
+        for citation in citations:
+            citation["articles"] = [wanted[offset] for _, offset in citation.pop("matches")]
+        return citations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Индекс ссылок на статьи: art. 1902 CC -> статья")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build")
+    build_parser.add_argument("input", nargs="?", default="all_laws.ndjson")
+    build_parser.add_argument("output", nargs="?", default="all_laws.citations.json")
+    resolve_parser = sub.add_parser("resolve")
+    resolve_parser.add_argument("text")
+    resolve_parser.add_argument("--index", default="all_laws.citations.json")
+    resolve_parser.add_argument("--default-code")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = CitationIndex.build(args.input)
+        index.save(args.output)
+        print(f"{sum(len(keys) for keys in index.codes.values())} статей в {len(index.codes)} кодексах -> {args.output}")
+    else:
+        index = CitationIndex.load(args.index)
+        started = time.perf_counter()
+        resolved = index.resolve(args.text, args.default_code)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for citation in resolved:
+            print(f"{citation['text']!r}: {citation['code']} {_key(citation['number'], citation['suffix'])}")
+            for article in citation["articles"]:
+                print(f"    {article['book_name']} {article['articulo']} — {' / '.join(article['path'])}")
+        print(f"{len(resolved)} ссылок за {elapsed_ms:.3f} мс")
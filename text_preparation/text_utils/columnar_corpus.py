@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from .array_file import StringTable, load_arrays, save_arrays
+from .json_stream import NdjsonWriter, iter_records
+
+# === НАСТРОЙКИ ===
+input_path = "all_laws.ndjson"
+output_path = "all_laws.columns"
+
+# Колонки иерархии: общий словарь строк, в строке корпуса — номер (-1 — null)
+HIERARCHY_COLUMNS = ("book_name", "libro", "titulo", "capitulo")
+# Поле текста: "texto" (civil) или "text" (penal из draft_PENAL); -1 — записи без текста (structure_only.json)
+TEXT_FIELDS = ("texto", "text")
+# Биты колонки nulls: articulo или текст равен null (пустая строка хранится как есть)
+NULL_ARTICULO = 1
+NULL_TEXT = 2
+_KNOWN = frozenset(HIERARCHY_COLUMNS + ("articulo",) + TEXT_FIELDS)
+_ARRAYS = ("codes", "dictionary_offsets", "dictionary_blob", "articulo_offsets", "articulo_blob",
+           "text_field", "text_offsets", "text_blob", "nulls", "extra_offsets", "extra_blob")
+_KIND = "columnar_corpus/2"
+
+
+class ColumnarWriter:
+    """
+    Писатель колоночного корпуса с тем же интерфейсом, что NdjsonWriter
+    (write/close, контекстный менеджер), — его можно обернуть NormalizedWriter.
+
+    Колонки копятся в памяти и пишутся одним файлом array_file при close():
+    корпус — единицы мегабайт. Поля вне известных колонок ("notas" и т. п.)
+    хранятся JSON-строкой на запись.
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self.meta = meta or {}
+        self.count = 0
+        self._dictionary = {}
+        self._codes = []
+        self._articulos = []
+        self._text_field = []
+        self._texts = []
+        self._nulls = []
+        self._extras = []
+
+    def __enter__(self):
+        return self
+
+    def write(self, item):
+        for column in HIERARCHY_COLUMNS:
+            value = item.get(column)
+            self._codes.append(-1 if value is None else self._dictionary.setdefault(value, len(self._dictionary)))
+        articulo = item.get("articulo")
+        self._articulos.append(articulo or "")
+        field = next((field for field in TEXT_FIELDS if field in item), None)
+        self._text_field.append(-1 if field is None else TEXT_FIELDS.index(field))
+        text = item[field] if field else None
+        self._texts.append(text or "")
+        self._nulls.append((NULL_ARTICULO if articulo is None else 0)
+                           | (NULL_TEXT if field is not None and text is None else 0))
+        extra = {key: value for key, value in item.items() if key not in _KNOWN}
+        self._extras.append(json.dumps(extra, ensure_ascii=False) if extra else "")
+        self.count += 1
+
+    def close(self):
+        dictionary = StringTable.build(self._dictionary)
+        articulos = StringTable.build(self._articulos)
+        texts = StringTable.build(self._texts)
+        extras = StringTable.build(self._extras)
+        save_arrays(self.path, _KIND, {
+            "codes": np.array(self._codes, dtype=np.int32).reshape(-1, len(HIERARCHY_COLUMNS)),
+            "dictionary_offsets": dictionary.offsets, "dictionary_blob": dictionary.blob,
+            "articulo_offsets": articulos.offsets, "articulo_blob": articulos.blob,
+            "text_field": np.array(self._text_field, dtype=np.int8),
+            "text_offsets": texts.offsets, "text_blob": texts.blob,
+            "nulls": np.array(self._nulls, dtype=np.uint8),
+            "extra_offsets": extras.offsets, "extra_blob": extras.blob,
+        }, dict(self.meta, rows=self.count, columns=list(HIERARCHY_COLUMNS)))
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def export(ndjson_path, path):
+    """NDJSON (или JSON-массив) -> колоночный корпус; возвращает число записей."""
+    with ColumnarWriter(path, {"source": os.path.basename(ndjson_path)}) as sink:
+        for record in iter_records(ndjson_path):
+            sink.write(record)
+    return sink.count
+
+
+class ColumnarCorpus:
+    """
+    Читатель колоночного корпуса поверх отображённого в память файла (array_file).
+
+    Процессы бота, открывшие один файл, делят одну копию в page cache; открытие
+    читает только заголовок. Строки словаря иерархии декодируются один раз и
+    дальше переиспользуются, text_view() отдаёт байты текста без копирования.
+    """
+
+    def __init__(self, arrays, meta=None):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta or {}
+        self.dictionary = StringTable(self.dictionary_offsets, self.dictionary_blob)
+        self.articulos = StringTable(self.articulo_offsets, self.articulo_blob)
+        self.texts = StringTable(self.text_offsets, self.text_blob)
+        self.extras = StringTable(self.extra_offsets, self.extra_blob)
+        self._strings = {}
+        self._codes_by_string = None
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(*load_arrays(path, _KIND, mmap))
+
+    def __len__(self):
+        return len(self.text_field)
+
+    def _string(self, code):
+        text = self._strings.get(code)
+        if text is None:
+            text = self._strings[code] = self.dictionary[code]
+        return text
+
+    def value(self, row, column):
+        """Значение колонки иерархии (book_name, libro, titulo, capitulo) или None."""
+        code = int(self.codes[row, HIERARCHY_COLUMNS.index(column)])
+        return None if code < 0 else self._string(code)
+
+    def text(self, row):
+        return self.texts[row]
+
+    def text_view(self, row):
+        """UTF-8 байты текста как memoryview на отображённый файл — без копирования."""
+        start, end = self.text_offsets[row:row + 2].tolist()
+        return memoryview(self.text_blob[start:end])
+
+    def record(self, row):
+        """Запись в исходном виде: те же ключи и порядок, что у экстрактора."""
+        codes = self.codes[row].tolist()
+        record = {column: None if code < 0 else self._string(code) for column, code in zip(HIERARCHY_COLUMNS, codes)}
+        nulls = int(self.nulls[row])
+        record["articulo"] = None if nulls & NULL_ARTICULO else self.articulos[row]
+        text_field = self.text_field[row]
+        if text_field >= 0:
+            record[TEXT_FIELDS[text_field]] = None if nulls & NULL_TEXT else self.texts[row]
+        extra = self.extras[row]
+        if extra:
+            record.update(json.loads(extra))
+        return record
+
+    def __iter__(self):
+        return (self.record(row) for row in range(len(self)))
+
+    def select(self, **filters):
+        """
+        Номера строк по точным значениям колонок иерархии — сравнение кодов словаря,
+        без декодирования строк: select(book_name="codigo penal", titulo="TÍTULO IV.").
+
+        Словарь строка -> код строится при первом вызове, дальше поиск кода — O(1).
+        """
+        if self._codes_by_string is None:
+            self._codes_by_string = {self._string(code): code for code in range(len(self.dictionary))}
+        mask = np.ones(len(self), dtype=bool)
+        for column, value in filters.items():
+            codes = self.codes[:, HIERARCHY_COLUMNS.index(column)]
+            if value is None:
+                mask &= codes < 0
+                continue
+            code = self._codes_by_string.get(value)
+            if code is None:
+                return []
+            mask &= codes == code
+        return np.flatnonzero(mask).tolist()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Колоночный бинарный корпус рядом с NDJSON (NDJSON остаётся форматом обмена)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export")
+    export_parser.add_argument("input", nargs="?", default=input_path)
+    export_parser.add_argument("output", nargs="?", default=output_path)
+    ndjson_parser = sub.add_parser("to-ndjson", help="обратно в NDJSON (проверка, обмен)")
+    ndjson_parser.add_argument("input", nargs="?", default=output_path)
+    ndjson_parser.add_argument("output")
+    bench_parser = sub.add_parser("bench", help="холодный старт: разбор NDJSON против открытия корпуса")
+    bench_parser.add_argument("--ndjson", default=input_path)
+    bench_parser.add_argument("--columns", default=output_path)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        started = time.perf_counter()
+        rows = export(args.input, args.output)
+        print(f"{rows} записей за {time.perf_counter() - started:.2f} с -> {args.output} "
+              f"({os.path.getsize(args.output)} байт, NDJSON {os.path.getsize(args.input)} байт)")
+    elif args.command == "to-ndjson":
+        corpus = ColumnarCorpus.load(args.input)
+        with open(args.output, "w", encoding="utf-8") as f, NdjsonWriter(f) as sink:
+            for record in corpus:
+                sink.write(record)
+        print(f"{sink.count} записей -> {args.output}")
+    else:
+        started = time.perf_counter()
+        records = list(iter_records(args.ndjson))
+        ndjson_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        corpus = ColumnarCorpus.load(args.columns)
+        open_ms = (time.perf_counter() - started) * 1000
+        rows = np.random.default_rng(0).integers(0, len(corpus), 1000).tolist()
+        started = time.perf_counter()
+        for row in rows:
+            corpus.record(row)
+        record_us = (time.perf_counter() - started) / len(rows) * 1e6
+        print(f"NDJSON: разбор {len(records)} записей {ndjson_ms:.1f} мс; "
+              f"корпус: открытие {open_ms:.2f} мс, запись по номеру {record_us:.1f} мкс")
@@ -0,0 +1,131 @@
+import argparse
+import json
+import re
+import sys
+import time
+
+from .articles import SUFFIXES, article_text, parse_articulo
+from .json_stream import iter_records
+
+# === НАСТРОЙКИ ===
+max_examples = 20   # сколько примеров каждой проблемы хранить на кодекс
+
+# Виды проблем в порядке вывода
+ISSUES = ("gap", "duplicate", "out_of_order", "bad_articulo", "empty_text", "leaked_heading")
+
+# Заголовок иерархии, попавший в текст статьи: "Sección 2.ª", "CAPÍTULO III", "TÍTULO PRELIMINAR"
+LEAKED_HEADING_RE = re.compile(
+    r"(?:\bLIBRO|\bT[ÍI]TULO|\bCAP[ÍI]TULO|\bSecci[óo]n)\s+"
+    r"(?:[IVXLC]+\b|PRIMERO|SEGUNDO|TERCERO|CUARTO|QUINTO|PRELIMINAR|\d+\.?\s?ª)"
+)
+
+
+class _BookState:
+    """Состояние одного кодекса: последняя статья, виденные номера, счётчики и примеры."""
+
+    def __init__(self):
+        self.last = None
+        self.seen = set()
+        self.articles = 0
+        self.counts = dict.fromkeys(ISSUES, 0)
+        self.examples = {issue: [] for issue in ISSUES}
+
+    def report(self, issue, example):
+        self.counts[issue] += 1
+        if len(self.examples[issue]) < max_examples:
+            self.examples[issue].append(example)
+
+
+def _label(key):
+    number, suffix_index = key
+    return f"{number} {SUFFIXES[suffix_index]}".strip()
+
+
+def validate(records):
+    """
+    Один проход по статьям любого экстрактора; кодексы (book_name) проверяются раздельно.
+
+    В памяти — только номера статей кодекса и ограниченное число примеров.
+    Номер с суффиксом (31 bis) идёт после 31 и перед 32; пропуск — это
+    разрыв в номерах (30 -> 33) или в суффиксах (31 -> 31 ter).
+
+    Returns:
+        dict: book_name -> {"articles", "counts": {вид: число}, "examples": {вид: [...]}}.
+    """
+    books = {}
+    for row, article in enumerate(records):
+        book = article.get("book_name")
+        state = books.get(book)
+        if state is None:
+            state = books[book] = _BookState()
+        state.articles += 1
+        articulo = article.get("articulo")
+        where = {"row": row, "articulo": articulo}
+
+        text = article_text(article)
+        if not text.strip():
+            state.report("empty_text", where)
+        else:
+            heading = LEAKED_HEADING_RE.search(text)
+            if heading is not None:
+                state.report("leaked_heading", dict(where, heading=heading.group(0)))
+
+        parsed = parse_articulo(articulo)
+        if parsed is None:
+            state.report("bad_articulo", where)
+            continue
+        key = (parsed[0], SUFFIXES.index(parsed[1]))
+
+        if key in state.seen:
+            state.report("duplicate", where)
+        elif state.last is not None and key < state.last:
+            state.report("out_of_order", dict(where, after=_label(state.last)))
+        elif state.last is not None:
+            last_number, last_suffix = state.last
+            number, suffix = key
+            if number > last_number + 1 or (number == last_number and suffix > last_suffix + 1):
+                state.report("gap", dict(where, after=_label(state.last), missed=(
+                    number - last_number - 1 if number > last_number else suffix - last_suffix - 1)))
+            elif number == last_number + 1 and suffix > 0:
+                # 31 -> 32 bis: пропущена сама 32
+                state.report("gap", dict(where, after=_label(state.last), missed=suffix))
+        state.seen.add(key)
+        if state.last is None or key > state.last:
+            state.last = key
+
+    return {book: {"articles": state.articles, "counts": state.counts, "examples": state.examples}
+            for book, state in books.items()}
+
+
+def validate_file(path):
+    """validate() для JSON-массива или NDJSON (формат определяется по файлу)."""
+    return validate(iter_records(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проверка корпуса статей: пропуски, дубли, порядок, пустые тексты")
+    parser.add_argument("paths", nargs="*", default=["all_laws.ndjson"])
+    parser.add_argument("--allow", nargs="*", default=[], choices=ISSUES,
+                        help="виды проблем, которые не валят проверку")
+    parser.add_argument("--json", dest="json_path", help="сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    failed = False
+    reports = {}
+    for path in args.paths:
+        started = time.perf_counter()
+        report = reports[path] = validate_file(path)
+        elapsed = time.perf_counter() - started
+        print(f"{path} ({elapsed:.3f} с)")
+        for book, result in report.items():
+            issues = ", ".join(f"{issue}: {count}" for issue, count in result["counts"].items() if count)
+            print(f"  {book}: {result['articles']} статей; {issues or 'проблем нет'}")
+            for issue in ISSUES:
+                for example in result["examples"][issue][:3]:
+                    print(f"    {issue}: {json.dumps(example, ensure_ascii=False)}")
+            failed = failed or any(count for issue, count in result["counts"].items() if issue not in args.allow)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if failed else 0)
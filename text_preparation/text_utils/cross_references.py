@@ -0,0 +1,217 @@
+import argparse
+import re
+import time
+
+import numpy as np
+
+from .array_file import StringTable, load_arrays, save_arrays
+from .articles import article_id, article_text, fold, parse_articulo
+from .citation_index import CODE_ALIASES, NUMBER_RE, citation_regex
+from .json_stream import iter_records
+
+# === НАСТРОЙКИ ===
+input_path = "all_laws.ndjson"
+output_path = "all_laws.xref"
+max_range = 60   # "artículos 1058 a 1063" раскрывается, только если в диапазоне не больше статей
+
+# Ссылка в тексте статьи (после fold): "artículo 1.902", "arts. 1583 a 1587, 1784 y 1967",
+# "artículo 138 del Código Penal". Разделитель "a"/"al"/"hasta el" — диапазон.
+REFERENCE_RE = citation_regex(r",|y|e|o|al?|hasta\s+el")
+_RANGE_SEPARATOR_RE = re.compile(r"\s*(?:al?|hasta\s+el)\s*$")
+# Ссылка на другой закон: "artículo 954 de la Ley de Enjuiciamiento Civil", "artículo 5.uno de la Ley Orgánica 8/2007"
+_EXTERNAL_RE = re.compile(
+    r"[\w.]*\s*(?:,\s*)?(?:(?:apartado|parrafo|numero)\s+\S+\s+)?(?:de|del)\s+(?:la\s+|el\s+|los\s+|las\s+)?"
+    r"(?:ley|real\s+decreto|decreto|constitucion|reglamento|estatuto|convenio|tratado|directiva|"
+    r"codigo\s+de\s+comercio|texto\s+refundido)\b"
+)
+# "el artículo anterior", "del artículo siguiente" — соседняя статья того же кодекса
+RELATIVE_RE = re.compile(r"\barticulo\s+(?P<direction>anterior|precedente|siguiente)\b")
+
+
+def extract_references(text):
+    """
+    Ссылки на статьи в тексте статьи.
+
+    Returns:
+        list: (кодекс или None — тот же кодекс, номер, суффикс) и ("relative", -1 | 1, "")
+        для "artículo anterior/siguiente"; ссылки на другие законы пропускаются.
+    """
+    folded = fold(text)
+    references = []
+    for match in REFERENCE_RE.finditer(folded):
+        code = CODE_ALIASES[match.group("code")] if match.group("code") else None
+        if code is None and _EXTERNAL_RE.match(folded, match.end()):
+            continue
+        numbers = match.group("numbers")
+        previous = None
+        for number in NUMBER_RE.finditer(numbers):
+            value, suffix = int(number.group("number").replace(".", "")), number.group("suffix") or ""
+            if (previous is not None and not suffix and not previous[1]
+                    and _RANGE_SEPARATOR_RE.search(numbers, 0, number.start())
+                    and 0 < value - previous[0] <= max_range):
+                references.extend((code, between, "") for between in range(previous[0] + 1, value + 1))
+            else:
+                references.append((code, value, suffix))
+            previous = (value, suffix)
+    for match in RELATIVE_RE.finditer(folded):
+        references.append(("relative", 1 if match.group("direction") == "siguiente" else -1, ""))
+    return references
+
+
+def _csr(sources, targets, count):
+    """Рёбра (sources[i] -> targets[i]) -> offsets, соседи; соседи каждого узла по возрастанию."""
+    order = np.lexsort((targets, sources))
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=count), out=offsets[1:])
+    return offsets, targets[order].astype(np.int32)
+
+
+class CrossReferenceGraph:
+    """
+    Граф ссылок между статьями в формате CSR в обе стороны.
+
+    Узел — статья (первое вхождение её ID; повторы bulk-экстракторов сливаются).
+    Что цитирует статья i: out_targets[out_offsets[i]:out_offsets[i + 1]];
+    кто цитирует её: in_sources[in_offsets[i]:in_offsets[i + 1]]. ID статей — в
+    StringTable, файл — array_file (массивы отображаются лениво).
+    """
+
+    _ARRAYS = ("out_offsets", "out_targets", "in_offsets", "in_sources", "id_offsets", "id_blob", "rows")
+
+    def __init__(self, arrays, meta=None):
+        for name in self._ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta or {}
+        self.ids = StringTable(self.id_offsets, self.id_blob)
+        self._nodes = None
+
+    @classmethod
+    def build(cls, records):
+        """
+        Граф из потока статей: ссылки без кодекса — в тот же кодекс, с кодексом — в указанный.
+
+        Ссылки на отсутствующие статьи и на саму себя отбрасываются; их число — в meta.
+        """
+        ids, rows, books, keys = {}, [], [], {}
+        references = []
+        for row_num, article in enumerate(records):
+            node = ids.get(article_id(article))
+            if node is None:
+                node = ids[article_id(article)] = len(rows)
+                rows.append(row_num)
+                books.append(article.get("book_name"))
+                parsed = parse_articulo(article.get("articulo"))
+                if parsed is not None:
+                    keys.setdefault((books[-1], *parsed), node)
+            references.append((node, extract_references(article_text(article))))
+
+        # Соседи по порядку статей внутри кодекса — для "artículo anterior/siguiente"
+        neighbours = {}
+        for book in set(books):
+            book_nodes = [node for node, node_book in enumerate(books) if node_book == book]
+            for position, node in enumerate(book_nodes):
+                neighbours[node] = (book_nodes[position - 1] if position else None,
+                                    book_nodes[position + 1] if position + 1 < len(book_nodes) else None)
+
+        edges = set()
+        unresolved = 0
+        for node, found in references:
+            for code, number, suffix in found:
+                if code == "relative":
+                    target = neighbours[node][0 if number < 0 else 1]
+                else:
+                    target = keys.get((code or books[node], number, suffix))
+                if target is None:
+                    unresolved += 1
+                elif target != node:
+                    edges.add((node, target))
+
+        count = len(rows)
+        edges = np.array(sorted(edges), dtype=np.int32).reshape(-1, 2)
+        out_offsets, out_targets = _csr(edges[:, 0], edges[:, 1], count)
+        in_offsets, in_sources = _csr(edges[:, 1], edges[:, 0], count)
+        table = StringTable.build(ids)
+        return cls({
+            "out_offsets": out_offsets, "out_targets": out_targets,
+            "in_offsets": in_offsets, "in_sources": in_sources,
+            "id_offsets": table.offsets, "id_blob": table.blob,
+            "rows": np.array(rows, dtype=np.int32),
+        }, {"edges": len(edges), "unresolved": unresolved})
+
+    def save(self, path):
+        save_arrays(path, "xref_graph", {name: getattr(self, name) for name in self._ARRAYS}, self.meta)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(*load_arrays(path, "xref_graph", mmap))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def node(self, doc_id):
+        """Номер узла по ID статьи ("codigo_civil-1902"); словарь строится при первом вызове."""
+        if self._nodes is None:
+            self._nodes = {self.ids[node]: node for node in range(len(self))}
+        return self._nodes.get(doc_id)
+
+    def cites(self, node):
+        """Узлы, на которые ссылается статья."""
+        return self.out_targets[self.out_offsets[node]:self.out_offsets[node + 1]]
+
+    def cited_by(self, node):
+        """Узлы статей, которые ссылаются на эту."""
+        return self.in_sources[self.in_offsets[node]:self.in_offsets[node + 1]]
+
+    def neighbourhood(self, node, hops=2, direction="both"):
+        """
+        Статьи не дальше hops шагов по ссылкам (direction: "out", "in" или "both").
+
+        Returns:
+            dict: узел -> расстояние (сам node не входит).
+        """
+        distances = {node: 0}
+        frontier = [node]
+        for hop in range(1, hops + 1):
+            next_frontier = []
+            for current in frontier:
+                if direction in ("out", "both"):
+                    next_frontier.extend(self.cites(current).tolist())
+                if direction in ("in", "both"):
+                    next_frontier.extend(self.cited_by(current).tolist())
+            frontier = [found for found in dict.fromkeys(next_frontier) if found not in distances]
+            for found in frontier:
+                distances[found] = hop
+        del distances[node]
+        return distances
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Граф ссылок между статьями: кого цитирует статья и кто цитирует её")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build")
+    build_parser.add_argument("input", nargs="?", default=input_path)
+    build_parser.add_argument("output", nargs="?", default=output_path)
+    show_parser = sub.add_parser("show", help="show codigo_civil-1902")
+    show_parser.add_argument("id")
+    show_parser.add_argument("--graph", default=output_path)
+    show_parser.add_argument("--hops", type=int, default=2)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        graph = CrossReferenceGraph.build(iter_records(args.input))
+        graph.save(args.output)
+        print(f"{len(graph)} статей, {graph.meta['edges']} ссылок ({graph.meta['unresolved']} не найдено) "
+              f"за {time.perf_counter() - started:.2f} с -> {args.output}")
+    else:
+        graph = CrossReferenceGraph.load(args.graph)
+        node = graph.node(args.id)
+        if node is None:
+            parser.exit(1, f"Нет статьи {args.id}\n")
+        started = time.perf_counter()
+        cites, cited_by = graph.cites(node), graph.cited_by(node)
+        around = graph.neighbourhood(node, args.hops)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        print(f"цитирует ({len(cites)}): {', '.join(graph.ids[target] for target in cites)}")
+        print(f"цитируют ({len(cited_by)}): {', '.join(graph.ids[source] for source in cited_by)}")
+        print(f"в {args.hops} шагах: {len(around)} статей; {elapsed_us:.0f} мкс")
@@ -1,38 +1,26 @@
-import fitz  # PyMuPDF
-import json
-import re
+from .instrumentation import metrics
+from .json_stream import writer_for
+from .normalization import NormalizedWriter
+from .span_store import classified_pages
+from .style_rules import classifier_for
+from .text_extraction import iter_pages
 
 # 1. Пути к файлам
 pdf_path = '../../DATA/codigo_penal.pdf'
 output_path = 'structure_with_text_penal.json'
+output_format = "json"  # "json" (массив, как раньше) или "ndjson"
+metrics_path = None     # файл метрик: *.json или *.prom (None — без метрик)
+normalize = True        # переносы, примечания BOE -> "notas", пробелы (normalization.py)
+fast_extraction = False # без колонтитулов и картинок (text_extraction.iter_pages, fast)
 
-# 2. Описание стилей для поиска
-STYLE_LIBRO = {"font": "AvenirLTStd-Roman", "size": 10.5}
-STYLE_TITULO = {"font": "AvenirLTStd-Heavy", "size": 9.5}
-STYLE_CAPITULO = {"font": "AvenirLTStd-Roman", "size": 9.5}
+# 2. Профиль стилей для поиска (style_rules.PROFILES)
+style_profile = "penal"
 
-# 3. Сравнение стиля
-def match_style(span, style):
-    return span['font'] == style['font'] and abs(span['size'] - style['size']) < 0.2
-
-# 4. Поиск артиклов по penal
-def is_articulo(span):
-    text = span['text'].strip()
-    # "Artículo 14" или "ARTÍCULO 14"
-    if (
-        span['font'] == "AvenirLTStd-Heavy"
-        and abs(span['size'] - 9.5) < 0.2
-        and re.match(r"^(Artículo|ARTÍCULO)\s+\d+", text)
-    ):
-        return True
-    return False
-
-# 5. Основной парсер
-def extract_structure_with_text(pdf_path):
-    doc = fitz.open(pdf_path)
-    structure = []
+# 3. Основной парсер: статьи отдаются по одной, как только закрыты
+def iter_articles(pages, book_name="codigo penal", style_profile=style_profile):
+    classifier = classifier_for(style_profile)
     current = {
-        "book_name": "codigo penal",
+        "book_name": book_name,
         "libro": None,
         "titulo": None,
         "capitulo": None,
@@ -40,55 +28,61 @@ def extract_structure_with_text(pdf_path):
         "text": ""
     }
 
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        blocks = page.get_text("dict")["blocks"]
-        for block in blocks:
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    text = span['text'].strip()
-                    # LIBRO
-                    if match_style(span, STYLE_LIBRO) and text.startswith("LIBRO"):
-                        if current["articulo"]:
-                            structure.append(current.copy())
-                        current["libro"] = text
-                        current["titulo"] = None
-                        current["capitulo"] = None
-                        current["articulo"] = None
-                        current["text"] = ""
-                    # TITULO
-                    elif match_style(span, STYLE_TITULO) and text.startswith("TÍTULO"):
-                        if current["articulo"]:
-                            structure.append(current.copy())
-                        current["titulo"] = text
-                        current["capitulo"] = None
-                        current["articulo"] = None
-                        current["text"] = ""
-                    # CAPITULO
-                    elif match_style(span, STYLE_CAPITULO) and text.startswith("CAPÍTULO"):
-                        if current["articulo"]:
-                            structure.append(current.copy())
-                        current["capitulo"] = text
-                        current["articulo"] = None
-                        current["text"] = ""
-                    # ARTICULO
-                    elif is_articulo(span):
-                        if current["articulo"]:
-                            structure.append(current.copy())
-                        current["articulo"] = text
-                        current["text"] = ""
-                    # Добавляем текст к текущей статье
-                    elif current["articulo"]:
-                        current["text"] += (text + " ")
+    for page_num, classified in classified_pages(pages, classifier):
+        for text, level in classified:
+            # LIBRO
+            if level == "libro":
+                if current["articulo"]:
+                    yield current.copy()
+                current["libro"] = text
+                current["titulo"] = None
+                current["capitulo"] = None
+                current["articulo"] = None
+                current["text"] = ""
+            # TITULO
+            elif level == "titulo":
+                if current["articulo"]:
+                    yield current.copy()
+                current["titulo"] = text
+                current["capitulo"] = None
+                current["articulo"] = None
+                current["text"] = ""
+            # CAPITULO
+            elif level == "capitulo":
+                if current["articulo"]:
+                    yield current.copy()
+                current["capitulo"] = text
+                current["articulo"] = None
+                current["text"] = ""
+            # ARTICULO
+            elif level == "articulo":
+                if current["articulo"]:
+                    yield current.copy()
+                current["articulo"] = text
+                current["text"] = ""
+            # Добавляем текст к текущей статье
+            elif current["articulo"]:
+                current["text"] += (text + " ")
 
     # Добавляем последний артикул
     if current["articulo"]:
-        structure.append(current.copy())
+        yield current.copy()
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(structure, f, ensure_ascii=False, indent=2)
+def iter_structure_with_text(pdf_path, fast=fast_extraction):
+    # PDF открывается один раз, страницы читаются по мере обработки
+    return iter_articles(metrics.pages(iter_pages(pdf_path, fast=fast)))
+
+# 4. Потоковая запись: в памяти только текущая статья
+def extract_structure_with_text(pdf_path):
+    with open(output_path, "w", encoding="utf-8") as f, writer_for(f, output_format) as sink:
+        if normalize:
+            sink = NormalizedWriter(sink)
+        for article in iter_structure_with_text(pdf_path):
+            sink.write(article)
     print(f"Структура сохранена в {output_path}")
 
-# 6. Запуск парсера
+# 5. Запуск парсера
 if __name__ == "__main__":
-    extract_structure_with_text(pdf_path)
\ No newline at end of file
+    metrics.configure(metrics_path)
+    extract_structure_with_text(pdf_path)
+    metrics.finish()
\ No newline at end of file
@@ -0,0 +1,241 @@
+import argparse
+import base64
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from itertools import groupby
+from urllib.parse import urlsplit
+
+from .articles import article_id, merge_fragments
+from .json_stream import iter_records
+
+# Пределы одного запроса _bulk
+MAX_CHUNK_BYTES = 5 * 1024 * 1024
+MAX_CHUNK_DOCS = 500
+
+
+def index_actions(articles):
+    """
+    Статьи -> действия ("index", _id, документ) с детерминированным ID.
+
+    Фрагменты одной статьи (bulk-экстракторы сбрасывают её на границе страницы, и
+    продолжение идёт следующей строкой) сливаются articles.merge_fragments в один
+    документ — иначе каждый фрагмент затирал бы предыдущий. Поток не буферизуется.
+    """
+    for doc_id, fragments in groupby(articles, key=article_id):
+        yield "index", doc_id, merge_fragments(fragments)
+
+
+def encode_action(op, doc_id, doc, index):
+    """Одно действие в формате _bulk: строка метаданных и, кроме delete, строка документа."""
+    meta = json.dumps({op: {"_index": index, "_id": doc_id}}, ensure_ascii=False) + "\n"
+    if op == "delete":
+        return meta.encode("utf-8")
+    return (meta + json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def iter_chunks(actions, index, max_bytes=MAX_CHUNK_BYTES, max_docs=MAX_CHUNK_DOCS):
+    """Режет поток действий на пачки, ограниченные и по байтам, и по числу документов."""
+    chunk = []
+    chunk_bytes = 0
+    for op, doc_id, doc in actions:
+        encoded = encode_action(op, doc_id, doc, index)
+        if chunk and (chunk_bytes + len(encoded) > max_bytes or len(chunk) >= max_docs):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(encoded)
+        chunk_bytes += len(encoded)
+    if chunk:
+        yield chunk
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class BulkLoader:
+    """
+    Параллельная загрузка в Elasticsearch через _bulk.
+
+    Несколько потоков, у каждого своё keep-alive соединение. Пачки идут через
+    ограниченную очередь: если кластер не успевает, чтение NDJSON встаёт
+    (backpressure). На 429 — и на весь запрос, и на отдельные документы в
+    ответе — повтор с экспоненциальной паузой; повторно уходят только
+    отклонённые документы.
+    """
+
+    def __init__(self, url, index, workers=4, max_bytes=MAX_CHUNK_BYTES, max_docs=MAX_CHUNK_DOCS,
+                 max_retries=8, backoff=0.5, timeout=60, refresh=False):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.path = parts.path.rstrip("/") + "/_bulk" + ("?refresh=true" if refresh else "")
+        self.headers = {"Content-Type": "application/x-ndjson", "Connection": "keep-alive"}
+        if parts.username:
+            credentials = f"{parts.username}:{parts.password or ''}".encode("utf-8")
+            self.headers["Authorization"] = "Basic " + base64.b64encode(credentials).decode("ascii")
+        self.index = index
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.max_docs = max_docs
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.docs = 0
+        self.failed = 0
+        self.retries = 0
+        self.errors = []
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _post(self, connection, body):
+        """Один запрос; при обрыве keep-alive соединение пересоздаётся. Возвращает (соединение, статус, ответ)."""
+        try:
+            return (connection,) + self._request(connection, body)
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            connection = self._connect()
+            return (connection,) + self._request(connection, body)
+
+    def _request(self, connection, body):
+        started = time.perf_counter()
+        connection.request("POST", self.path, body=body, headers=self.headers)
+        response = connection.getresponse()
+        payload = response.read()
+        with self._lock:
+            self.latencies.append(time.perf_counter() - started)
+        return response.status, payload
+
+    def _sleep(self, attempt):
+        time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random() / 2))
+
+    def _send_chunk(self, connection, chunk):
+        pending = chunk
+        for attempt in range(self.max_retries + 1):
+            connection, status, payload = self._post(connection, b"".join(pending))
+            if status in (429, 503):
+                with self._lock:
+                    self.retries += 1
+                self._sleep(attempt)
+                continue
+            if status >= 300:
+                with self._lock:
+                    self.failed += len(pending)
+                    self.errors.append(f"HTTP {status}: {payload[:200]!r}")
+                return connection
+
+            result = json.loads(payload)
+            rejected = []
+            loaded = len(pending)
+            if result.get("errors"):
+                # Загруженными считаются только успешные действия и delete отсутствующего ID
+                loaded = 0
+                for action, item in zip(pending, result.get("items", [])):
+                    outcome = next(iter(item.values()))
+                    item_status = outcome.get("status", 200)
+                    if item_status < 300 or ("delete" in item and item_status == 404):
+                        loaded += 1
+                    elif item_status == 429:
+                        rejected.append(action)
+                    else:
+                        with self._lock:
+                            self.failed += 1
+                            if len(self.errors) < 20:
+                                self.errors.append(json.dumps(outcome.get("error"), ensure_ascii=False))
+            with self._lock:
+                self.docs += loaded
+            if not rejected:
+                return connection
+            with self._lock:
+                self.retries += 1
+            pending = rejected
+            self._sleep(attempt)
+
+        with self._lock:
+            self.failed += len(pending)
+            self.errors.append(f"{len(pending)} документов отклонены после {self.max_retries} повторов")
+        return connection
+
+    def _worker(self, chunks):
+        connection = self._connect()
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    return
+                try:
+                    connection = self._send_chunk(connection, chunk)
+                except Exception as e:
+                    # Поток не должен умирать: иначе очередь заполнится и загрузка зависнет
+                    with self._lock:
+                        self.failed += len(chunk)
+                        self.errors.append(f"{type(e).__name__}: {e}")
+                    connection.close()
+                    connection = self._connect()
+        finally:
+            connection.close()
+
+    def load(self, actions):
+        """Загружает поток действий (op, _id, документ); возвращает статистику."""
+        chunks = queue.Queue(maxsize=self.workers * 2)
+        threads = [threading.Thread(target=self._worker, args=(chunks,), daemon=True) for _ in range(self.workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for chunk in iter_chunks(actions, self.index, self.max_bytes, self.max_docs):
+                chunks.put(chunk)
+        finally:
+            for _ in threads:
+                chunks.put(None)
+            for thread in threads:
+                thread.join()
+        return self.stats(time.perf_counter() - started)
+
+    def stats(self, elapsed):
+        return {
+            "docs": self.docs,
+            "failed": self.failed,
+            "retries": self.retries,
+            "requests": len(self.latencies),
+            "seconds": round(elapsed, 3),
+            "docs_per_sec": round(self.docs / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+            "errors": self.errors[:20],
+        }
+
+
+def load_ndjson(path, url, index, **options):
+    """all_laws.ndjson (или любой вывод экстрактора) -> индекс index."""
+    loader = BulkLoader(url, index, **options)
+    return loader.load(index_actions(iter_records(path)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка NDJSON со статьями в Elasticsearch через _bulk")
+    parser.add_argument("input", nargs="?", default="all_laws.ndjson")
+    parser.add_argument("--url", default="http://localhost:9200")
+    parser.add_argument("--index", default="laws")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-bytes", type=int, default=MAX_CHUNK_BYTES)
+    parser.add_argument("--max-docs", type=int, default=MAX_CHUNK_DOCS)
+    parser.add_argument("--refresh", action="store_true")
+    args = parser.parse_args()
+
+    stats = load_ndjson(args.input, args.url, args.index, workers=args.workers,
+                        max_bytes=args.max_bytes, max_docs=args.max_docs, refresh=args.refresh)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
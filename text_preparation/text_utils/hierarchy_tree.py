@@ -0,0 +1,322 @@
+import argparse
+import os
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+from .array_file import StringTable, load_arrays, save_arrays
+from .articles import SUFFIXES, label_key, parse_articulo
+from .json_stream import iter_records
+
+# Уровни дерева; кодекс — корень, пропущенные уровни (статья без libro) просто не создают узла
+LEVELS = ("book", "libro", "titulo", "capitulo", "articulo")
+BOOK, ARTICULO = 0, len(LEVELS) - 1
+
+# Массивы узлов в порядке обхода в глубину (preorder): поддерево узла i — это [i, subtree_end[i])
+_ARRAYS = ("level", "label", "parent", "subtree_end", "child_offsets", "children", "sibling_index",
+           "row", "string_offsets", "string_blob", "article_keys", "article_nodes",
+           "depth", "key_offsets", "key_blob", "key_order", "key_node_offsets", "key_nodes")
+# Тип файла для array_file; /2 — с ключами заголовков для find (старые файлы нужно пересобрать)
+_KIND = "hierarchy_tree/2"
+
+
+def _article_key(book_node, articulo):
+    """Ключ статьи для бинарного поиска: узел кодекса, номер, суффикс (31 bis после 31)."""
+    parsed = parse_articulo(articulo)
+    if parsed is None:
+        return None
+    number, suffix = parsed
+    return (book_node << 32) | (number << 8) | SUFFIXES.index(suffix)
+
+
+class HierarchyTree:
+    """
+    Иерархия кодексов (book -> libro -> titulo -> capitulo -> articulo) в плоских массивах.
+
+    Каждая строка заголовка хранится один раз (общий UTF-8 буфер со смещениями),
+    узел ссылается на неё номером. Узлы пронумерованы в порядке обхода в глубину,
+    поэтому поддерево — непрерывный диапазон [i, subtree_end[i]), а дети узла —
+    диапазон children[child_offsets[i]:child_offsets[i + 1]]. Отсюда:
+    список статей раздела — O(глубина + результат), хлебные крошки — O(глубина),
+    соседи — O(1). Для find у каждой строки есть свёрнутый ключ (label_key); строки
+    упорядочены по ключу (key_order), узлы сгруппированы по ним в CSR (key_nodes),
+    так что шаг пути — бинарный поиск и отбор совпавших узлов по диапазону
+    поддерева. Файл — заголовок JSON и выровненные массивы; load() отображает их
+    в память (array_file) и ничего не читает заранее.
+    """
+
+    def __init__(self, arrays, meta=None):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta or {}
+        self.strings = StringTable(self.string_offsets, self.string_blob)
+        self.keys = StringTable(self.key_offsets, self.key_blob)
+        self._sorted_keys = None
+
+    @classmethod
+    def build(cls, records):
+        """
+        Дерево из потока статей любого экстрактора (или structure_only.json, где
+        строки с articulo=None задают только заголовки).
+
+        Повторы одной статьи подряд (постраничный сброс bulk-экстракторов) дают один
+        узел; row — номер первой строки статьи во входном файле.
+        """
+        strings = {}
+        level, label, parent, row, node_depth = [], [], [], [], []
+        subtree_end = []
+        stack = []  # [(уровень, номер строки-заголовка, узел)] — текущий путь от корня
+
+        def close(depth):
+            while len(stack) > depth:
+                subtree_end[stack.pop()[2]] = len(level)
+
+        for row_num, record in enumerate(records):
+            path = [(BOOK, record.get("book_name") or "")]
+            path += [(i, record.get(name)) for i, name in enumerate(LEVELS[1:], 1) if record.get(name)]
+            path = [(node_level, strings.setdefault(text, len(strings))) for node_level, text in path]
+            depth = 0
+            while depth < min(len(stack), len(path)) and stack[depth][:2] == path[depth]:
+                depth += 1
+            close(depth)
+            for node_level, string_id in path[depth:]:
+                node = len(level)
+                level.append(node_level)
+                label.append(string_id)
+                parent.append(stack[-1][2] if stack else -1)
+                row.append(row_num if node_level == ARTICULO else -1)
+                subtree_end.append(0)
+                node_depth.append(len(stack))
+                stack.append((node_level, string_id, node))
+        close(0)
+
+        count = len(level)
+        parent = np.array(parent, dtype=np.int32)
+        # Дети в порядке обхода уже идут подряд по возрастанию номера: устойчивая сортировка по родителю
+        order = np.argsort(parent, kind="stable")
+        children = order[parent[order] >= 0].astype(np.int32)
+        child_counts = np.bincount(parent[parent >= 0], minlength=count)
+        child_offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(child_counts, out=child_offsets[1:])
+        sibling_index = np.zeros(count, dtype=np.int32)
+        sibling_index[children] = np.arange(len(children)) - child_offsets[parent[children]]
+
+        table = StringTable.build(strings)
+        # Строки по свёрнутому ключу; узлы сгруппированы по строке в том же порядке
+        folded = [label_key(text) for text in strings]
+        key_table = StringTable.build(folded)
+        key_order = np.array(sorted(range(len(folded)), key=folded.__getitem__), dtype=np.int32)
+        key_rank = np.empty(len(folded), dtype=np.int64)
+        key_rank[key_order] = np.arange(len(folded))
+        node_rank = key_rank[np.array(label, dtype=np.int64)]
+        key_nodes = np.argsort(node_rank, kind="stable").astype(np.int32)
+        key_node_offsets = np.zeros(len(folded) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(node_rank, minlength=len(folded)), out=key_node_offsets[1:])
+
+        level = np.array(level, dtype=np.int8)
+        book_of = np.zeros(count, dtype=np.int64)
+        current_book = -1
+        for node in range(count):
+            if level[node] == BOOK:
+                current_book = node
+            book_of[node] = current_book
+        texts = list(strings)
+        article_keys, article_nodes = [], []
+        for node in np.flatnonzero(level == ARTICULO).tolist():
+            key = _article_key(int(book_of[node]), texts[label[node]])
+            if key is not None:
+                article_keys.append(key)
+                article_nodes.append(node)
+        article_keys = np.array(article_keys, dtype=np.int64)
+        article_nodes = np.array(article_nodes, dtype=np.int32)
+        by_key = np.argsort(article_keys, kind="stable")
+
+        return cls({
+            "level": level,
+            "label": np.array(label, dtype=np.int32),
+            "parent": parent,
+            "subtree_end": np.array(subtree_end, dtype=np.int32),
+            "child_offsets": child_offsets,
+            "children": children,
+            "sibling_index": sibling_index,
+            "row": np.array(row, dtype=np.int32),
+            "string_offsets": table.offsets,
+            "string_blob": table.blob,
+            "article_keys": article_keys[by_key],
+            "article_nodes": article_nodes[by_key],
+            "depth": np.array(node_depth, dtype=np.int8),
+            "key_offsets": key_table.offsets,
+            "key_blob": key_table.blob,
+            "key_order": key_order,
+            "key_node_offsets": key_node_offsets,
+            "key_nodes": key_nodes,
+        })
+
+    @classmethod
+    def build_file(cls, path):
+        """build() для JSON-массива или NDJSON (формат определяется по файлу)."""
+        tree = cls.build(iter_records(path))
+        tree.meta["source"] = os.path.abspath(path)
+        return tree
+
+    def save(self, path):
+        save_arrays(path, _KIND, {name: getattr(self, name) for name in _ARRAYS}, self.meta)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Открывает сохранённое дерево; при mmap=True массивы читаются с диска по мере обращения."""
+        return cls(*load_arrays(path, _KIND, mmap))
+
+    def __len__(self):
+        return len(self.level)
+
+    def text(self, node):
+        """Строка заголовка узла (или articulo у статьи)."""
+        return self.strings[self.label[node]]
+
+    def node(self, node):
+        """Узел в виде словаря: номер, уровень, текст, строка статьи во входном файле."""
+        node = int(node)
+        info = {"node": node, "level": LEVELS[self.level[node]], "text": self.text(node)}
+        if self.level[node] == ARTICULO:
+            info["row"] = int(self.row[node])
+        return info
+
+    def children_of(self, node):
+        """Номера детей узла; node=None — корни (кодексы)."""
+        if node is None:
+            return np.flatnonzero(self.parent[:] < 0)
+        return self.children[self.child_offsets[node]:self.child_offsets[node + 1]]
+
+    def _nodes_with_key(self, key):
+        """
+        Узлы любого уровня с ключом key или "key <слово> ..." — по возрастанию номера.
+
+        Такие ключи в key_order идут подряд: от key до key + "!" (пробел меньше любого
+        другого символа ключа). Из диапазона вырезаются "key bis ...", "key ter ..." и
+        другие суффиксы: "TÍTULO VII BIS" — отдельный заголовок, а не "TÍTULO VII".
+        Список ключей по порядку декодируется при первом вызове.
+        """
+        if self._sorted_keys is None:
+            self._sorted_keys = [self.keys[string] for string in self.key_order.tolist()]
+        keys = self._sorted_keys
+        position = bisect_left(keys, key)
+        end = bisect_left(keys, key + "!", position)
+        ranges = []
+        for suffix in sorted(SUFFIXES[1:]):
+            lo = bisect_left(keys, f"{key} {suffix}", position, end)
+            hi = bisect_left(keys, f"{key} {suffix}!", lo, end)
+            if lo < hi:
+                ranges.append((position, lo))
+                position = hi
+        ranges.append((position, end))
+        offsets = self.key_node_offsets
+        return np.sort(np.concatenate([self.key_nodes[offsets[lo]:offsets[hi]] for lo, hi in ranges]))
+
+    def find(self, *path):
+        """
+        Узел по пути заголовков: find("codigo civil", "TÍTULO IV", "CAPÍTULO II").
+
+        Сравнение без регистра, диакритики и точек; "Título IV" не совпадает с
+        "TÍTULO IV bis", но совпадает с "TÍTULO IV. De las obligaciones". Уровни
+        можно пропускать: каждый шаг ищет среди потомков, а не только среди детей,
+        спускаясь через узлы без совпадения не глубже capitulo; из совпавших на разной
+        глубине берётся ближайший, при равной — первый по порядку.
+
+        Returns:
+            int | None: номер узла.
+        """
+        node = None
+        for part in path:
+            candidates = self._nodes_with_key(label_key(part))
+            parents = self.parent[candidates]
+            # Через родителя можно спуститься, если это сам node или узел выше capitulo
+            passable = (parents >= 0) & (self.level[np.maximum(parents, 0)] < ARTICULO - 1)
+            if node is None:
+                candidates = candidates[(parents < 0) | passable]
+            else:
+                inside = (candidates > node) & (candidates < self.subtree_end[node])
+                candidates = candidates[inside & ((parents == node) | passable)]
+            if not len(candidates):
+                return None
+            node = int(candidates[np.argmin(self.depth[candidates])])
+        return node
+
+    def find_article(self, book_name, articulo):
+        """Узел статьи по кодексу и номеру ("1902", "Artículo 31 bis") — бинарный поиск."""
+        book = self.find(book_name)
+        key = _article_key(book, articulo) if book is not None else None
+        if key is None:
+            return None
+        position = int(np.searchsorted(self.article_keys, key))
+        if position < len(self.article_keys) and self.article_keys[position] == key:
+            return int(self.article_nodes[position])
+        return None
+
+    def subtree(self, node, level=ARTICULO):
+        """Узлы уровня level в поддереве node по порядку (по умолчанию — статьи)."""
+        start, end = node + 1, int(self.subtree_end[node])
+        levels = self.level[start:end]
+        return (np.flatnonzero(levels == level) + start).tolist()
+
+    def breadcrumb(self, node):
+        """Путь от кодекса до узла: [кодекс, libro, titulo, ..., node]."""
+        path = []
+        while node >= 0:
+            path.append(int(node))
+            node = int(self.parent[node])
+        return path[::-1]
+
+    def sibling(self, node, step=1):
+        """Соседний узел того же родителя (step=-1 — предыдущий) или None на краю."""
+        parent = int(self.parent[node])
+        siblings = self.children_of(parent if parent >= 0 else None)
+        position = (int(self.sibling_index[node]) if parent >= 0
+                    else int(np.searchsorted(siblings, node))) + step
+        if 0 <= position < len(siblings):
+            return int(siblings[position])
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Дерево иерархии кодексов: разделы, хлебные крошки, соседи")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build")
+    build_parser.add_argument("input", nargs="?", default="all_laws.ndjson")
+    build_parser.add_argument("output", nargs="?", default="all_laws.tree")
+    list_parser = sub.add_parser("list", help="статьи раздела: list \"codigo civil\" \"TÍTULO IV\" \"CAPÍTULO II\"")
+    list_parser.add_argument("path", nargs="+")
+    list_parser.add_argument("--tree", default="all_laws.tree")
+    article_parser = sub.add_parser("article", help="хлебные крошки и соседи статьи")
+    article_parser.add_argument("book_name")
+    article_parser.add_argument("articulo")
+    article_parser.add_argument("--tree", default="all_laws.tree")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        tree = HierarchyTree.build_file(args.input)
+        tree.save(args.output)
+        print(f"{len(tree)} узлов, {len(tree.article_nodes)} статей, {len(tree.string_offsets) - 1} строк "
+              f"за {time.perf_counter() - started:.2f} с -> {args.output} ({os.path.getsize(args.output)} байт)")
+    elif args.command == "list":
+        tree = HierarchyTree.load(args.tree)
+        started = time.perf_counter()
+        node = tree.find(*args.path)
+        if node is None:
+            parser.exit(1, f"Раздел не найден: {' / '.join(args.path)}\n")
+        articles = tree.subtree(node)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(" / ".join(tree.text(crumb) for crumb in tree.breadcrumb(node)))
+        print(", ".join(tree.text(article) for article in articles))
+        print(f"{len(articles)} статей за {elapsed_ms:.3f} мс")
+    else:
+        tree = HierarchyTree.load(args.tree)
+        node = tree.find_article(args.book_name, args.articulo)
+        if node is None:
+            parser.exit(1, f"Статья не найдена: {args.book_name} {args.articulo}\n")
+        print(" / ".join(tree.text(crumb) for crumb in tree.breadcrumb(node)))
+        previous, following = tree.sibling(node, -1), tree.sibling(node, 1)
+        print(f"строка {tree.row[node]}; предыдущая: {tree.text(previous) if previous is not None else '—'}, "
+              f"следующая: {tree.text(following) if following is not None else '—'}")
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import time
+
+from .articles import article_id, content_hash, merge_fragments
+from .json_stream import iter_ndjson_offsets, read_record_at
+
+# Версия формата файла хэшей: при смене хэша или записей старые файлы пересчитываются
+HASHES_VERSION = 2
+
+
+def hash_file(ndjson_path):
+    """
+    ID статьи -> (хэш, смещения строк её фрагментов) по всему NDJSON.
+
+    При повторе ID (bulk-экстракторы сбрасывают статью на границе страницы)
+    фрагменты сливаются (articles.merge_fragments) и хэшируется статья целиком.
+    В памяти — только хэши и смещения; повторы дочитываются по смещениям.
+    """
+    hashes, offsets = {}, {}
+    for offset, article in iter_ndjson_offsets(ndjson_path):
+        doc_id = article_id(article)
+        if doc_id in offsets:
+            offsets[doc_id].append(offset)
+        else:
+            offsets[doc_id] = [offset]
+            hashes[doc_id] = content_hash(article)
+    with open(ndjson_path, "rb") as f:
+        for doc_id, found in offsets.items():
+            if len(found) > 1:
+                hashes[doc_id] = content_hash(read_article(f, found))
+    return {doc_id: (hashes[doc_id], found) for doc_id, found in offsets.items()}
+
+
+def read_article(f, offsets):
+    """Статья из открытого NDJSON по смещениям её фрагментов (из hash_file)."""
+    return merge_fragments(read_record_at(f, offset) for offset in offsets)
+
+
+def _hashes_path(ndjson_path):
+    return ndjson_path + ".hashes.json"
+
+
+def load_hashes(ndjson_path):
+    """Хэши из файла рядом с NDJSON, если NDJSON с тех пор не менялся; иначе — пересчёт и сохранение."""
+    stat = os.stat(ndjson_path)
+    try:
+        with open(_hashes_path(ndjson_path), encoding="utf-8") as f:
+            stored = json.load(f)
+        if (stored.get("version") == HASHES_VERSION
+                and stored["size"] == stat.st_size and stored["mtime_ns"] == stat.st_mtime_ns):
+            return {doc_id: tuple(entry) for doc_id, entry in stored["hashes"].items()}
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    hashes = hash_file(ndjson_path)
+    with open(_hashes_path(ndjson_path), "w", encoding="utf-8") as f:
+        json.dump({"version": HASHES_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hashes": hashes},
+                  f, ensure_ascii=False)
+    return hashes
+
+
+def diff(old_hashes, new_hashes):
+    """
+    Набор изменений между двумя редакциями.
+
+    Returns:
+        dict: "added", "modified", "removed" — списки ID статей; "unchanged" — их число.
+    """
+    added = [doc_id for doc_id in new_hashes if doc_id not in old_hashes]
+    removed = [doc_id for doc_id in old_hashes if doc_id not in new_hashes]
+    modified = [doc_id for doc_id, (digest, _) in new_hashes.items()
+                if doc_id in old_hashes and old_hashes[doc_id][0] != digest]
+    unchanged = len(new_hashes) - len(added) - len(modified)
+    return {"added": added, "modified": modified, "removed": removed, "unchanged": unchanged}
+
+
+def changeset_actions(changeset, new_path, new_hashes):
+    """
+    Действия для es_bulk_loader: index — только новые и изменённые статьи, delete — удалённые.
+
+    Статьи читаются из нового NDJSON по смещениям, в порядке файла; фрагменты
+    одной статьи уходят одним документом.
+    """
+    changed = sorted(changeset["added"] + changeset["modified"], key=lambda doc_id: new_hashes[doc_id][1][0])
+    with open(new_path, "rb") as f:
+        for doc_id in changed:
+            yield "index", doc_id, read_article(f, new_hashes[doc_id][1])
+    for doc_id in changeset["removed"]:
+        yield "delete", doc_id, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Инкрементальная переиндексация новой редакции кодекса")
+    parser.add_argument("previous", help="NDJSON прошлой редакции (например, копия codigo_civil.ndjson)")
+    parser.add_argument("current", help="NDJSON новой редакции")
+    parser.add_argument("--changeset", help="сохранить набор изменений в JSON")
+    parser.add_argument("--url", help="Elasticsearch; без него изменения только считаются")
+    parser.add_argument("--index", default="laws")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    old_hashes = load_hashes(args.previous)
+    new_hashes = load_hashes(args.current)
+    changeset = diff(old_hashes, new_hashes)
+    print(f"Добавлено: {len(changeset['added'])}, изменено: {len(changeset['modified'])}, "
+          f"удалено: {len(changeset['removed'])}, без изменений: {changeset['unchanged']} "
+          f"({time.perf_counter() - started:.3f} с)")
+
+    if args.changeset:
+        with open(args.changeset, "w", encoding="utf-8") as f:
+            json.dump(changeset, f, ensure_ascii=False, indent=2)
+        print(f"Набор изменений сохранён в {args.changeset}")
+
+    if args.url:
+        from .es_bulk_loader import BulkLoader
+        loader = BulkLoader(args.url, args.index, workers=args.workers)
+        stats = loader.load(changeset_actions(changeset, args.current, new_hashes))
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
@@ -0,0 +1,182 @@
+import argparse
+import importlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+
+from .articles import slug
+from .autocomplete_index import AutocompleteIndex
+from .columnar_corpus import export as export_columnar
+from .json_stream import NdjsonWriter
+from .normalization import NormalizedWriter
+from .span_cache import SpanCache
+from .style_rules import PROFILES
+from .text_extraction import iter_pages, pdf_page_count
+
+# === НАСТРОЙКИ ===
+manifest_path = "manifest.json"  # список кодексов: PDF, book_name, экстрактор, профиль стилей
+
+# Имя -> (модуль, как он отдаёт статьи): "writer" — write_articles(pages, fout, page_count, ...), "iter" — iter_articles(pages, ...)
+EXTRACTORS = {
+    "bulk_civil": ("bulk_structure_extractor_codigo_civil", "writer"),
+    "bulk_penal": ("bulk_structure_codigo_penal", "writer"),
+    "civil_make": ("CIVIL_make_sstructure_with_text", "iter"),
+    "draft_penal": ("draft_PENAL", "iter"),
+}
+
+# Значения по умолчанию для ключей верхнего уровня манифеста
+MANIFEST_DEFAULTS = {
+    "output": "all_laws.ndjson",   # итоговый NDJSON всех кодексов
+    "parts_dir": ".ingest_parts",  # NDJSON по каждому кодексу до склейки
+    "normalize": True,             # normalization.py на выходе экстрактора
+    "fast": False,                 # быстрый режим извлечения: без колонтитулов и картинок
+    "span_cache_dir": None,        # кэш спанов (span_cache.py), None — без кэша
+    "workers": None,               # процессов; по умолчанию — по одному на документ
+    "columnar": None,              # копия output в колоночном формате (columnar_corpus.py), None — без неё
+    "autocomplete": None,          # индекс подсказок по заголовкам и статьям (autocomplete_index.py), None — без него
+}
+
+
+def load_manifest(path):
+    """
+    Читает и проверяет манифест; пути в нём — относительно файла манифеста.
+
+    Returns:
+        dict: настройки с MANIFEST_DEFAULTS и "documents" в порядке манифеста.
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = dict(MANIFEST_DEFAULTS, **json.load(f))
+    base = os.path.dirname(os.path.abspath(path))
+    for key in ("output", "parts_dir", "span_cache_dir", "columnar", "autocomplete"):
+        if manifest[key]:
+            manifest[key] = os.path.join(base, manifest[key])
+
+    seen = set()
+    for document in manifest["documents"]:
+        for key in ("book_name", "pdf_path", "extractor"):
+            if not document.get(key):
+                raise ValueError(f"в документе манифеста нет {key}: {document}")
+        if document["extractor"] not in EXTRACTORS:
+            raise ValueError(f"неизвестный экстрактор {document['extractor']!r}, есть: {', '.join(EXTRACTORS)}")
+        if document.get("style_profile") and document["style_profile"] not in PROFILES:
+            raise ValueError(f"неизвестный профиль стилей {document['style_profile']!r}, есть: {', '.join(PROFILES)}")
+        if document["book_name"] in seen:
+            raise ValueError(f"book_name {document['book_name']!r} встречается в манифесте дважды")
+        seen.add(document["book_name"])
+        document["pdf_path"] = os.path.join(base, document["pdf_path"])
+    return manifest
+
+
+def part_path(parts_dir, book_name):
+    """Путь к NDJSON одного кодекса до склейки."""
+    return os.path.join(parts_dir, slug(book_name) + ".ndjson")
+
+
+def ingest_document(document, parts_dir, normalize=True, span_cache_dir=None, fast=False):
+    """
+    Один кодекс -> <parts_dir>/<book_name>.ndjson. Выполняется в отдельном процессе.
+
+    Часть пишется во временный файл и подменяется атомарно: упавший прогон
+    оставляет прежнюю часть нетронутой.
+
+    Returns:
+        dict: book_name, путь к части, число статей, секунды.
+    """
+    started = time.perf_counter()
+    module_name, kind = EXTRACTORS[document["extractor"]]
+    module = importlib.import_module("." + module_name, __package__)
+    book_name = document["book_name"]
+    style_profile = document.get("style_profile") or module.style_profile
+    pdf_path = document["pdf_path"]
+    if span_cache_dir:
+        # Спаны документа из кэша одним отображённым файлом (span_store), PDF — только при промахе
+        cache = SpanCache(span_cache_dir)
+        pages = cache.span_store(pdf_path, fast)
+        page_count = pages.page_count
+    else:
+        pages = iter_pages(pdf_path, fast=fast)
+        page_count = pdf_page_count(pdf_path)
+    path = part_path(parts_dir, book_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    # Прогресс по страницам из разных процессов перемешался бы — итог печатает родитель
+    with open(tmp_path, "w", encoding="utf-8") as fout, open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        if kind == "writer":
+            module.write_articles(pages, fout, page_count, book_name, style_profile, normalize)
+        else:
+            sink = NormalizedWriter(NdjsonWriter(fout)) if normalize else NdjsonWriter(fout)
+            for article in module.iter_articles(pages, book_name, style_profile):
+                sink.write(article)
+    with open(tmp_path, "rb") as f:
+        articles = sum(1 for _ in f)
+    os.replace(tmp_path, path)
+    return {"book_name": book_name, "part": path, "articles": articles,
+            "seconds": round(time.perf_counter() - started, 2)}
+
+
+def publish(manifest):
+    """
+    Склеивает готовые части в output в порядке манифеста и атомарно заменяет его.
+
+    Кодексы, у которых части ещё нет, пропускаются. Следом из output собираются
+    колоночный корпус (columnar) и индекс подсказок (autocomplete), если они
+    заданы в манифесте, — тоже атомарно.
+
+    Returns:
+        list: book_name склеенных кодексов.
+    """
+    published = []
+    tmp_path = f"{manifest['output']}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as out:
+        for document in manifest["documents"]:
+            try:
+                part = open(part_path(manifest["parts_dir"], document["book_name"]), "rb")
+            except FileNotFoundError:
+                continue
+            with part:
+                shutil.copyfileobj(part, out)
+            published.append(document["book_name"])
+    os.replace(tmp_path, manifest["output"])
+    if manifest["columnar"]:
+        export_columnar(manifest["output"], manifest["columnar"])
+    if manifest["autocomplete"]:
+        AutocompleteIndex.build_file(manifest["output"]).save(manifest["autocomplete"])
+    return published
+
+
+def ingest(manifest):
+    """
+    Все документы манифеста параллельно (процесс на документ), затем склейка в output.
+
+    Части склеиваются в порядке манифеста, а не завершения, так что итоговый
+    файл детерминирован; output заменяется атомарно.
+    """
+    documents = manifest["documents"]
+    os.makedirs(manifest["parts_dir"], exist_ok=True)
+    workers = manifest["workers"] or len(documents)
+    results = {}
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(documents)))) as pool:
+        futures = {pool.submit(ingest_document, document, manifest["parts_dir"], manifest["normalize"],
+                               manifest["span_cache_dir"], manifest["fast"]): document["book_name"]
+                   for document in documents}
+        for future in as_completed(futures):
+            result = results[futures[future]] = future.result()
+            print(f"{result['book_name']}: {result['articles']} статей за {result['seconds']} с")
+
+    publish(manifest)
+    return [results[document["book_name"]] for document in documents]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Извлечение всех кодексов из манифеста в один NDJSON")
+    parser.add_argument("manifest", nargs="?", default=manifest_path)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = load_manifest(args.manifest)
+    results = ingest(manifest)
+    print(f"{sum(result['articles'] for result in results)} статей из {len(results)} документов "
+          f"за {time.perf_counter() - started:.2f} с -> {manifest['output']}")
@@ -0,0 +1,306 @@
+import json
+import signal
+import threading
+import time
+from collections import Counter
+
+# === НАСТРОЙКИ ===
+progress_interval = 1.0   # секунд между строками прогресса
+slow_page_ms = 50.0       # страница дольше этого попадает в slow-log
+slow_log_size = 100       # сколько самых медленных страниц хранить
+sample_interval = 0.001   # период сэмплирующего профайлера, секунд
+metrics_host = "127.0.0.1"  # интерфейс для /metrics; "" — все интерфейсы
+
+# Границы корзин гистограммы числа спанов на странице
+SPANS_PER_PAGE_BUCKETS = (0, 10, 25, 50, 100, 200, 500, 1000)
+
+_last_progress = 0.0
+
+
+def progress(page_num, page_count):
+    """Строка прогресса не чаще раза в progress_interval секунд (и всегда на последней странице)."""
+    global _last_progress
+    now = time.monotonic()
+    if now - _last_progress >= progress_interval or page_num + 1 == page_count:
+        _last_progress = now
+        print(f"Обрабатываем страницу {page_num + 1} из {page_count}")
+
+
+class _NoopTimer:
+    """Выключенные метрики: один общий объект, ни часов, ни словарей."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.seconds[self.stage] += elapsed
+        self.metrics.calls[self.stage] += 1
+        return False
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (le — верхняя граница включительно)."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def to_dict(self):
+        labels = [str(bound) for bound in self.bounds] + ["+Inf"]
+        return {"buckets": dict(zip(labels, self.counts)), "sum": self.total, "count": self.count}
+
+
+class _SamplingProfiler:
+    """Сэмплы стека главного потока по SIGPROF; вывод — collapsed stacks (flamegraph.pl, speedscope)."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += 1
+
+    def enable(self):
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def disable(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def dump_stats(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _PageScope:
+    __slots__ = ("metrics", "page_num", "span_count", "started")
+
+    def __init__(self, metrics, page_num, span_count):
+        self.metrics = metrics
+        self.page_num = page_num
+        self.span_count = span_count
+
+    def __enter__(self):
+        self.metrics._profile_enter(self.page_num)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics._page_done(self.page_num, self.span_count, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """
+    Таймеры стадий, счётчики, гистограммы и slow-log страниц.
+
+    Пока configure() не вызван, timer() и page() отдают общий пустой контекст —
+    в горячем цикле это почти бесплатно.
+    Стадии: pdf_open, get_text, cache_get, shard_wait, classify, normalize, json_encode, write, page.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.metrics_path = None
+        self.profile_pages = None
+        self.profile_output = None
+        self._profiler = None
+        self._profiling = False
+        self._server = None
+        self.reset()
+
+    def reset(self):
+        self.seconds = Counter()
+        self.calls = Counter()
+        self.counters = Counter()
+        self.histograms = {"spans_per_page": Histogram(SPANS_PER_PAGE_BUCKETS)}
+        self.slow_pages = []
+
+    def configure(self, metrics_path=None, prometheus_port=None, profile_pages=None,
+                  profiler="cprofile", profile_output=None):
+        """
+        Включает сбор.
+
+        metrics_path — файл, куда finish() запишет метрики: *.prom — текст Prometheus, иначе JSON.
+        prometheus_port — поднять http://localhost:port/metrics на время работы.
+        profile_pages — (start, end): профилировать только обработку этих страниц
+        (profiler "cprofile" -> .prof для pstats/snakeviz, "sampling" -> collapsed stacks).
+        """
+        self.enabled = bool(metrics_path or prometheus_port or profile_pages)
+        self.metrics_path = metrics_path
+        self.profile_pages = profile_pages
+        if profile_pages:
+            import cProfile
+            self._profiler = _SamplingProfiler(sample_interval) if profiler == "sampling" else cProfile.Profile()
+            suffix = "folded" if profiler == "sampling" else "prof"
+            self.profile_output = profile_output or f"profile_{profile_pages[0]}_{profile_pages[1]}.{suffix}"
+        if prometheus_port:
+            self.serve(prometheus_port)
+        return self
+
+    def timer(self, stage):
+        return _Timer(self, stage) if self.enabled else _NOOP
+
+    def page(self, page_num, span_count):
+        """Контекст обработки одной страницы: время, гистограмма спанов, slow-log, окно профайлера."""
+        return _PageScope(self, page_num, span_count) if self.enabled else _NOOP
+
+    def pages(self, pages, page_count=None):
+        """
+        Обёртка над итератором (page_num, spans): прогресс и page() вокруг обработки каждой страницы.
+
+        Страница считается обработанной, когда потребитель просит следующую.
+        Без page_count строка прогресса не печатается.
+        """
+        for page_num, spans in pages:
+            if page_count:
+                progress(page_num, page_count)
+            with self.page(page_num, len(spans)):
+                yield page_num, spans
+
+    def _page_done(self, page_num, span_count, elapsed):
+        self.seconds["page"] += elapsed
+        self.calls["page"] += 1
+        self.counters["pages"] += 1
+        self.counters["spans"] += span_count
+        self.histograms["spans_per_page"].observe(span_count)
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= slow_page_ms:
+            self.slow_pages.append({"page": page_num, "ms": round(elapsed_ms, 2), "spans": span_count})
+            if len(self.slow_pages) > slow_log_size * 2:
+                self._trim_slow_pages()
+        if self.profile_pages and page_num + 1 == self.profile_pages[1]:
+            self._profile_stop()
+
+    def _trim_slow_pages(self):
+        self.slow_pages.sort(key=lambda entry: entry["ms"], reverse=True)
+        del self.slow_pages[slow_log_size:]
+
+    def _profile_enter(self, page_num):
+        if self._profiler is not None and self.profile_pages[0] <= page_num < self.profile_pages[1]:
+            if not self._profiling:
+                self._profiling = True
+                self._profiler.enable()
+
+    def _profile_stop(self):
+        if not self._profiling:
+            return
+        self._profiler.disable()
+        self._profiling = False
+        self._profiler.dump_stats(self.profile_output)
+        print(f"Профиль страниц {self.profile_pages[0]}-{self.profile_pages[1] - 1} сохранён в {self.profile_output}")
+
+    def snapshot(self):
+        self._trim_slow_pages()
+        return {
+            "stages": {stage: {"seconds": round(self.seconds[stage], 6), "calls": self.calls[stage]}
+                       for stage in sorted(self.seconds)},
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            "slow_pages": list(self.slow_pages),
+        }
+
+    def prometheus_text(self, prefix="legal_bot"):
+        """Метрики в текстовом формате Prometheus."""
+        lines = [f"# TYPE {prefix}_stage_seconds_total counter"]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}'
+                  for stage, seconds in sorted(self.seconds.items())]
+        lines.append(f"# TYPE {prefix}_stage_calls_total counter")
+        lines += [f'{prefix}_stage_calls_total{{stage="{stage}"}} {calls}'
+                  for stage, calls in sorted(self.calls.items())]
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, histogram in self.histograms.items():
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            cumulative = 0
+            for label, count in histogram.to_dict()["buckets"].items():
+                cumulative += count
+                lines.append(f'{prefix}_{name}_bucket{{le="{label}"}} {cumulative}')
+            lines.append(f"{prefix}_{name}_sum {histogram.total}")
+            lines.append(f"{prefix}_{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host=None):
+        """Фоновый HTTP-сервер с /metrics для Prometheus; host=None — metrics_host (только localhost)."""
+        # http.server тянет email, ssl и socket — импорт только когда сервер нужен
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((metrics_host if host is None else host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def finish(self):
+        """Останавливает профайлер и пишет метрики в metrics_path."""
+        if not self.enabled:
+            return
+        self._profile_stop()
+        if self.metrics_path:
+            with open(self.metrics_path, "w", encoding="utf-8") as f:
+                if self.metrics_path.endswith(".prom"):
+                    f.write(self.prometheus_text())
+                else:
+                    json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+            print(f"Метрики сохранены в {self.metrics_path}")
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+# Общий объект на процесс: скрипты включают его через metrics.configure(...)
+metrics = Metrics()
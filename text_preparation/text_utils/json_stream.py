@@ -0,0 +1,167 @@
+import json
+
+from .instrumentation import metrics
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_AFTER_ITEM = ",]" + _WHITESPACE
+
+
+class JsonArrayWriter:
+    """
+    Пишет JSON-массив по одному элементу, не держа список в памяти.
+
+    Результат байт в байт совпадает с json.dump(items, f, ensure_ascii=False, indent=indent).
+    """
+
+    def __init__(self, f, indent=2):
+        self.f = f
+        self.indent = indent
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def write(self, item):
+        pad = " " * self.indent
+        with metrics.timer("json_encode"):
+            encoded = json.dumps(item, ensure_ascii=False, indent=self.indent)
+            encoded = ("[\n" if self.count == 0 else ",\n") + pad + encoded.replace("\n", "\n" + pad)
+        with metrics.timer("write"):
+            self.f.write(encoded)
+        self.count += 1
+
+    def close(self):
+        self.f.write("\n]" if self.count else "[]")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class NdjsonWriter:
+    """Пишет по одной JSON-строке на запись (формат для эластика)."""
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def write(self, item):
+        with metrics.timer("json_encode"):
+            encoded = json.dumps(item, ensure_ascii=False) + "\n"
+        with metrics.timer("write"):
+            self.f.write(encoded)
+        self.count += 1
+
+    def close(self):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def writer_for(f, output_format):
+    """Потоковый писатель по формату: "json" (массив с indent=2) или "ndjson"."""
+    if output_format == "ndjson":
+        return NdjsonWriter(f)
+    if output_format == "json":
+        return JsonArrayWriter(f)
+    raise ValueError(f"неизвестный формат вывода: {output_format}")
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """
+    Инкрементально разбирает JSON-массив из файла и отдаёт элементы по одному.
+
+    В памяти держится только текущий кусок файла и один элемент.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("неожиданный конец JSON-массива")
+            fill()
+            continue
+
+        char = buf[pos]
+        if not started:
+            if char != "[":
+                raise ValueError("ожидался JSON-массив")
+            started = True
+            pos += 1
+            continue
+        if char == "]":
+            return
+        if char == ",":
+            pos += 1
+            continue
+
+        try:
+            item, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        # Число на границе куска могло обрезаться ("1." из "1.25" разбирается как 1):
+        # элемент принимается, только если за ним уже видна запятая, "]" или пробел
+        if end == len(buf) or buf[end] not in _AFTER_ITEM:
+            if not eof:
+                fill()
+                continue
+            if end < len(buf):
+                raise json.JSONDecodeError("ожидалась запятая или ]", buf, end)
+        pos = end
+        yield item
+
+
+def iter_ndjson(f):
+    """Записи NDJSON-файла по одной; пустые строки пропускаются."""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_ndjson_offsets(path):
+    """(байтовое смещение строки, запись) — по смещению запись потом читается одним seek."""
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                yield offset, json.loads(line)
+            offset += len(line)
+
+
+def read_record_at(f, offset):
+    """Запись NDJSON по смещению из iter_ndjson_offsets; f открыт в режиме "rb"."""
+    f.seek(offset)
+    return json.loads(f.readline())
+
+
+def iter_records(path):
+    """Записи из JSON-массива или NDJSON (определяется по первому символу файла)."""
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first in _WHITESPACE:
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from iter_json_array(f)
+        else:
+            yield from iter_ndjson(f)
@@ -1,13 +1,19 @@
-import json
+from .json_stream import NdjsonWriter, iter_records
 
-input_path = "structure_with_text_penal.json"
+# Входные файлы (JSON-массив или NDJSON) склеиваются в один NDJSON в этом порядке
+input_paths = ["structure_with_text_penal.json"]
 output_path = "codigo_penal.ndjson"
 
-with open(input_path, "r", encoding="utf-8") as f:
-    articles = json.load(f)
 
-with open(output_path, "w", encoding="utf-8") as f:
-    for article in articles:
-        f.write(json.dumps(article, ensure_ascii=False) + "\n")
+def convert(input_paths, output_path):
+    """Потоковая конвертация: в памяти одна запись, сколько бы кодексов ни склеивалось."""
+    with open(output_path, "w", encoding="utf-8") as f, NdjsonWriter(f) as sink:
+        for input_path in input_paths:
+            for article in iter_records(input_path):
+                sink.write(article)
+    return sink.count
 
-print(f"NDJSON для эластика сохранён в {output_path}")
\ No newline at end of file
+
+if __name__ == "__main__":
+    convert(input_paths, output_path)
+    print(f"NDJSON для эластика сохранён в {output_path}")
@@ -0,0 +1,95 @@
+import re
+
+from .instrumentation import metrics
+
+# Начало примечания BOE: "7 Artículo redactado ...", "2 Apartado derogado ...", "5 Redactado conforme ..."
+_NOTE_VERBS = ("redactad", "derogad", "añadid", "suprimid", "introducid", "modificad", "renumerad",
+               "declarad", "anulad", "incorporad")
+_NOTE_NOUN = (r"(?:Título|Capítulo|Sección|Subsección|Artículo|Párrafo|Apartado|Número|Letra|Libro|"
+              r"Disposición|Precepto|Inciso|Rúbrica|Epígrafe|Frase|Punto|Regla)")
+# Без существительного глагол должен быть с заглавной: "5 derogado" в тексте статьи — не примечание
+_NOTE_HEAD = (rf"(?:{_NOTE_NOUN}(?:\s\S+){{0,4}}?\s(?:{'|'.join(_NOTE_VERBS)})"
+              rf"|(?:{'|'.join(verb.capitalize() for verb in _NOTE_VERBS)}))[oa]s?\b")
+
+# Примечание целиком: номер, заголовок, текст до точки (или до следующего примечания).
+# Шаблоны рассчитаны на текст, где пробелы уже схлопнуты до одиночных.
+_NOTE = rf" \d{{1,3}} (?P<note>{_NOTE_HEAD}.*?(?:\.(?= |$)|(?= \d{{1,3}} {_NOTE_HEAD})|$))"
+_NOTE_RE = re.compile(_NOTE, re.DOTALL)
+# Номер страницы или примечания между половинами перенесённого слова: "inte- 104 Redactado ... . 77 grarlos"
+_SPLIT = rf"(?:{_NOTE.replace('?P<note>', '?:')})*(?: \d{{1,4}})? (?=[a-záéíóúüñ])"
+
+# Одна скомпилированная альтернатива — один линейный проход re.sub по тексту.
+# Каждая ветка начинается с литерала (пробел, дефис, мягкий дефис), поэтому движок
+# перескакивает остальные символы без захода в ветки, а функция замены
+# вызывается только там, где текст действительно меняется.
+_NORMALIZE_RE = re.compile(
+    # Примечание и номер страницы сразу после него, если это не номер следующего примечания
+    rf"{_NOTE}(?: \d{{1,4}}(?= |$)(?! {_NOTE_HEAD}))?"
+    # Сноска в тексте: "Internacional 4 ." -> "Internacional."
+    r"| \d{1,3} (?=[.,;:])"
+    # Перенос в конце строки: "siem- pre", "represen- 26 tante"
+    rf"|-(?<=\w-)(?P<hyphen>{_SPLIT})"
+    # То же с мягким дефисом: "come\xad tidos"
+    rf"|\xad(?<=\w\xad)(?P<soft_hyphen>{_SPLIT})"
+    # Мягкий дефис вне переноса: "Decre\xadto" -> "Decreto", "más. \xad 2." -> "más. 2."
+    r"|\xad(?:(?<= \xad) )?",
+    re.DOTALL,
+)
+
+
+_NOTE_HYPHEN_RE = re.compile(r"(?<=\w)[-\xad] (?=[a-záéíóúüñ])|\xad")
+
+
+def _clean_note(note):
+    return _NOTE_HYPHEN_RE.sub("", note)
+
+
+def normalize_text(text):
+    """
+    Очистка текста статьи: схлопывание пробелов (str.split) и один проход регулярным выражением.
+
+    Returns:
+        tuple: (текст без переносов, сносок и лишних пробелов; список примечаний BOE).
+    """
+    notes = []
+
+    def replace(match):
+        kind = match.lastgroup
+        if kind == "note":
+            notes.append(_clean_note(match.group("note")))
+        elif kind in ("hyphen", "soft_hyphen") and len(match.group(kind)) > 1:
+            notes.extend(_clean_note(note.group("note")) for note in _NOTE_RE.finditer(match.group(kind)))
+        return ""
+
+    # Пробел в начале — чтобы примечание в самом начале текста тоже нашлось
+    return _NORMALIZE_RE.sub(replace, " " + " ".join(text.split())).strip(), notes
+
+
+def normalize_article(article):
+    """Копия статьи с очищенным текстом (поле "texto" или "text") и примечаниями в поле "notas"."""
+    with metrics.timer("normalize"):
+        field = "texto" if "texto" in article else "text"
+        text, notes = normalize_text(article.get(field) or "")
+        normalized = dict(article)
+        normalized[field] = text
+        normalized["notas"] = notes
+        return normalized
+
+
+class NormalizedWriter:
+    """Обёртка над писателем из json_stream: статьи нормализуются перед записью."""
+
+    def __init__(self, sink):
+        self.sink = sink
+
+    def __enter__(self):
+        return self
+
+    def write(self, article):
+        self.sink.write(normalize_article(article))
+
+    def close(self):
+        self.sink.close()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .instrumentation import metrics
+from .span_cache import SpanCache
+from .text_extraction import iter_pages, learn_body_clip, open_pdf
+
+# Сколько страниц получает один процесс за раз
+SHARD_SIZE = 16
+
+
+def _extract_shard(pdf_path, start, end, cache_dir=None, max_bytes=None, total_bytes=None,
+                   fast=False, body_clip=None):
+    """
+    Фаза 1: спаны страниц [start, end) в отдельном процессе (PDF открывается один раз на шард).
+
+    total_bytes — размер кэша, посчитанный родителем: шард не обходит каталог кэша сам.
+    """
+    if cache_dir is None:
+        return list(iter_pages(pdf_path, start, end, fast, body_clip)), None
+    cache = SpanCache(cache_dir, max_bytes, total_bytes)
+    pages = list(cache.iter_pages(pdf_path, start, end, fast, body_clip))
+    return pages, (cache.hits, cache.misses, cache.evictions, cache.written)
+
+
+def iter_pages_parallel(pdf_path, workers=None, shard_size=SHARD_SIZE, cache=None, fast=False):
+    """
+    Извлекает спаны пулом процессов и отдаёт страницы строго по порядку.
+
+    Классификация (libro/titulo/capitulo/articulo) остаётся последовательной:
+    её кормит этот генератор так же, как text_extraction.iter_pages.
+    workers=None — по числу ядер, workers<=1 — без пула.
+    cache (span_cache.SpanCache) — брать спаны из кэша; счётчики процессов
+    суммируются в счётчики этого объекта.
+    fast — быстрый режим text_extraction.iter_pages; полосы колонтитулов
+    учатся здесь один раз и передаются шардам.
+    Если в кэше уже есть все страницы, пул не запускается и PDF не открывается:
+    страницы читаются из кэша в этом процессе.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        yield from (cache.iter_pages(pdf_path, fast=fast) if cache is not None else iter_pages(pdf_path, fast=fast))
+        return
+    if cache is not None:
+        if cache.is_complete(pdf_path, fast):
+            yield from cache.iter_pages(pdf_path, fast=fast)
+            return
+        # Число страниц и полоса тела — из метаданных кэша (PDF открывается, только если их ещё нет)
+        page_count = cache.page_count(pdf_path)
+        body_clip = cache.fast_settings(pdf_path)[0] if fast else None
+        cache_args = (cache.cache_dir, cache.max_bytes, cache.total_bytes)
+    else:
+        with open_pdf(pdf_path) as pdf_document:
+            page_count = pdf_document.page_count
+            body_clip = learn_body_clip(pdf_document) if fast else None
+        cache_args = (None, None, None)
+    shards = [(start, min(start + shard_size, page_count))
+              for start in range(0, page_count, shard_size)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # В работе не больше двух шардов на процесс, чтобы не держать весь документ в памяти
+        pending = deque()
+        next_shard = 0
+        while pending or next_shard < len(shards):
+            while next_shard < len(shards) and len(pending) < workers * 2:
+                start, end = shards[next_shard]
+                pending.append(pool.submit(_extract_shard, pdf_path, start, end, *cache_args, fast, body_clip))
+                next_shard += 1
+            # Время ожидания шарда: извлечение идёт в других процессах и сюда не попадает
+            with metrics.timer("shard_wait"):
+                pages, cache_stats = pending.popleft().result()
+            if cache_stats is not None:
+                cache.merge_stats(*cache_stats)
+            yield from pages
+
+
+def scaling_curve(pdf_path, max_workers=None, shard_size=SHARD_SIZE):
+    """Замеряет страниц/сек для 1..max_workers процессов (только фаза извлечения)."""
+    max_workers = max_workers or os.cpu_count() or 1
+    curve = []
+    for workers in range(1, max_workers + 1):
+        started = time.perf_counter()
+        page_count = sum(1 for _ in iter_pages_parallel(pdf_path, workers, shard_size))
+        elapsed = time.perf_counter() - started
+        curve.append((workers, page_count / elapsed))
+    return curve
+
+
+if __name__ == "__main__":
+    # python -m text_preparation.text_utils.parallel_extraction ../../DATA/Codigo_Civil.pdf [max_workers]
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else '../../DATA/Codigo_Civil.pdf'
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    for workers, pages_per_sec in scaling_curve(pdf_path, max_workers):
+        print(f"{workers:>3} процессов: {pages_per_sec:8.1f} стр/с")
@@ -0,0 +1,357 @@
+import hashlib
+import json
+import marshal
+import os
+import shutil
+import zlib
+
+from .instrumentation import metrics
+from .span_store import SpanStore
+from .text_extraction import fast_text_flags, learn_body_clip, open_pdf, page_spans, pdf_page_count
+
+# Версия формата записи; при изменении старые записи просто не находятся
+CACHE_FORMAT = 1
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def pack_spans(spans):
+    """Список спанов страницы -> компактный бинарный вид (колонки + таблица шрифтов, marshal + zlib)."""
+    fonts = {}
+    record = (
+        [s["text"] for s in spans],
+        [fonts.setdefault(s["font"], len(fonts)) for s in spans],
+        [s["size"] for s in spans],
+        [s["color"] for s in spans],
+        [c for s in spans for c in s["bbox"]],
+    )
+    return zlib.compress(marshal.dumps((list(fonts),) + record), 1)
+
+
+def unpack_spans(data, page_num):
+    """Обратно к спанам в том же виде, что отдаёт text_extraction.iter_pages."""
+    fonts, texts, font_ids, sizes, colors, bboxes = marshal.loads(zlib.decompress(data))
+    return [
+        {
+            "text": texts[i],
+            "font": fonts[font_ids[i]],
+            "size": sizes[i],
+            "color": colors[i],
+            "bbox": tuple(bboxes[4 * i:4 * i + 4]),
+            "page": page_num,
+            "order": i,
+        }
+        for i in range(len(texts))
+    ]
+
+
+class SpanCache:
+    """
+    Постраничный кэш спанов на диске.
+
+    Ключ — sha256 содержимого PDF, номер страницы и режим извлечения (в быстром
+    режиме — вместе с флагами get_text и полосой тела страницы), так что правка
+    правил классификации не требует повторного прогона PyMuPDF, а изменённый PDF
+    сам по себе даёт промахи. Размер ограничен max_bytes: лишнее вытесняется по
+    давности последнего обращения. Испорченная запись считается промахом и удаляется.
+    Рядом с записями страниц лежит весь документ в колоночном виде (span_store),
+    его читают экстракторы при тёплом кэше.
+    """
+
+    def __init__(self, cache_dir=".span_cache", max_bytes=DEFAULT_MAX_BYTES, total_bytes=None):
+        """total_bytes — уже известный размер кэша (его передаёт шардам пул); None — посчитать при первой записи."""
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.written = 0
+        self._hashes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = total_bytes
+
+    @property
+    def total_bytes(self):
+        """Оценка размера кэша: обход каталога — один раз, дальше учитываются свои записи."""
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        return self._total_bytes
+
+    def merge_stats(self, hits, misses, evictions, written):
+        """Добавляет счётчики кэша другого процесса (шарда пула), работавшего с тем же каталогом."""
+        self.hits += hits
+        self.misses += misses
+        self.evictions += evictions
+        self.written += written
+        if self._total_bytes is not None:
+            self._total_bytes += written
+
+    def _entries(self, directory=None):
+        """(путь, размер, mtime) всех записей в кэше или в одном его подкаталоге."""
+        for root, _, files in os.walk(directory or self.cache_dir):
+            for name in files:
+                if name.endswith((".bin", ".store")):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def pdf_hash(self, pdf_path):
+        """sha256 содержимого PDF; пересчитывается, только если у файла поменялись размер или mtime."""
+        stat = os.stat(pdf_path)
+        key = os.path.abspath(pdf_path)
+        known = self._hashes.get(key)
+        if known and known[0] == (stat.st_size, stat.st_mtime_ns):
+            return known[1]
+        digest = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        pdf_hash = digest.hexdigest()
+        self._hashes[key] = ((stat.st_size, stat.st_mtime_ns), pdf_hash)
+        self._forget_old_versions(key, pdf_hash)
+        return pdf_hash
+
+    def _forget_old_versions(self, pdf_key, pdf_hash):
+        # sources.json: какой хэш был у каждого PDF в прошлый раз; старую версию удаляем целиком
+        sources_path = os.path.join(self.cache_dir, "sources.json")
+        try:
+            with open(sources_path, encoding="utf-8") as f:
+                sources = json.load(f)
+        except (FileNotFoundError, ValueError):
+            sources = {}
+        previous = sources.get(pdf_key)
+        if previous == pdf_hash:
+            return
+        sources[pdf_key] = pdf_hash
+        if previous and previous not in sources.values():
+            self.invalidate(previous)
+        tmp_path = sources_path + f".{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(sources, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, sources_path)
+
+    def invalidate(self, pdf_hash):
+        """Удаляет все записи одной версии PDF."""
+        doc_dir = os.path.join(self.cache_dir, pdf_hash)
+        removed = sum(size for _, size, _ in self._entries(doc_dir))
+        shutil.rmtree(doc_dir, ignore_errors=True)
+        if self._total_bytes is not None:
+            self._total_bytes -= removed
+
+    def _page_path(self, pdf_hash, page_num, flags):
+        return os.path.join(self.cache_dir, pdf_hash, f"v{CACHE_FORMAT}-{flags}", f"{page_num}.bin")
+
+    def _store_path(self, pdf_hash, flags):
+        return os.path.join(self.cache_dir, pdf_hash, f"v{CACHE_FORMAT}-{flags}", "spans.store")
+
+    def get(self, pdf_hash, page_num, flags="dict"):
+        path = self._page_path(pdf_hash, page_num, flags)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            spans = unpack_spans(data, page_num)
+        except (zlib.error, EOFError, ValueError, TypeError, IndexError):
+            # Обрезанная или испорченная запись (например, диск кончился посреди записи) — промах
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            else:
+                if self._total_bytes is not None:
+                    self._total_bytes -= len(data)
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path)  # для вытеснения по давности
+        except FileNotFoundError:
+            pass
+        return spans
+
+    def put(self, pdf_hash, page_num, spans, flags="dict"):
+        path = self._page_path(pdf_hash, page_num, flags)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = pack_spans(spans)
+        tmp_path = path + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._total_bytes = self.total_bytes + len(data)
+        self.written += len(data)
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Удаляет самые давние записи, пока кэш не уложится в 90% max_bytes (чтобы не сканировать диск на каждый put)."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._total_bytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def iter_pages(self, pdf_path, start=0, end=None, fast=False, body_clip=None):
+        """
+        То же, что text_extraction.iter_pages, но через кэш.
+
+        PDF открывается только при первом промахе; при полностью тёплом кэше
+        PyMuPDF не парсит документ вовсе (число страниц, полоса тела страницы и
+        флаги быстрого режима хранятся рядом с записями). Быстрый режим (fast)
+        хранится отдельно для каждой пары флаги + полоса: другая полоса — другие спаны.
+        """
+        pdf_hash = self.pdf_hash(pdf_path)
+        pdf_document = None
+        try:
+            page_count = self.page_count(pdf_path)
+            end = page_count if end is None else min(end, page_count)
+            text_flags = None
+            if fast:
+                learned_clip, text_flags = self.fast_settings(pdf_path)
+                body_clip = learned_clip if body_clip is None else body_clip
+            flags = self.mode_key(fast, body_clip, text_flags)
+            for page_num in range(start, end):
+                with metrics.timer("cache_get"):
+                    spans = self.get(pdf_hash, page_num, flags)
+                if spans is None:
+                    if pdf_document is None:
+                        with metrics.timer("pdf_open"):
+                            pdf_document = open_pdf(pdf_path)
+                    spans = page_spans(pdf_document[page_num], page_num, body_clip, text_flags)
+                    self.put(pdf_hash, page_num, spans, flags)
+                yield page_num, spans
+        finally:
+            if pdf_document is not None:
+                pdf_document.close()
+
+    def span_store(self, pdf_path, fast=False, pages=None):
+        """
+        Спаны всего документа как span_store.SpanStore — один файл кэша, отображаемый в память.
+
+        Тёплый кэш открывает этот файл вместо распаковки записей по страницам (попаданием
+        считается каждая страница). Если файла нет или он испорчен, хранилище собирается
+        из pages (например, parallel_extraction.iter_pages_parallel) или из self.iter_pages
+        и сохраняется; pages при тёплом кэше не читаются вовсе.
+        """
+        pdf_hash = self.pdf_hash(pdf_path)
+        body_clip, text_flags = self.fast_settings(pdf_path) if fast else (None, None)
+        path = self._store_path(pdf_hash, self.mode_key(fast, body_clip, text_flags))
+        try:
+            with metrics.timer("cache_get"):
+                store = SpanStore.load(path)
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError):
+            # Обрезанный или испорченный файл — собираем заново
+            size = os.path.getsize(path)
+            os.remove(path)
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+        else:
+            self.hits += store.page_count
+            return store
+        store = SpanStore.from_pages(pages if pages is not None else self.iter_pages(pdf_path, fast=fast))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        store.save(path)
+        size = os.path.getsize(path)
+        self._total_bytes = self.total_bytes + size
+        self.written += size
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+        return store
+
+    @staticmethod
+    def mode_key(fast, body_clip=None, text_flags=None):
+        """Режим извлечения в ключе записи: "dict" или "fast-f<флаги>-c<x0_y0_x1_y1>" ("c" — без полосы)."""
+        if not fast:
+            return "dict"
+        clip = "_".join(f"{value:g}" for value in body_clip) if body_clip else ""
+        return f"fast-f{text_flags}-c{clip}"
+
+    def _meta_path(self, pdf_path, name):
+        return os.path.join(self.cache_dir, self.pdf_hash(pdf_path), name)
+
+    def _write_meta(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + f".{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def page_count(self, pdf_path):
+        """Число страниц PDF: из кэша, а при первом обращении — из PyMuPDF."""
+        meta_path = self._meta_path(pdf_path, "page_count")
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            pass
+        page_count = pdf_page_count(pdf_path)
+        self._write_meta(meta_path, str(page_count))
+        return page_count
+
+    def fast_settings(self, pdf_path):
+        """
+        (полоса тела страницы, флаги get_text) быстрого режима: text_extraction.learn_body_clip
+        и fast_text_flags.
+
+        Учатся один раз на версию PDF и хранятся в кэше, так что тёплый кэш не
+        импортирует PyMuPDF; при смене правил обучения колонтитулов каталог кэша
+        нужно очистить.
+        """
+        meta_path = self._meta_path(pdf_path, "fast.json")
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                settings = json.load(f)
+            return (tuple(settings["body_clip"]) if settings["body_clip"] else None), settings["text_flags"]
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass
+        with metrics.timer("pdf_open"):
+            pdf_document = open_pdf(pdf_path)
+        with pdf_document:
+            body_clip = learn_body_clip(pdf_document)
+        text_flags = fast_text_flags()
+        self._write_meta(meta_path, json.dumps({"body_clip": body_clip, "text_flags": text_flags}))
+        return body_clip, text_flags
+
+    def is_complete(self, pdf_path, fast=False, body_clip=None):
+        """
+        Есть ли в кэше все страницы PDF в этом режиме (проверяются только метаданные и
+        наличие файлов — PDF не открывается).
+        """
+        pdf_hash = self.pdf_hash(pdf_path)
+        try:
+            with open(self._meta_path(pdf_path, "page_count"), encoding="utf-8") as f:
+                page_count = int(f.read())
+            text_flags = None
+            if fast:
+                with open(self._meta_path(pdf_path, "fast.json"), encoding="utf-8") as f:
+                    settings = json.load(f)
+                text_flags = settings["text_flags"]
+                if body_clip is None:
+                    body_clip = settings["body_clip"]
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return False
+        flags = self.mode_key(fast, body_clip, text_flags)
+        return all(os.path.exists(self._page_path(pdf_hash, page_num, flags)) for page_num in range(page_count))
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "written": self.written,
+            # Пересчитываем с диска: в кэш могли писать и процессы пула
+            "bytes": sum(size for _, size, _ in self._entries()),
+        }
@@ -0,0 +1,212 @@
+import sys
+
+import numpy as np
+
+from .array_file import load_arrays, save_arrays
+from .instrumentation import metrics
+
+# Коды уровней в массиве, который возвращает classify_store (-1 — обычный текст)
+LEVELS = ("libro", "titulo", "capitulo", "articulo")
+
+# Колонки хранилища в файле array_file; таблица шрифтов — в meta
+_COLUMNS = ("page", "order", "font_id", "size", "color", "bbox", "text_offsets", "text_blob", "page_offsets")
+
+
+class SpanStore:
+    """
+    Колоночное хранилище спанов всего документа.
+
+    Вместо словаря на каждый спан: массивы page/order/font_id/size/color/bbox,
+    таблица шрифтов (font_id -> имя) и один UTF-8 буфер текста со смещениями.
+    size и bbox хранятся во float32 — PyMuPDF сам отдаёт их из float, так что
+    значения совпадают бит в бит. Сохранённое хранилище — один файл array_file:
+    открытие отображает его в память и не читает целиком (span_cache держит
+    такой файл на каждый документ).
+    """
+
+    def __init__(self, fonts, page, order, font_id, size, color, bbox, text_offsets, text_blob, page_offsets):
+        self.fonts = list(fonts)
+        self.page = page
+        self.order = order
+        self.font_id = font_id
+        self.size = size
+        self.color = color
+        self.bbox = bbox
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob
+        self.page_offsets = page_offsets
+
+    @classmethod
+    def from_pages(cls, pages):
+        """Собирает хранилище из (page_num, spans) — text_extraction.iter_pages, кэша или пула процессов."""
+        fonts = {}
+        page, order, font_id, size, color, bbox = [], [], [], [], [], []
+        text_offsets = [0]
+        chunks = []
+        blob_len = 0
+        page_offsets = [0]
+        for page_num, spans in pages:
+            # Страницы могут начинаться не с нуля: пустые страницы дополняем
+            while len(page_offsets) <= page_num:
+                page_offsets.append(len(page))
+            for span in spans:
+                encoded = span["text"].encode("utf-8")
+                chunks.append(encoded)
+                blob_len += len(encoded)
+                text_offsets.append(blob_len)
+                page.append(page_num)
+                order.append(span["order"])
+                font_id.append(fonts.setdefault(sys.intern(span["font"]), len(fonts)))
+                size.append(span["size"])
+                color.append(span["color"])
+                bbox.append(span["bbox"])
+            page_offsets.append(len(page))
+        return cls(
+            fonts=list(fonts),
+            page=np.array(page, dtype=np.int32),
+            order=np.array(order, dtype=np.int32),
+            font_id=np.array(font_id, dtype=np.int16),
+            size=np.array(size, dtype=np.float32),
+            color=np.array(color, dtype=np.uint32),
+            bbox=np.array(bbox, dtype=np.float32).reshape(-1, 4),
+            text_offsets=np.array(text_offsets, dtype=np.int64),
+            text_blob=np.frombuffer(b"".join(chunks), dtype=np.uint8),
+            page_offsets=np.array(page_offsets, dtype=np.int64),
+        )
+
+    def __len__(self):
+        return len(self.page)
+
+    @property
+    def page_count(self):
+        return len(self.page_offsets) - 1
+
+    def page_range(self, page_num):
+        """Индексы [start, end) спанов страницы."""
+        return int(self.page_offsets[page_num]), int(self.page_offsets[page_num + 1])
+
+    def text(self, index):
+        start, end = self.text_offsets[index], self.text_offsets[index + 1]
+        return self.text_blob[start:end].tobytes().decode("utf-8")
+
+    def font_ids(self, font=None, font_contains=None):
+        """Номера шрифтов из таблицы по точному имени или подстроке."""
+        if font is not None:
+            return [i for i, name in enumerate(self.fonts) if name == font]
+        return [i for i, name in enumerate(self.fonts) if font_contains in name]
+
+    def style_mask(self, font=None, font_contains=None, size=None, tol=None, size_range=None, bounds="[]", start=0, end=None):
+        """
+        Векторная маска спанов [start, end) по стилю — те же поля, что у правил style_rules.
+
+        Размеры сравниваются во float64, как в построчных классификаторах.
+        """
+        end = len(self) if end is None else end
+        mask = np.isin(self.font_id[start:end], self.font_ids(font, font_contains))
+        sizes = self.size[start:end].astype(np.float64)
+        if size is not None:
+            mask &= np.abs(sizes - size) < tol
+        if size_range is not None:
+            low, high = size_range
+            mask &= (sizes >= low) if bounds[0] == "[" else (sizes > low)
+            mask &= (sizes <= high) if bounds[1] == "]" else (sizes < high)
+        return mask
+
+    def to_dicts(self, start=0, end=None):
+        """Спаны [start, end) в виде словарей text_extraction — для отладочных JSON-дампов."""
+        end = len(self) if end is None else end
+        return [
+            {
+                "text": self.text(i),
+                "font": self.fonts[self.font_id[i]],
+                "size": float(self.size[i]),
+                "color": int(self.color[i]),
+                "bbox": [float(c) for c in self.bbox[i]],
+            }
+            for i in range(start, end)
+        ]
+
+    def save(self, path):
+        save_arrays(path, "span_store", {name: getattr(self, name) for name in _COLUMNS}, {"fonts": self.fonts})
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Открывает сохранённое хранилище; при mmap=True колонки отображаются с диска."""
+        columns, meta = load_arrays(path, "span_store", mmap)
+        return cls(fonts=meta["fonts"], **columns)
+
+
+def classify_store(classifier, store, start=0, end=None):
+    """
+    Классифицирует спаны [start, end) хранилища целиком.
+
+    Сначала для каждой уникальной пары (шрифт, размер) один раз решается,
+    может ли к ней относиться хоть одно правило, и маска отбрасывает все
+    остальные спаны без единого обращения к тексту. Регулярка проверяется
+    только у оставшихся. Возвращает массив int8 с индексами LEVELS или -1.
+    """
+    end = len(store) if end is None else end
+    font_ids = store.font_id[start:end]
+    sizes = store.size[start:end]
+    levels = np.full(end - start, -1, dtype=np.int8)
+
+    # Ключ стиля: font_id в старших 32 битах, биты float32-размера в младших
+    style_keys = (font_ids.astype(np.int64) << 32) | sizes.view(np.uint32).astype(np.int64)
+    styles, first, inverse = np.unique(style_keys, return_index=True, return_inverse=True)
+    has_rules = np.array([
+        classifier.has_rules(store.fonts[font_ids[i]], float(sizes[i])) for i in first
+    ], dtype=bool)
+    candidates = np.flatnonzero(has_rules[inverse.ravel()])
+
+    # Текст диапазона читается одним куском, а не по срезу на спан
+    offsets = store.text_offsets[start:end + 1]
+    base = int(offsets[0])
+    blob = store.text_blob[base:int(offsets[-1])].tobytes()
+    offsets = (offsets - base).tolist()
+    fonts = [store.fonts[font_id] for font_id in font_ids[candidates].tolist()]
+    candidate_sizes = sizes[candidates].tolist()
+
+    level_codes = {level: code for code, level in enumerate(LEVELS)}
+    classify = classifier.classify
+    for i, font, size in zip(candidates.tolist(), fonts, candidate_sizes):
+        text = blob[offsets[i]:offsets[i + 1]].decode("utf-8").strip()
+        level = classify(font, size, text)
+        if level is not None:
+            levels[i] = level_codes[level]
+    return levels
+
+
+def classified_pages(pages, classifier):
+    """
+    Страницы для экстракторов: (page_num, [(текст после strip, уровень или None)]).
+
+    pages — SpanStore (уровни всего документа считает classify_store, текст страницы
+    декодируется из общего буфера) или поток (page_num, spans) из text_extraction.iter_pages,
+    кэша или пула процессов — тогда StyleClassifier.classify_page по странице.
+    """
+    if not isinstance(pages, SpanStore):
+        for page_num, spans in pages:
+            yield page_num, list(zip([span["text"].strip() for span in spans], classifier.classify_page(spans)))
+        return
+    store = pages
+    with metrics.timer("classify"):
+        levels = classify_store(classifier, store).tolist()
+    names = LEVELS + (None,)   # -1 -> None
+    offsets = store.text_offsets.tolist()
+    for page_num in range(store.page_count):
+        start, end = store.page_range(page_num)
+        base = offsets[start]
+        blob = store.text_blob[base:offsets[end]].tobytes()
+        yield page_num, [(blob[offsets[i] - base:offsets[i + 1] - base].decode("utf-8").strip(), names[levels[i]])
+                         for i in range(start, end)]
+
+
+if __name__ == "__main__":
+    # python -m text_preparation.text_utils.span_store ../../DATA/codigo_penal.pdf penal.spans
+    from .text_extraction import iter_pages
+
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else '../../DATA/codigo_penal.pdf'
+    output_path = sys.argv[2] if len(sys.argv) > 2 else 'penal.spans'
+    store = SpanStore.from_pages(iter_pages(pdf_path))
+    store.save(output_path)
+    print(f"{len(store)} спанов, {store.page_count} страниц, {len(store.fonts)} шрифтов сохранены в {output_path}")
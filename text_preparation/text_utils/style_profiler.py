@@ -0,0 +1,275 @@
+import argparse
+import json
+import pprint
+import re
+import time
+
+import numpy as np
+
+from .style_rules import PROFILES, StyleClassifier
+from .text_extraction import fast_text_flags, learn_body_clip, open_pdf, page_spans
+
+# === НАСТРОЙКИ ===
+sample_pages = 40   # страниц, равномерно выбранных из документа
+min_pages = 3       # на скольких страницах должен встретиться уровень; иначе — доискивание по тексту
+size_merge = 0.3    # размеры одного шрифта ближе этого — один стиль (9.5 / 9.64 / 9.73 в civil)
+size_tol = 0.2      # tol правила с одним размером, как в ручных профилях
+size_pad = 0.05     # запас к краям size_range: в выборку попадают не все размеры полосы
+max_headings = 6    # больше строк LIBRO/TÍTULO/CAPÍTULO на странице — это оглавление, она не учитывается
+
+# Шаблоны начала заголовка: (уровень, регулярное выражение). Первый подошедший — шаблон спана.
+HEADING_PATTERNS = (
+    ("libro", r"LIBRO\b"),
+    ("titulo", r"TÍTULO\b"),
+    ("capitulo", r"CAPÍTULO\b"),
+    ("articulo", r"(?:Artículo|ARTÍCULO)\s+\d+"),
+    ("articulo", r"\d+\."),
+)
+LEVELS = ("libro", "titulo", "capitulo", "articulo")
+_PATTERN_RE = re.compile("|".join(f"(?P<p{i}>{pattern})" for i, (_, pattern) in enumerate(HEADING_PATTERNS)))
+_SECTION_PATTERNS = frozenset(i for i, (level, _) in enumerate(HEADING_PATTERNS) if level != "articulo")
+_SECTION_LINE_RE = re.compile("|".join(f"^\\s*{pattern}" for level, pattern in HEADING_PATTERNS if level != "articulo"), re.M)
+# 1/φ: страницы n * 0.618 mod 1 покрывают документ равномерно при любой длине префикса
+_GOLDEN = 0.6180339887498949
+
+
+def _leading_pattern(text):
+    match = _PATTERN_RE.match(text)
+    return -1 if match is None else int(match.lastgroup[1:])
+
+
+class _Sample:
+    """
+    Спаны выборки как параллельные массивы: номер стиля (шрифт, размер), шаблон начала, страница.
+
+    Страницы оглавления (больше max_headings разделов) пропускаются: там заголовки
+    набраны мелким шрифтом десятками и перевесили бы основной текст.
+    """
+
+    def __init__(self):
+        self.styles = {}
+        self.style_ids, self.pattern_ids, self.pages = [], [], []
+        self.sampled = []
+        self.index_pages = []
+        self.spans = []
+
+    def add_page(self, page_num, spans):
+        self.sampled.append(page_num)
+        texts = [(span, span["text"].strip()) for span in spans]
+        texts = [(span, text, _leading_pattern(text)) for span, text in texts if text]
+        if sum(pattern in _SECTION_PATTERNS for _, _, pattern in texts) > max_headings:
+            self.index_pages.append(page_num)
+            return
+        for span, text, pattern in texts:
+            self.style_ids.append(self.styles.setdefault((span["font"], span["size"]), len(self.styles)))
+            self.pattern_ids.append(pattern)
+            self.pages.append(page_num)
+            self.spans.append((span["font"], span["size"], text))
+
+    def arrays(self):
+        return (np.array(self.style_ids, dtype=np.int64), np.array(self.pattern_ids, dtype=np.int64),
+                np.array(self.pages, dtype=np.int64))
+
+
+def _histograms(sample):
+    """
+    Гистограммы по (шаблон, стиль): совпадения, число страниц с совпадением, а также
+    число спанов каждого стиля — всё через bincount, без циклов по спанам.
+    """
+    style_ids, pattern_ids, pages = sample.arrays()
+    n_styles = len(sample.styles)
+    totals = np.bincount(style_ids, minlength=n_styles)
+    matched = pattern_ids >= 0
+    keys = pattern_ids[matched] * n_styles + style_ids[matched]
+    size = len(HEADING_PATTERNS) * n_styles
+    matches = np.bincount(keys, minlength=size).reshape(len(HEADING_PATTERNS), n_styles)
+    # Пара (ключ, страница) считается один раз: оглавление с двадцатью "CAPÍTULO" на одной
+    # странице весит как одна страница основного текста
+    stride = int(pages.max(initial=0)) + 1
+    page_keys = np.unique(keys * stride + pages[matched]) // stride
+    page_counts = np.bincount(page_keys, minlength=size).reshape(len(HEADING_PATTERNS), n_styles)
+    return totals, matches, page_counts
+
+
+def _pattern_levels():
+    return np.array([LEVELS.index(level) for level, _ in HEADING_PATTERNS])
+
+
+def _missing_levels(sample):
+    """Уровни, встреченные меньше чем на min_pages страницах выборки."""
+    if not sample.styles:
+        return set(LEVELS)
+    _, _, page_counts = _histograms(sample)
+    pattern_levels = _pattern_levels()
+    return {level for i, level in enumerate(LEVELS) if page_counts[pattern_levels == i].sum() < min_pages}
+
+
+def _scan_for_levels(pdf_document, sample, levels, body_clip, flags):
+    """
+    Доискивание редких уровней (LIBRO — несколько страниц на кодекс): дешёвый текстовый
+    просмотр страниц вне выборки в порядке 1/φ, пока у каждого уровня не наберётся
+    min_pages страниц со строкой, начинающейся с его шаблона. Найденные страницы
+    (кроме оглавления) извлекаются со стилями и добавляются в выборку.
+    """
+    line_res = {level: re.compile("|".join(f"^\\s*{pattern}" for pattern_level, pattern in HEADING_PATTERNS
+                                           if pattern_level == level), re.M)
+                for level in levels}
+    needed = dict.fromkeys(levels, min_pages)
+    seen = set(sample.sampled)
+    order = np.argsort((np.arange(pdf_document.page_count) * _GOLDEN) % 1, kind="stable")
+    scanned = 0
+    for page_num in order.tolist():
+        if not needed:
+            break
+        if page_num in seen:
+            continue
+        scanned += 1
+        page = pdf_document[page_num]
+        text = page.get_text("text", flags=flags, clip=body_clip)
+        found = [level for level in needed if line_res[level].search(text)]
+        if not found or len(_SECTION_LINE_RE.findall(text)) > max_headings:
+            continue
+        sample.add_page(page_num, page_spans(page, page_num, body_clip, flags))
+        for level in found:
+            needed[level] -= 1
+            if not needed[level]:
+                del needed[level]
+    return scanned
+
+
+def _rule(level, pattern, font, sizes):
+    rule = {"level": level, "font": font}
+    if len(sizes) == 1:
+        rule.update(size=round(sizes[0], 2), tol=size_tol)
+    else:
+        rule.update(size_range=(round(min(sizes) - size_pad, 2), round(max(sizes) + size_pad, 2)), bounds="[]")
+    rule["pattern"] = pattern
+    return rule
+
+
+def propose_profile(sample):
+    """
+    Профиль стилей по выборке: для каждого уровня — лучший (шаблон, шрифт, размер).
+
+    Сила кандидата — число страниц с совпадением, умноженное на долю совпадений среди
+    всех спанов этого стиля: жирный "17." (почти каждый спан стиля — номер статьи)
+    обгоняет нумерованные абзацы основного текста, хотя страниц у них сопоставимо.
+    Уверенность = доля силы победителя среди всех кандидатов уровня, умноженная на
+    полноту поддержки (страниц / min_pages, не больше 1). Соседние размеры того же
+    шрифта с не меньшей половины долей совпадений сливаются в size_range.
+
+    Returns:
+        tuple: (правила в формате style_rules.PROFILES, отчёт по уровням).
+    """
+    totals, matches, page_counts = _histograms(sample)
+    rate = matches / np.maximum(totals, 1)
+    strength = page_counts * rate
+    styles = list(sample.styles)
+    pattern_levels = _pattern_levels()
+    rules, report = [], {}
+    for level_index, level in enumerate(LEVELS):
+        level_strength = np.where((pattern_levels == level_index)[:, None], strength, 0.0)
+        total_strength = level_strength.sum()
+        if total_strength == 0:
+            report[level] = {"confidence": 0.0, "pages": 0, "matches": 0, "candidates": []}
+            continue
+        ranked = np.argsort(level_strength, axis=None)[::-1]
+        candidates = []
+        for flat in ranked[:4].tolist():
+            pattern_id, style_id = divmod(flat, len(styles))
+            if level_strength[pattern_id, style_id] == 0:
+                break
+            font, size = styles[style_id]
+            candidates.append({
+                "font": font, "size": round(size, 2), "pattern": HEADING_PATTERNS[pattern_id][1],
+                "pages": int(page_counts[pattern_id, style_id]), "matches": int(matches[pattern_id, style_id]),
+                "spans": int(totals[style_id]), "share": round(float(level_strength[pattern_id, style_id] / total_strength), 3),
+            })
+        pattern_id, best_style = divmod(int(ranked[0]), len(styles))
+        font, best_size = styles[best_style]
+        merged = [style_id for style_id, (other_font, size) in enumerate(styles)
+                  if other_font == font and abs(size - best_size) <= size_merge
+                  and rate[pattern_id, style_id] >= rate[pattern_id, best_style] / 2]
+        pages = int(page_counts[pattern_id, merged].sum())
+        dominance = float(level_strength[pattern_id, merged].sum() / total_strength)
+        confidence = dominance * min(1.0, pages / min_pages)
+        rules.append(_rule(level, HEADING_PATTERNS[pattern_id][1], font, sorted(styles[i][1] for i in merged)))
+        report[level] = {"confidence": round(confidence, 3), "pages": pages,
+                         "matches": int(matches[pattern_id, merged].sum()), "candidates": candidates}
+    return rules, report
+
+
+def profile_pdf(pdf_path, pages=sample_pages):
+    """
+    Выборка страниц PDF и предложенный профиль.
+
+    Страницы читаются в быстром режиме (text_extraction): колонтитулы с номерами
+    страниц отрезаются и не путаются с номерами статей.
+
+    Returns:
+        dict: rules, levels (уверенность и кандидаты), число страниц выборки и доискивания,
+        время; "sample" — сами спаны (для сравнения с ручным профилем).
+    """
+    started = time.perf_counter()
+    sample = _Sample()
+    with open_pdf(pdf_path) as pdf_document:
+        page_count = pdf_document.page_count
+        body_clip = learn_body_clip(pdf_document)
+        flags = fast_text_flags()
+        for page_num in sorted({round(i * (page_count - 1) / max(pages - 1, 1)) for i in range(min(pages, page_count))}):
+            sample.add_page(page_num, page_spans(pdf_document[page_num], page_num, body_clip, flags))
+        sampled = len(sample.sampled)
+        missing = _missing_levels(sample)
+        scanned = _scan_for_levels(pdf_document, sample, missing, body_clip, flags) if missing else 0
+    rules, levels = propose_profile(sample)
+    return {
+        "rules": rules, "levels": levels, "page_count": page_count, "sampled_pages": sampled,
+        "scanned_pages": scanned, "added_pages": len(sample.sampled) - sampled, "index_pages": sample.index_pages,
+        "seconds": round(time.perf_counter() - started, 2), "sample": sample.spans,
+    }
+
+
+def compare(rules, reference_rules, spans):
+    """
+    Согласие двух профилей на спанах выборки по уровням: сколько заголовков нашёл
+    каждый и на скольких они совпали (спаны, где оба профиля молчат, не считаются).
+    """
+    proposed, reference = StyleClassifier(rules), StyleClassifier(reference_rules)
+    result = {level: {"reference": 0, "proposed": 0, "agree": 0} for level in LEVELS}
+    for font, size, text in spans:
+        expected, got = reference.classify(font, size, text), proposed.classify(font, size, text)
+        if expected:
+            result[expected]["reference"] += 1
+        if got:
+            result[got]["proposed"] += 1
+        if expected and expected == got:
+            result[expected]["agree"] += 1
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Автоподбор профиля стилей заголовков по выборке страниц PDF")
+    parser.add_argument("pdf")
+    parser.add_argument("--pages", type=int, default=sample_pages, help="страниц в выборке")
+    parser.add_argument("--compare", choices=sorted(PROFILES), help="сравнить с ручным профилем из style_rules")
+    parser.add_argument("--json", help="записать профиль и отчёт в файл")
+    args = parser.parse_args()
+
+    result = profile_pdf(args.pdf, args.pages)
+    print(f"{result['sampled_pages']} страниц выборки + {result['added_pages']} найдено по тексту "
+          f"(просмотрено {result['scanned_pages']}) из {result['page_count']} за {result['seconds']} с; "
+          f"оглавление пропущено: {len(result['index_pages'])} стр.")
+    for level, info in result["levels"].items():
+        print(f"{level:9} уверенность {info['confidence']:.2f}  страниц {info['pages']}, совпадений {info['matches']}")
+        for candidate in info["candidates"]:
+            print(f"    {candidate['share']:5.3f}  {candidate['font']} {candidate['size']}  {candidate['pattern']!r}  "
+                  f"страниц {candidate['pages']}, {candidate['matches']} из {candidate['spans']} спанов")
+    print("\nПрофиль для style_rules.PROFILES:")
+    pprint.pprint(result["rules"], sort_dicts=False, width=140)
+    if args.compare:
+        print(f"\nСравнение с профилем {args.compare!r} на спанах выборки:")
+        for level, counts in compare(result["rules"], PROFILES[args.compare], result["sample"]).items():
+            print(f"{level:9} ручной {counts['reference']:4}, предложенный {counts['proposed']:4}, совпало {counts['agree']:4}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({key: value for key, value in result.items() if key != "sample"}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,128 @@
+import re
+import sys
+
+from .instrumentation import metrics
+
+# Профили стилей по кодексам.
+# Правило: уровень иерархии + шрифт + размер + шаблон начала текста.
+# Шрифт: "font" (точное имя) или "font_contains" (подстрока).
+# Размер: "size" и "tol" (|size - x| < tol) или "size_range" с границами "bounds" ("[]", "(]", "[)", "()").
+# Порядок правил — приоритет: побеждает первое подошедшее.
+# Профиль для нового кодекса предлагает style_profiler.py по выборке страниц PDF.
+PROFILES = {
+    # CIVIL_make_sstructure_with_text.py, draft_CIVIL.py
+    "civil": [
+        {"level": "libro", "font": "AvenirLTStd-Roman", "size": 10.5, "tol": 0.2, "pattern": r"LIBRO"},
+        {"level": "titulo", "font": "AvenirLTStd-Heavy", "size": 9.5, "tol": 0.2, "pattern": r"TÍTULO"},
+        {"level": "capitulo", "font": "AvenirLTStd-Roman", "size": 9.5, "tol": 0.2, "pattern": r"CAPÍTULO"},
+        {"level": "articulo", "font": "AvenirLTStd-Heavy", "size": 9.5, "tol": 0.2, "pattern": r"\d+\."},
+        # Часть номеров набрана чуть крупнее 9.5
+        {"level": "articulo", "font": "AvenirLTStd-Heavy", "size_range": (9.5, 9.75), "bounds": "(]", "pattern": r"\d+\."},
+    ],
+    # bulk_structure_extractor_codigo_civil.py
+    "civil_bulk": [
+        {"level": "libro", "font_contains": "AvenirLTStd", "size_range": (9.0, 11.0), "pattern": r"LIBRO", "ignore_case": True},
+        {"level": "titulo", "font_contains": "AvenirLTStd", "size_range": (9.0, 10.0), "pattern": r"TÍTULO", "ignore_case": True},
+        {"level": "capitulo", "font_contains": "AvenirLTStd", "size_range": (9.0, 10.0), "pattern": r"CAPÍTULO", "ignore_case": True},
+        # Только жирный номер артикула, например "17."
+        {"level": "articulo", "font": "AvenirLTStd-Heavy", "size": 9.5, "tol": 0.3, "pattern": r"\d+\."},
+    ],
+    # bulk_structure_codigo_penal.py
+    "penal_bulk": [
+        {"level": "libro", "font": "AvenirLTStd-Roman", "size": 10.5, "tol": 0.2, "pattern": r"LIBRO"},
+        {"level": "titulo", "font": "AvenirLTStd-Heavy", "size": 9.5, "tol": 0.2, "pattern": r"TÍTULO"},
+        {"level": "capitulo", "font": "AvenirLTStd-Roman", "size": 9.5, "tol": 0.2, "pattern": r"CAPÍTULO"},
+        {"level": "articulo", "font": "AvenirLTStd-Heavy", "size": 9.5, "tol": 0.2, "pattern": r"Artículo"},
+    ],
+    # draft_PENAL.py
+    "penal": [
+        {"level": "libro", "font": "AvenirLTStd-Roman", "size": 10.5, "tol": 0.2, "pattern": r"LIBRO"},
+        {"level": "titulo", "font": "AvenirLTStd-Heavy", "size": 9.5, "tol": 0.2, "pattern": r"TÍTULO"},
+        {"level": "capitulo", "font": "AvenirLTStd-Roman", "size": 9.5, "tol": 0.2, "pattern": r"CAPÍTULO"},
+        # "Artículo 14" или "ARTÍCULO 14"
+        {"level": "articulo", "font": "AvenirLTStd-Heavy", "size": 9.5, "tol": 0.2, "pattern": r"(Artículo|ARTÍCULO)\s+\d+"},
+    ],
+}
+
+
+def _font_matches(rule, font):
+    if "font" in rule:
+        return font == rule["font"]
+    return rule["font_contains"] in font
+
+
+def _size_matches(rule, size):
+    if "size_range" not in rule:
+        return abs(size - rule["size"]) < rule["tol"]
+    low, high = rule["size_range"]
+    bounds = rule.get("bounds", "[]")
+    above = low <= size if bounds[0] == "[" else low < size
+    below = size <= high if bounds[1] == "]" else size < high
+    return above and below
+
+
+class StyleClassifier:
+    """
+    Классификатор спанов по профилю стилей.
+
+    Для каждой пары (шрифт, размер) правила отбираются один раз и склеиваются
+    в одно регулярное выражение, так что на спан приходится не больше одного
+    re.match, а спаны основного текста вообще не проверяются регуляркой.
+    Размер берётся как есть: в PDF всего несколько десятков разных значений,
+    а округление сдвинуло бы границы правил.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._dispatch = {}
+
+    def _compile_style(self, font, size):
+        alternatives = []
+        levels = {}
+        for index, rule in enumerate(self.rules):
+            if _font_matches(rule, font) and _size_matches(rule, size):
+                group = f"r{index}"
+                flags = "(?i:" if rule.get("ignore_case") else "(?:"
+                alternatives.append(f"(?P<{group}>{flags}{rule['pattern']}))")
+                levels[group] = rule["level"]
+        if not alternatives:
+            return None
+        return re.compile("|".join(alternatives)), levels
+
+    def has_rules(self, font, size):
+        """Может ли к спану такого стиля подойти хоть одно правило (текст не проверяется)."""
+        key = (font, size)
+        if key not in self._dispatch:
+            self._dispatch[(sys.intern(font), size)] = self._compile_style(font, size)
+        return self._dispatch[key] is not None
+
+    def classify(self, font, size, text):
+        """Возвращает уровень ("libro", "titulo", "capitulo", "articulo") или None. text — уже после strip()."""
+        key = (font, size)
+        try:
+            entry = self._dispatch[key]
+        except KeyError:
+            entry = self._dispatch[(sys.intern(font), size)] = self._compile_style(font, size)
+        if entry is None:
+            return None
+        regex, levels = entry
+        match = regex.match(text)
+        if match is None:
+            return None
+        return levels[match.lastgroup]
+
+    def classify_page(self, spans):
+        """
+        Уровни всех спанов страницы по порядку (None — обычный текст).
+
+        Стадия classify замеряется один раз на страницу: таймер на каждый спан
+        стоил сопоставимо с самой классификацией.
+        """
+        with metrics.timer("classify"):
+            classify = self.classify
+            return [classify(span["font"], span["size"], span["text"].strip()) for span in spans]
+
+
+def classifier_for(code):
+    """Классификатор для профиля из PROFILES (например, "civil" или "penal_bulk")."""
+    return StyleClassifier(PROFILES[code])
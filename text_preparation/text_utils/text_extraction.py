@@ -1,8 +1,65 @@
-import fitz
-import json
+import os
+import re
+from collections import Counter
+
+from .instrumentation import metrics, progress
 
 civil_file = '../../DATA/Codigo_Civil.pdf'
 
+BAND_SAMPLE_PAGES = 24   # pages sampled to learn the running header/footer
+BAND_ZONE = 0.12         # share of the page height at the top and bottom searched for bands
+BAND_MIN_SHARE = 0.5     # a band must repeat on at least this share of the sampled pages
+_DIGITS_RE = re.compile(r"\d+")
+
+def import_fitz():
+    """
+    Imports PyMuPDF on first use instead of at module import.
+
+    Readers of the extracted corpus (indexes, trees, the bot) import this package
+    without ever opening a PDF; only the code that does open one pays for fitz.
+
+    Returns:
+        module: The fitz module.
+    """
+    import fitz  # PyMuPDF
+    return fitz
+
+def open_pdf(pdf_path):
+    """
+    Opens a PDF with the lazily imported PyMuPDF.
+
+    Args:
+        pdf_path (str): The path to the PDF file.
+
+    Returns:
+        fitz.Document: The open document; close it or use it as a context manager.
+    """
+    return import_fitz().open(pdf_path)
+
+def pdf_page_count(pdf_path):
+    """
+    Returns the number of pages of a PDF without keeping it open.
+
+    Args:
+        pdf_path (str): The path to the PDF file.
+
+    Returns:
+        int: The page count.
+    """
+    with metrics.timer("pdf_open"), open_pdf(pdf_path) as pdf_document:
+        return pdf_document.page_count
+
+def fast_text_flags():
+    """
+    Returns the get_text flags of fast mode: the default "dict" flags without image
+    blocks, since the classifiers only read text spans.
+
+    Returns:
+        int: PyMuPDF text flags.
+    """
+    fitz = import_fitz()
+    return fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
 def extract_text_from_pdf(pdf_path, page_num:int):
     """
     Extracts text from a specific page (19) of a PDF file using PyMuPDF (fitz).
@@ -14,23 +71,25 @@ def extract_text_from_pdf(pdf_path, page_num:int):
         list: A list of dictionaries containing text and its style information.
     """
     # Open the PDF file
-    pdf_document = fitz.open(pdf_path)
+    with metrics.timer("pdf_open"):
+        pdf_document = open_pdf(pdf_path)
     
     text_with_styles = []
     
-      
-    print(f"Processing page {page_num + 1} of {len(pdf_document)}")
+    # Throttled progress line instead of a print on every page
+    progress(page_num, len(pdf_document))
     
     # Get the page
     page = pdf_document[page_num]
     
     # Extract text as a dictionary
-    text_dict = page.get_text("dict")
+    with metrics.timer("get_text"):
+        text_dict = page.get_text("dict")
     
     # Iterate over the "blocks" in the text dictionary
     for block in text_dict["blocks"]:
-        # Process each line in the block
-        for line in block["lines"]:
+        # Process each line in the block (image blocks have none)
+        for line in block.get("lines", ()):
             for span in line["spans"]:
                 # Each "span" contains a piece of text with its style
                 text_with_styles.append({
@@ -46,6 +105,150 @@ def extract_text_from_pdf(pdf_path, page_num:int):
     
     return text_with_styles
 
+def learn_body_clip(pdf_document, sample_pages=BAND_SAMPLE_PAGES):
+    """
+    Learns the running header/footer bands of a document once and returns the body rectangle.
+
+    A span in the top or bottom BAND_ZONE of the page belongs to a band when the same text
+    (digits masked, so page numbers match each other) sits at the same height on at least
+    BAND_MIN_SHARE of the sampled pages. Body text never repeats like that.
+
+    Args:
+        pdf_document (fitz.Document): An open document.
+        sample_pages (int): How many evenly spaced pages to look at.
+
+    Returns:
+        tuple | None: (x0, y0, x1, y1) of the body, or None if the document has no bands.
+    """
+    page_count = pdf_document.page_count
+    if not page_count:
+        return None
+    flags = fast_text_flags()
+    sample = sorted({round(i * (page_count - 1) / max(sample_pages - 1, 1)) for i in range(sample_pages)})
+    seen = Counter()
+    edges = {}
+    for page_num in sample:
+        page = pdf_document[page_num]
+        height = page.rect.height
+        keys = set()
+        for block in page.get_text("dict", flags=flags)["blocks"]:
+            for line in block.get("lines", ()):
+                for span in line["spans"]:
+                    text = span["text"].strip()
+                    _, y0, _, y1 = span["bbox"]
+                    if not text:
+                        continue
+                    if y1 < height * BAND_ZONE:
+                        zone = "header"
+                    elif y0 > height * (1 - BAND_ZONE):
+                        zone = "footer"
+                    else:
+                        continue
+                    key = (zone, round(y0), _DIGITS_RE.sub("#", text))
+                    keys.add(key)
+                    top, bottom = edges.get(key, (y0, y1))
+                    edges[key] = (min(top, y0), max(bottom, y1))
+        seen.update(keys)
+
+    header_bottom, footer_top = None, None
+    for key, pages in seen.items():
+        if pages < len(sample) * BAND_MIN_SHARE:
+            continue
+        top, bottom = edges[key]
+        if key[0] == "header":
+            header_bottom = bottom if header_bottom is None else max(header_bottom, bottom)
+        else:
+            footer_top = top if footer_top is None else min(footer_top, top)
+    if header_bottom is None and footer_top is None:
+        return None
+    rect = pdf_document[sample[0]].rect
+    return (rect.x0, rect.y0 if header_bottom is None else header_bottom,
+            rect.x1, rect.y1 if footer_top is None else footer_top)
+
+def page_spans(page, page_num, body_clip=None, flags=None):
+    """
+    Collects the spans of an already loaded page.
+
+    Args:
+        page (fitz.Page): The page to read.
+        page_num (int): Zero-based page number stored with every span.
+        body_clip (tuple | None): Rectangle to extract from (see learn_body_clip).
+        flags (int | None): get_text flags. Defaults to PyMuPDF's "dict" flags.
+
+    Returns:
+        list: Span dictionaries in reading order, with "page" and "order" attached.
+    """
+    spans = []
+    with metrics.timer("get_text"):
+        blocks = page.get_text("dict", flags=flags, clip=body_clip)["blocks"]
+    for block in blocks:
+        # Image blocks have no "lines"
+        for line in block.get("lines", ()):
+            for span in line["spans"]:
+                spans.append({
+                    "text": span["text"],
+                    "font": span["font"],
+                    "size": span["size"],
+                    "color": span["color"],
+                    "bbox": span["bbox"],
+                    "page": page_num,                 # Номер страницы (с нуля)
+                    "order": len(spans),              # Порядок спана на странице
+                })
+    return spans
+
+def iter_pages(pdf, start=0, end=None, fast=False, body_clip=None):
+    """
+    Opens the PDF once and lazily yields the spans of each page in a range.
+
+    In fast mode the running header/footer bands are learned once per document and
+    extraction is clipped to the body, with image blocks skipped (fast_text_flags):
+    page numbers and running titles never reach the classifiers.
+
+    Args:
+        pdf (str | fitz.Document): The path to the PDF file or an already open document.
+            A document passed in is left open.
+        start (int): First page to read (zero-based).
+        end (int | None): Page to stop at (exclusive). Defaults to the last page.
+        fast (bool): Clip to the body and use fast_text_flags().
+        body_clip (tuple | None): Body rectangle already learned for this document
+            (e.g. by the parent of a process pool); learned here if omitted.
+
+    Yields:
+        tuple: (page_num, list of span dictionaries for that page).
+    """
+    own_document = isinstance(pdf, (str, os.PathLike))
+    with metrics.timer("pdf_open"):
+        pdf_document = open_pdf(pdf) if own_document else pdf
+    try:
+        page_count = pdf_document.page_count
+        end = page_count if end is None else min(end, page_count)
+        flags = None
+        if fast:
+            flags = fast_text_flags()
+            if body_clip is None:
+                body_clip = learn_body_clip(pdf_document)
+        for page_num in range(start, end):
+            yield page_num, page_spans(pdf_document[page_num], page_num, body_clip, flags)
+    finally:
+        if own_document:
+            pdf_document.close()
+
+def iter_spans(pdf, start=0, end=None, fast=False):
+    """
+    Same as iter_pages, but yields the spans one by one across the page range.
+
+    Args:
+        pdf (str | fitz.Document): The path to the PDF file or an already open document.
+        start (int): First page to read (zero-based).
+        end (int | None): Page to stop at (exclusive). Defaults to the last page.
+        fast (bool): See iter_pages.
+
+    Yields:
+        dict: Span with text, style, bbox, "page" and "order".
+    """
+    for _, spans in iter_pages(pdf, start, end, fast):
+        yield from spans
+
 # page_num = 30
 # Call the function for testing
 # d = extract_text_from_pdf(civil_file, page_num=page_num)
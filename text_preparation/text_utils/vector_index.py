@@ -0,0 +1,331 @@
+import argparse
+import json
+import os
+import time
+import zlib
+from itertools import islice
+
+import numpy as np
+
+from .articles import article_id, article_text
+from .bm25_index import analyze
+from .json_stream import iter_ndjson_offsets, read_record_at
+
+# === НАСТРОЙКИ ===
+batch_size = 256        # статей на один вызов encode
+n_features = 1 << 12    # корзин хэширования термов
+dim = 256               # размерность вектора после SVD
+fit_sample = 20000      # на скольких статьях обучать idf и SVD
+nprobe = 8              # сколько списков IVF просматривать при поиске (больше — точнее и медленнее)
+
+_ARRAYS = ("vectors", "vectors_i8", "scales", "centroids", "list_offsets", "list_rows", "doc_offsets")
+
+
+class HashingSvdEncoder:
+    """
+    Локальный кодировщик без внешних моделей: TF-IDF по хэшированным термам -> SVD (LSA).
+
+    Любой другой кодировщик подходит, если у него есть dim и encode(texts) ->
+    float32 (n, dim) с единичными строками; save/load нужны, чтобы запросы
+    кодировались так же, как корпус.
+    """
+
+    name = "hashing_svd"
+
+    def __init__(self, n_features=n_features, dim=dim, idf=None, components=None):
+        self.n_features = n_features
+        self.dim = dim
+        self.idf = idf
+        self.components = components
+        self._buckets = {}
+
+    def _bucket(self, term):
+        # crc32, а не hash(): хэш строк в Python меняется от запуска к запуску
+        bucket = self._buckets.get(term)
+        if bucket is None:
+            h = zlib.crc32(term.encode("utf-8"))
+            bucket = self._buckets[term] = (h % self.n_features, 1.0 if h & 0x80000000 else -1.0)
+        return bucket
+
+    def _hashed(self, texts):
+        """Матрица (n, n_features): сублинейный tf со знаком по корзинам."""
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for term in analyze(text):
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                bucket, sign = self._bucket(term)
+                matrix[row, bucket] += sign * (1.0 + np.log(tf))
+        return matrix
+
+    def fit(self, texts, seed=0):
+        """idf по корзинам и рандомизированный SVD на выборке текстов."""
+        hashed = self._hashed(texts)
+        df = np.count_nonzero(hashed, axis=0)
+        self.idf = np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1
+        weighted = _normalize(hashed * self.idf)
+        rank = min(self.dim, *weighted.shape)
+        rng = np.random.default_rng(seed)
+        sketch = weighted @ rng.standard_normal((weighted.shape[1], rank + 10), dtype=np.float32)
+        for _ in range(2):
+            sketch = weighted @ (weighted.T @ sketch)
+        basis, _ = np.linalg.qr(sketch)
+        _, _, vt = np.linalg.svd(basis.T @ weighted, full_matrices=False)
+        self.components = np.ascontiguousarray(vt[:rank].T, dtype=np.float32)
+        self.dim = rank
+        return self
+
+    def encode(self, texts):
+        return _normalize(self._hashed(texts) * self.idf @ self.components)
+
+    def save(self, directory):
+        np.save(os.path.join(directory, "encoder_idf.npy"), self.idf)
+        np.save(os.path.join(directory, "encoder_components.npy"), self.components)
+        return {"name": self.name, "n_features": self.n_features, "dim": self.dim}
+
+    @classmethod
+    def load(cls, directory, config):
+        return cls(config["n_features"], config["dim"],
+                   np.load(os.path.join(directory, "encoder_idf.npy")),
+                   np.load(os.path.join(directory, "encoder_components.npy")))
+
+
+ENCODERS = {HashingSvdEncoder.name: HashingSvdEncoder}
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def quantize(vectors):
+    """float32 -> int8 с масштабом на строку: vectors ≈ vectors_i8 * scales[:, None]."""
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def kmeans(vectors, k, iterations=20, seed=0):
+    """Сферический k-means (косинус) для списков IVF."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(k):
+            members = vectors[assignment == cluster]
+            # Пустой кластер получает случайную точку, чтобы списков оставалось k
+            centroids[cluster] = members.sum(axis=0) if len(members) else vectors[rng.integers(len(vectors))]
+        centroids = _normalize(centroids)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+def _count_records(ndjson_path):
+    """Число непустых строк NDJSON — без разбора JSON, чтобы заранее выделить матрицу."""
+    with open(ndjson_path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def _batches(ndjson_path, size):
+    """(смещения, ID, тексты) статей пачками по size."""
+    offsets, ids, texts = [], [], []
+    for offset, article in iter_ndjson_offsets(ndjson_path):
+        offsets.append(offset)
+        ids.append(article_id(article))
+        texts.append(article_text(article))
+        if len(texts) == size:
+            yield offsets, ids, texts
+            offsets, ids, texts = [], [], []
+    if texts:
+        yield offsets, ids, texts
+
+
+def _top_k(scores, k):
+    if len(scores) > k:
+        top = np.argpartition(-scores, k)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+    return np.argsort(-scores, kind="stable")
+
+
+class VectorIndex:
+    """
+    Векторный индекс статей: матрица float32 и её int8-копия (mmap) + IVF.
+
+    Строки сгруппированы по ближайшему центроиду k-means (CSR: list_offsets,
+    list_rows). Запрос сравнивается с центроидами, затем с векторами nprobe
+    ближайших списков по int8-копии; лучшие кандидаты переоцениваются по float32.
+    nprobe — ручка точность/задержка; nprobe = число списков — точный перебор.
+    """
+
+    def __init__(self, meta, arrays, encoder, directory=None):
+        self.meta = meta
+        self.ids = meta["ids"]
+        self.encoder = encoder
+        self.directory = directory
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, ndjson_path, encoder=None, directory=None, batch=batch_size, n_lists=None):
+        """
+        Кодирует статьи пачками и строит IVF.
+
+        NDJSON читается потоком: в памяти только пачка текстов, смещения, ID и векторы.
+        С directory матрица пишется сразу в .npy на диске (open_memmap), а не копится в памяти.
+        """
+        if encoder is None:
+            sample = islice(iter_ndjson_offsets(ndjson_path), fit_sample)
+            encoder = HashingSvdEncoder().fit([article_text(article) for _, article in sample])
+        count = _count_records(ndjson_path)
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            vectors = np.lib.format.open_memmap(os.path.join(directory, "vectors.npy"), mode="w+",
+                                                dtype=np.float32, shape=(count, encoder.dim))
+        else:
+            vectors = np.empty((count, encoder.dim), dtype=np.float32)
+        ids, doc_offsets = [], np.empty(count, dtype=np.int64)
+        start = 0
+        for offsets, batch_ids, texts in _batches(ndjson_path, batch):
+            end = start + len(texts)
+            vectors[start:end] = encoder.encode(texts)
+            doc_offsets[start:end] = offsets
+            ids.extend(batch_ids)
+            start = end
+
+        n_lists = n_lists or max(1, int(np.sqrt(count)))
+        centroids, assignment = kmeans(np.asarray(vectors), n_lists)
+        vectors_i8, scales = quantize(np.asarray(vectors))
+        list_rows = np.argsort(assignment, kind="stable").astype(np.int32)
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))]).astype(np.int64)
+        meta = {
+            "source": os.path.abspath(ndjson_path),
+            "ids": ids,
+        }
+        arrays = {
+            "vectors": vectors,
+            "vectors_i8": vectors_i8,
+            "scales": scales,
+            "centroids": centroids,
+            "list_offsets": list_offsets,
+            "list_rows": list_rows,
+            "doc_offsets": doc_offsets,
+        }
+        return cls(meta, arrays, encoder, directory)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            path = os.path.join(directory, f"{name}.npy")
+            # Матрица, уже записанная через open_memmap в этот же каталог, только сбрасывается на диск
+            array = getattr(self, name)
+            if isinstance(array, np.memmap) and os.path.abspath(array.filename) == os.path.abspath(path):
+                array.flush()
+            else:
+                np.save(path, array)
+        meta = dict(self.meta, source=os.path.relpath(self.meta["source"], os.path.abspath(directory)),
+                    encoder=self.encoder.save(directory))
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        meta["source"] = os.path.join(os.path.abspath(directory), meta["source"])
+        encoder = ENCODERS[meta["encoder"]["name"]].load(directory, meta["encoder"])
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in _ARRAYS}
+        return cls(meta, arrays, encoder, directory)
+
+    def search_vector(self, query, k=10, nprobe=nprobe, rerank=4):
+        """
+        Returns:
+            list: (номер строки в NDJSON, ID статьи, косинус) по убыванию.
+        """
+        lists = _top_k(self.centroids @ query, min(nprobe, len(self.centroids)))
+        rows = np.concatenate([self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in lists])
+        if not len(rows):
+            return []
+        rows.sort()
+        approx = (self.vectors_i8[rows] @ query) * self.scales[rows]
+        candidates = rows[_top_k(approx, k * rerank)]
+        scores = self.vectors[candidates] @ query
+        order = _top_k(scores, k)
+        return [(int(candidates[i]), self.ids[candidates[i]], float(scores[i])) for i in order]
+
+    def search(self, query, k=10, nprobe=nprobe):
+        return self.search_vector(self.encoder.encode([query])[0], k, nprobe)
+
+    def brute_force(self, query_vector, k=10):
+        scores = np.asarray(self.vectors) @ query_vector
+        order = _top_k(scores, k)
+        return [(int(row), self.ids[row], float(scores[row])) for row in order]
+
+    def documents(self, rows):
+        with open(self.meta["source"], "rb") as f:
+            return [read_record_at(f, int(self.doc_offsets[row])) for row in rows]
+
+
+def benchmark(index, queries=200, k=10, probes=(1, 2, 4, 8, 16, 32), seed=0):
+    """
+    recall@k относительно точного перебора и задержка по значениям nprobe.
+
+    Запросы — первые ~20 слов случайных статей корпуса.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index.ids), min(queries, len(index.ids)), replace=False)
+    texts = [" ".join(article_text(article).split()[:20]) for article in index.documents(sorted(rows))]
+    query_vectors = index.encoder.encode(texts)
+    exact = [{row for row, _, _ in index.brute_force(vector, k)} for vector in query_vectors]
+
+    started = time.perf_counter()
+    for vector in query_vectors:
+        index.brute_force(vector, k)
+    results = [{"nprobe": "brute", "recall": 1.0,
+                "ms": round((time.perf_counter() - started) / len(query_vectors) * 1000, 3)}]
+    for probe in probes:
+        if probe > len(index.centroids):
+            break
+        hits = 0
+        started = time.perf_counter()
+        for vector, truth in zip(query_vectors, exact):
+            hits += len(truth & {row for row, _, _ in index.search_vector(vector, k, probe)})
+        elapsed = time.perf_counter() - started
+        results.append({"nprobe": probe, "recall": round(hits / (k * len(query_vectors)), 4),
+                        "ms": round(elapsed / len(query_vectors) * 1000, 3)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Векторный индекс статей (CPU, IVF)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build")
+    build_parser.add_argument("input", nargs="?", default="all_laws.ndjson")
+    build_parser.add_argument("output", nargs="?", default="laws_vectors")
+    search_parser = sub.add_parser("search")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--index", default="laws_vectors")
+    search_parser.add_argument("-k", type=int, default=10)
+    search_parser.add_argument("--nprobe", type=int, default=nprobe)
+    bench_parser = sub.add_parser("bench")
+    bench_parser.add_argument("--index", default="laws_vectors")
+    bench_parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        index = VectorIndex.build(args.input, directory=args.output)
+        index.save(args.output)
+        print(f"{len(index.ids)} статей, dim {index.encoder.dim}, {len(index.centroids)} списков IVF "
+              f"за {time.perf_counter() - started:.2f} с -> {args.output}")
+    elif args.command == "search":
+        index = VectorIndex.load(args.index)
+        started = time.perf_counter()
+        hits = index.search(args.query, args.k, args.nprobe)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for (row, doc_id, score), article in zip(hits, index.documents(row for row, _, _ in hits)):
+            print(f"{score:6.3f}  {doc_id:<24} {article_text(article)[:100]}")
+        print(f"{len(hits)} результатов за {elapsed_ms:.3f} мс")
+    else:
+        index = VectorIndex.load(args.index)
+        for result in benchmark(index, args.queries):
+            print(f"nprobe {result['nprobe']!s:>5}: recall@10 {result['recall']:.3f}, {result['ms']:.3f} мс/запрос")
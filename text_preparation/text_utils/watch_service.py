@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from .ingest import ingest_document, load_manifest, manifest_path, part_path, publish
+from .instrumentation import Histogram
+
+# === НАСТРОЙКИ ===
+data_dir = "../../DATA"   # каталог, куда кладут PDF
+poll_interval = 1.0       # секунд между просмотрами каталога
+settle_seconds = 2.0      # PDF берётся в работу, только если размер и mtime не менялись столько секунд
+max_jobs = 2              # одновременных извлечений (процессов в пуле)
+status_port = 8765        # GET /status — очередь, задания, задержки (None — без HTTP)
+status_host = "127.0.0.1" # интерфейс для /status; "0.0.0.0" — все интерфейсы
+history_size = 50         # сколько последних заданий показывать в /status
+
+# Корзины гистограммы задержек, секунды: от появления PDF до публикации NDJSON
+LATENCY_BOUNDS = (1, 2, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _signature(path):
+    """(размер, mtime_ns) файла или None, если его уже нет."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class WatchService:
+    """
+    Долгоживущий сервис: следит за data_dir и переизвлекает кодексы из манифеста.
+
+    Каталог опрашивается раз в poll_interval (без зависимостей вроде watchdog).
+    Новый или изменённый PDF ставится в очередь только после того, как его
+    размер и mtime не менялись settle_seconds, — недописанный файл не читается.
+    Извлечение (ingest.ingest_document) идёт в пуле из max_jobs процессов,
+    цикл событий не блокируется; после каждого задания ingest.publish
+    атомарно пересобирает итоговый NDJSON. Манифест перечитывается при изменении.
+    """
+
+    def __init__(self, manifest_path=manifest_path, data_dir=data_dir, max_jobs=max_jobs,
+                 poll_interval=poll_interval, settle_seconds=settle_seconds):
+        self.manifest_path = manifest_path
+        self.data_dir = data_dir
+        self.max_jobs = max_jobs
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.manifest = None
+        self._manifest_signature = None
+        self.queue = asyncio.Queue()
+        self._queued = set()            # book_name в очереди (повторное изменение не дублирует задание)
+        self._running = {}              # book_name -> задание
+        self._book_locks = {}           # один кодекс не извлекается двумя процессами сразу
+        self._publish_lock = asyncio.Lock()
+        self._settling = {}             # путь PDF -> (сигнатура, последнее изменение, первое замеченное)
+        self._done = {}                 # путь PDF -> сигнатура, уже поставленная в очередь
+        self.history = deque(maxlen=history_size)
+        self.latency = Histogram(LATENCY_BOUNDS)
+        self.unmanaged = set()
+        self.started = time.time()
+        self._pool = None
+
+    def _documents_by_pdf(self):
+        return {os.path.abspath(document["pdf_path"]): document for document in self.manifest["documents"]}
+
+    def _reload_manifest(self):
+        signature = _signature(self.manifest_path)
+        if signature == self._manifest_signature:
+            return
+        try:
+            manifest = load_manifest(self.manifest_path)
+        except (OSError, ValueError, KeyError) as error:
+            print(f"Манифест {self.manifest_path} не принят: {error}")
+            self._manifest_signature = signature
+            return
+        os.makedirs(manifest["parts_dir"], exist_ok=True)
+        previous = self._documents_by_pdf() if self.manifest else {}
+        self.manifest = manifest
+        self._manifest_signature = signature
+        # Изменилась запись документа (экстрактор, профиль) — его PDF проверяется заново
+        documents = self._documents_by_pdf()
+        self._done = {path: done for path, done in self._done.items() if previous.get(path) == documents.get(path)}
+        print(f"Манифест загружен: {len(manifest['documents'])} документов")
+
+    def _up_to_date(self, path, document):
+        """Часть кодекса новее PDF и манифеста — при первой встрече с PDF переизвлекать незачем."""
+        part = _signature(part_path(self.manifest["parts_dir"], document["book_name"]))
+        return part is not None and part[1] >= max(_signature(path)[1], self._manifest_signature[1])
+
+    def scan(self):
+        """Один просмотр data_dir: дебаунс изменений и постановка устоявшихся PDF в очередь."""
+        self._reload_manifest()
+        if self.manifest is None:
+            return
+        documents = self._documents_by_pdf()
+        now = time.monotonic()
+        try:
+            names = sorted(os.listdir(self.data_dir))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if not name.lower().endswith(".pdf"):
+                continue
+            path = os.path.abspath(os.path.join(self.data_dir, name))
+            document = documents.get(path)
+            if document is None:
+                if path not in self.unmanaged:
+                    self.unmanaged.add(path)
+                    print(f"{name}: нет в манифесте, пропускаю")
+                continue
+            self.unmanaged.discard(path)
+            signature = _signature(path)
+            if signature is None or signature == self._done.get(path):
+                self._settling.pop(path, None)
+                continue
+            seen = self._settling.get(path)
+            if seen is None or seen[0] != signature:
+                self._settling[path] = (signature, now, seen[2] if seen else now)
+                continue
+            if now - seen[1] < self.settle_seconds:
+                continue
+            del self._settling[path]
+            first = path not in self._done
+            self._done[path] = signature
+            if first and self._up_to_date(path, document):
+                print(f"{name}: {document['book_name']} уже извлечён")
+                continue
+            self._enqueue(document, seen[2])
+
+    def _enqueue(self, document, noticed):
+        book_name = document["book_name"]
+        if book_name in self._queued:
+            return
+        self._queued.add(book_name)
+        # Время от первого замеченного изменения, а не от конца дебаунса
+        queued_at = time.time() - (time.monotonic() - noticed)
+        self.queue.put_nowait({"book_name": book_name, "document": document, "queued_at": queued_at})
+        print(f"{book_name}: в очереди ({self.queue.qsize()})")
+
+    async def watch(self):
+        while True:
+            self.scan()
+            await asyncio.sleep(self.poll_interval)
+
+    async def worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            book_name = job["book_name"]
+            lock = self._book_locks.setdefault(book_name, asyncio.Lock())
+            async with lock:
+                # Изменения, пришедшие после этой точки, ставят кодекс в очередь снова
+                self._queued.discard(book_name)
+                self._running[book_name] = job
+                job["started_at"] = time.time()
+                manifest = self.manifest
+                try:
+                    result = await loop.run_in_executor(
+                        self._pool, ingest_document, job["document"], manifest["parts_dir"],
+                        manifest["normalize"], manifest["span_cache_dir"], manifest["fast"])
+                    async with self._publish_lock:
+                        await asyncio.to_thread(publish, manifest)
+                    job.update(status="ok", articles=result["articles"])
+                except Exception as error:  # задание падает, сервис — нет
+                    job.update(status="error", error=f"{type(error).__name__}: {error}")
+                finally:
+                    del self._running[book_name]
+                    self.queue.task_done()
+            job["finished_at"] = time.time()
+            job["latency_seconds"] = round(job["finished_at"] - job["queued_at"], 3)
+            job["run_seconds"] = round(job["finished_at"] - job["started_at"], 3)
+            self.latency.observe(job["latency_seconds"])
+            self.history.append(job)
+            if job["status"] == "ok":
+                print(f"{book_name}: {job['articles']} статей, {job['run_seconds']} с "
+                      f"(с момента изменения {job['latency_seconds']} с) -> {manifest['output']}")
+            else:
+                print(f"{book_name}: ошибка — {job['error']}")
+
+    def status(self):
+        """Состояние для GET /status."""
+        def view(job):
+            return {key: value for key, value in job.items() if key != "document"}
+
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "queue_depth": self.queue.qsize(),
+            "running": [view(job) for job in self._running.values()],
+            "max_jobs": self.max_jobs,
+            "settling": sorted(self._settling),
+            "unmanaged": sorted(self.unmanaged),
+            "output": self.manifest["output"] if self.manifest else None,
+            "latency_seconds": self.latency.to_dict(),
+            "jobs": [view(job) for job in reversed(self.history)],
+        }
+
+    async def _handle_http(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/status":
+                code, body = "200 OK", json.dumps(self.status(), ensure_ascii=False, indent=2).encode("utf-8")
+            else:
+                code, body = "404 Not Found", b'{"error": "not found"}'
+            writer.write(f"HTTP/1.1 {code}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def run(self, port=status_port, host=status_host):
+        """Работает до SIGINT/SIGTERM; текущие задания дорабатывают, очередь бросается."""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+
+        self._pool = ProcessPoolExecutor(max_workers=self.max_jobs, mp_context=get_context("spawn"))
+        server = None
+        if port is not None:
+            server = await asyncio.start_server(self._handle_http, host=host, port=port)
+            print(f"Статус: http://{host}:{port}/status")
+        tasks = [asyncio.create_task(self.watch())]
+        tasks += [asyncio.create_task(self.worker()) for _ in range(self.max_jobs)]
+        print(f"Слежу за {os.path.abspath(self.data_dir)} (процессов: {self.max_jobs})")
+        try:
+            await stop.wait()
+        finally:
+            print("Остановка...")
+            if server is not None:
+                server.close()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сервис: следит за каталогом с PDF и переизвлекает изменившиеся кодексы")
+    parser.add_argument("manifest", nargs="?", default=manifest_path)
+    parser.add_argument("--data-dir", default=data_dir)
+    parser.add_argument("--max-jobs", type=int, default=max_jobs)
+    parser.add_argument("--port", type=int, default=status_port)
+    parser.add_argument("--host", default=status_host, help="интерфейс для /status")
+    parser.add_argument("--settle", type=float, default=settle_seconds, help="секунд без изменений до старта задания")
+    args = parser.parse_args()
+
+    service = WatchService(args.manifest, args.data_dir, max(1, args.max_jobs), poll_interval, args.settle)
+    asyncio.run(service.run(args.port, args.host))